@@ -0,0 +1,460 @@
+"""Local stand-in for the generativelanguage endpoints used by gemini-ng.
+
+Serves the discovery document, `generateContent`, `streamGenerateContent`,
+`countTokens`, simple and resumable media uploads and `files.get`, with
+configurable latency and error rates. Run it standalone with
+
+    python benchmarks/mock_server.py --port 8765 --latency 0.05 --error-rate 0.01
+
+and point a client at it with `GeminiClient(base_url="http://127.0.0.1:8765")`.
+"""
+
+import argparse
+import collections
+import json
+import random
+import re
+import threading
+import time
+import uuid
+from dataclasses import dataclass, field
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+
+@dataclass
+class MockConfig:
+    latency: float = 0.0
+    """Seconds added to every request."""
+
+    latency_jitter: float = 0.0
+    """Uniform random extra latency, in seconds."""
+
+    error_rate: float = 0.0
+    """Share of API requests answered with `error_status`."""
+
+    error_status: int = 500
+
+    stream_chunks: int = 4
+    """Number of SSE events per streamed response."""
+
+    response_tokens: int = 32
+    """Words in each generated response."""
+
+    processing_polls: int = 0
+    """`files.get` calls that report a file as `PROCESSING` before it becomes `ACTIVE`."""
+
+
+@dataclass
+class _UploadSession:
+    size: int | None
+    mime_type: str
+    display_name: str | None
+    received: int = 0
+    lock: threading.Lock = field(default_factory=threading.Lock)
+
+
+def build_discovery_document(root_url: str, version: str = "v1beta") -> dict:
+    def method(name: str, path: str, http_method: str, parameters: dict, **extra) -> dict:
+        return {
+            "id": f"generativelanguage.{name}",
+            "path": path,
+            "flatPath": path,
+            "httpMethod": http_method,
+            "parameters": parameters,
+            "parameterOrder": list(parameters),
+            "request": {"$ref": "Object"},
+            "response": {"$ref": "Object"},
+            **extra,
+        }
+
+    model_parameter = {
+        "model": {
+            "type": "string",
+            "location": "path",
+            "required": True,
+            "pattern": "^models/[^/]+$",
+        }
+    }
+    count_tokens = method(
+        "models.countTokens", f"{version}/{{+model}}:countTokens", "POST", model_parameter
+    )
+
+    return {
+        "kind": "discovery#restDescription",
+        "discoveryVersion": "v1",
+        "id": f"generativelanguage:{version}",
+        "name": "generativelanguage",
+        "version": version,
+        "rootUrl": root_url,
+        "servicePath": "",
+        "baseUrl": root_url,
+        "batchPath": "batch",
+        "parameters": {
+            "key": {"type": "string", "location": "query"},
+            "alt": {"type": "string", "location": "query", "default": "json"},
+        },
+        "schemas": {"Object": {"id": "Object", "type": "object", "properties": {}}},
+        "resources": {
+            "models": {
+                "methods": {
+                    "generateContent": method(
+                        "models.generateContent",
+                        f"{version}/{{+model}}:generateContent",
+                        "POST",
+                        model_parameter,
+                    ),
+                    "countTokens": count_tokens,
+                    "getTokenCount": count_tokens,
+                }
+            },
+            "media": {
+                "methods": {
+                    "upload": method(
+                        "media.upload",
+                        f"{version}/files",
+                        "POST",
+                        {},
+                        supportsMediaUpload=True,
+                        mediaUpload={
+                            "accept": ["*/*"],
+                            "maxSize": "2147483648",
+                            "protocols": {
+                                "simple": {"multipart": True, "path": f"/upload/{version}/files"},
+                                "resumable": {
+                                    "multipart": True,
+                                    "path": f"/resumable/upload/{version}/files",
+                                },
+                            },
+                        },
+                    )
+                }
+            },
+            "files": {
+                "methods": {
+                    "get": method(
+                        "files.get",
+                        f"{version}/{{+name}}",
+                        "GET",
+                        {
+                            "name": {
+                                "type": "string",
+                                "location": "path",
+                                "required": True,
+                                "pattern": "^files/[^/]+$",
+                            }
+                        },
+                    )
+                }
+            },
+        },
+    }
+
+
+class MockGeminiServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0, config: MockConfig | None = None):
+        super().__init__((host, port), _Handler)
+
+        self.config = config or MockConfig()
+        self.sessions: dict[str, _UploadSession] = {}
+        self.files: dict[str, dict] = {}
+        self.polls: dict[str, int] = {}
+        # API requests received, by method (`generateContent`, `upload`, ...).
+        self.requests: collections.Counter[str] = collections.Counter()
+        self.lock = threading.Lock()
+
+    def record(self, method: str):
+        with self.lock:
+            self.requests[method] += 1
+
+    @property
+    def url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> "MockGeminiServer":
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+        return self
+
+    def create_file(self, size: int, mime_type: str, display_name: str | None) -> dict:
+        file_id = uuid.uuid4().hex[:16]
+        now = time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime())
+        expiration = time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime(time.time() + 48 * 3600))
+
+        file = {
+            "name": f"files/{file_id}",
+            "displayName": display_name,
+            "mimeType": mime_type,
+            "sizeBytes": str(size),
+            "createTime": now,
+            "updateTime": now,
+            "expirationTime": expiration,
+            "sha256Hash": "",
+            "uri": f"{self.url}/v1beta/files/{file_id}",
+            "state": "PROCESSING" if self.config.processing_polls > 0 else "ACTIVE",
+        }
+        if display_name is None:
+            del file["displayName"]
+
+        with self.lock:
+            self.files[file["name"]] = file
+            self.polls[file["name"]] = 0
+
+        return file
+
+    def generation_response(self, body: dict, text: str | None = None) -> dict:
+        prompt_tokens = max(len(json.dumps(body)) // 4, 1)
+        if text is None:
+            text = " ".join(["token"] * self.config.response_tokens)
+
+        return {
+            "candidates": [
+                {
+                    "index": 0,
+                    "content": {"role": "model", "parts": [{"text": text}]},
+                    "finishReason": "STOP",
+                }
+            ],
+            "usageMetadata": {
+                "promptTokenCount": prompt_tokens,
+                "candidatesTokenCount": self.config.response_tokens,
+                "totalTokenCount": prompt_tokens + self.config.response_tokens,
+            },
+        }
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    # Headers and body are written separately; without this, delayed ACKs add
+    # ~40 ms to every keep-alive response.
+    disable_nagle_algorithm = True
+    server: MockGeminiServer
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send(self, status: int, body: bytes = b"", headers: dict | None = None):
+        self.send_response(status)
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _send_json(self, status: int, obj: dict, headers: dict | None = None):
+        self._send(
+            status,
+            json.dumps(obj).encode(),
+            {"Content-Type": "application/json; charset=UTF-8", **(headers or {})},
+        )
+
+    def _read_body(self) -> bytes:
+        return self.rfile.read(int(self.headers.get("Content-Length", 0)))
+
+    def _simulate(self) -> bool:
+        """Apply latency and maybe answer with an error; return whether an error was sent."""
+        config = self.server.config
+
+        delay = config.latency + random.uniform(0, config.latency_jitter)
+        if delay > 0:
+            time.sleep(delay)
+
+        if config.error_rate > 0 and random.random() < config.error_rate:
+            self._send_json(
+                config.error_status,
+                {"error": {"code": config.error_status, "message": "Injected error"}},
+                {"Retry-After": "0"} if config.error_status == 429 else None,
+            )
+            return True
+
+        return False
+
+    def do_GET(self):
+        url = urlparse(self.path)
+
+        if url.path == "/$discovery/rest":
+            version = parse_qs(url.query).get("version", ["v1beta"])[0]
+            self._send_json(200, build_discovery_document(self.server.url + "/", version))
+            return
+
+        match = re.fullmatch(r"/v1\w*/(files/[^/]+)", url.path)
+        if match is None:
+            self._send_json(404, {"error": {"code": 404, "message": "Not found"}})
+            return
+
+        self.server.record("files.get")
+        if self._simulate():
+            return
+
+        name = match[1]
+        with self.server.lock:
+            file = self.server.files.get(name)
+            if file is not None:
+                self.server.polls[name] += 1
+                if self.server.polls[name] >= self.server.config.processing_polls:
+                    file["state"] = "ACTIVE"
+
+        if file is None:
+            self._send_json(404, {"error": {"code": 404, "message": f"{name} not found"}})
+        else:
+            self._send_json(200, file)
+
+    def do_POST(self):
+        url = urlparse(self.path)
+        query = parse_qs(url.query)
+        data = self._read_body()
+
+        self.server.record(
+            "upload" if "/upload/" in url.path else url.path.rpartition(":")[2]
+        )
+        if self._simulate():
+            return
+
+        if url.path.endswith(":generateContent"):
+            self._send_json(200, self.server.generation_response(json.loads(data)))
+        elif url.path.endswith(":countTokens"):
+            self._send_json(200, {"totalTokens": max(len(data) // 4, 1)})
+        elif url.path.endswith(":streamGenerateContent"):
+            self._stream(json.loads(data))
+        elif "/upload/" in url.path:
+            upload_type = query.get("uploadType", ["media"])[0]
+            if upload_type == "resumable":
+                self._start_resumable_upload(data)
+            else:
+                self._simple_upload(data)
+        else:
+            self._send_json(404, {"error": {"code": 404, "message": "Not found"}})
+
+    def do_PUT(self):
+        url = urlparse(self.path)
+        # The chunk is discarded; only the byte range it covers is tracked.
+        self._read_body()
+
+        session_id = url.path.rsplit("/", 1)[-1]
+        session = self.server.sessions.get(session_id)
+        if session is None:
+            self._send_json(404, {"error": {"code": 404, "message": "Upload session not found"}})
+            return
+
+        content_range = self.headers.get("Content-Range", "")
+        with session.lock:
+            query = re.fullmatch(r"bytes \*/(\d+|\*)", content_range)
+            if query is None:
+                if self._simulate():
+                    return
+
+                match = re.fullmatch(r"bytes (\d+)-(\d+)/(\d+|\*)", content_range)
+                if match is None or int(match[1]) != session.received:
+                    self._send_json(400, {"error": {"code": 400, "message": "Bad range"}})
+                    return
+
+                session.received = int(match[2]) + 1
+                if match[3] != "*":
+                    session.size = int(match[3])
+
+            if session.size is not None and session.received >= session.size:
+                del self.server.sessions[session_id]
+                file = self.server.create_file(
+                    session.size, session.mime_type, session.display_name
+                )
+                self._send_json(200, {"file": file})
+            else:
+                headers = {}
+                if session.received > 0:
+                    headers["Range"] = f"bytes=0-{session.received - 1}"
+                self._send(308, headers=headers)
+
+    def _stream(self, body: dict):
+        config = self.server.config
+        words = ["token"] * config.response_tokens
+        num_chunks = max(config.stream_chunks, 1)
+        step = max(len(words) // num_chunks, 1)
+
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+
+        for i in range(0, len(words), step):
+            text = " ".join(words[i:i + step]) + " "
+            chunk = self.server.generation_response(body, text)
+            event = f"data: {json.dumps(chunk)}\r\n\r\n".encode()
+            self.wfile.write(f"{len(event):x}\r\n".encode() + event + b"\r\n")
+            self.wfile.flush()
+
+        self.wfile.write(b"0\r\n\r\n")
+
+    def _start_resumable_upload(self, data: bytes):
+        metadata = json.loads(data) if data else {}
+        file = metadata.get("file", {})
+
+        size = self.headers.get("X-Upload-Content-Length")
+        session_id = uuid.uuid4().hex
+        self.server.sessions[session_id] = _UploadSession(
+            size=int(size) if size is not None else None,
+            mime_type=self.headers.get("X-Upload-Content-Type", "application/octet-stream"),
+            display_name=file.get("displayName"),
+        )
+
+        self._send(
+            200, headers={"Location": f"{self.server.url}/resumable/session/{session_id}"}
+        )
+
+    def _simple_upload(self, data: bytes):
+        content_type = self.headers.get("Content-Type", "")
+        metadata = {}
+        mime_type = content_type
+        size = len(data)
+
+        match = re.search(r"boundary=\"?([^\";]+)", content_type)
+        if content_type.startswith("multipart/related") and match is not None:
+            boundary = match[1].encode()
+            # Headers and bodies may be separated by CRLF or bare LF line breaks.
+            parts = [
+                re.split(rb"\r?\n\r?\n", part, maxsplit=1)
+                for part in data.split(b"--" + boundary)
+                if re.search(rb"\r?\n\r?\n", part)
+            ]
+            if len(parts) >= 2:
+                metadata = json.loads(parts[0][1].strip() or b"{}")
+                mime_match = re.search(rb"Content-Type: ([^\r\n]+)", parts[1][0])
+                mime_type = mime_match[1].decode() if mime_match else "application/octet-stream"
+                media = parts[1][1]
+                size = len(media) - (2 if media.endswith(b"\r\n") else media.endswith(b"\n"))
+
+        file = self.server.create_file(
+            size, mime_type, metadata.get("file", {}).get("displayName")
+        )
+        self._send_json(200, {"file": file})
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency", type=float, default=0.0)
+    parser.add_argument("--latency-jitter", type=float, default=0.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--error-status", type=int, default=500)
+    parser.add_argument("--processing-polls", type=int, default=0)
+    args = parser.parse_args()
+
+    server = MockGeminiServer(
+        args.host,
+        args.port,
+        MockConfig(
+            latency=args.latency,
+            latency_jitter=args.latency_jitter,
+            error_rate=args.error_rate,
+            error_status=args.error_status,
+            processing_polls=args.processing_polls,
+        ),
+    )
+    print(f"Mock Gemini API listening on {server.url}")
+    server.serve_forever()
+
+
+if __name__ == "__main__":
+    main()
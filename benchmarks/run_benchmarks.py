@@ -0,0 +1,310 @@
+"""Benchmarks of gemini-ng against a local mock of the Gemini API.
+
+    python benchmarks/run_benchmarks.py --output results.json
+    python benchmarks/run_benchmarks.py --baseline results.json --tolerance 0.2
+
+The mock server runs in a separate process, so the reported CPU time is the
+client's own. With `--baseline`, the run fails when a metric is worse than the
+baseline by more than `--tolerance` (relative).
+"""
+
+import argparse
+import asyncio
+import json
+import multiprocessing
+import os
+import shutil
+import sys
+import tempfile
+import time
+import tracemalloc
+from concurrent.futures import ThreadPoolExecutor
+
+import av
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from mock_server import MockConfig, MockGeminiServer  # noqa: E402
+
+BENCHMARKS = ("generate", "async_generate", "stream", "count_tokens", "chat", "upload_video")
+
+MODEL = "models/gemini-mock"
+
+
+def serve(config: MockConfig, port_queue: multiprocessing.Queue):
+    server = MockGeminiServer(config=config)
+    port_queue.put(server.server_address[1])
+    server.serve_forever()
+
+
+def start_server(config: MockConfig) -> tuple[multiprocessing.Process, str]:
+    port_queue = multiprocessing.Queue()
+    process = multiprocessing.Process(target=serve, args=(config, port_queue), daemon=True)
+    process.start()
+    return process, f"http://127.0.0.1:{port_queue.get(timeout=30)}"
+
+
+def make_synthetic_video(path: str, seconds: int = 20, fps: int = 24, size: int = 640):
+    """Write a video of moving gradients that changes scene every few seconds."""
+    with av.open(path, "w") as container:
+        stream = container.add_stream("libx264", rate=fps)
+        stream.width = size
+        stream.height = size * 9 // 16
+        stream.pix_fmt = "yuv420p"
+
+        y, x = np.mgrid[0:stream.height, 0:stream.width]
+        for i in range(seconds * fps):
+            scene = i // (fps * 4)
+            shift = i * 4
+            frame = np.stack(
+                [
+                    (x + shift + scene * 50) % 256,
+                    (y + scene * 80) % 256,
+                    ((x + y) // 2 + scene * 110) % 256,
+                ],
+                axis=-1,
+            ).astype(np.uint8)
+            for packet in stream.encode(av.VideoFrame.from_ndarray(frame, format="rgb24")):
+                container.mux(packet)
+
+        for packet in stream.encode():
+            container.mux(packet)
+
+
+def latency_stats(latencies: list[float], elapsed: float, cpu: float) -> dict:
+    latencies_ms = np.array(latencies) * 1000
+    return {
+        "throughput_rps": len(latencies) / elapsed,
+        "p50_ms": float(np.percentile(latencies_ms, 50)),
+        "p99_ms": float(np.percentile(latencies_ms, 99)),
+        "cpu_ms_per_request": cpu * 1000 / len(latencies),
+    }
+
+
+def run_timed(fn, num_requests: int, concurrency: int) -> dict:
+    def timed_call(i: int) -> float:
+        start = time.perf_counter()
+        fn(i)
+        return time.perf_counter() - start
+
+    cpu_start, start = time.process_time(), time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        latencies = list(executor.map(timed_call, range(num_requests)))
+    elapsed, cpu = time.perf_counter() - start, time.process_time() - cpu_start
+
+    return latency_stats(latencies, elapsed, cpu)
+
+
+def bench_generate(client, args) -> dict:
+    return run_timed(
+        lambda i: client.generate(MODEL, f"Benchmark prompt {i}"),
+        args.requests,
+        args.concurrency,
+    )
+
+
+def bench_count_tokens(client, args) -> dict:
+    return run_timed(
+        lambda i: client.get_token_count(MODEL, [f"Benchmark prompt {i}"]),
+        args.requests,
+        args.concurrency,
+    )
+
+
+def bench_stream(client, args) -> dict:
+    first_chunk = []
+
+    def stream(i: int):
+        start = time.perf_counter()
+        for j, _ in enumerate(client.generate_stream(MODEL, f"Benchmark prompt {i}")):
+            if j == 0:
+                first_chunk.append(time.perf_counter() - start)
+
+    stats = run_timed(stream, args.requests, args.concurrency)
+    stats["first_chunk_p50_ms"] = float(np.percentile(np.array(first_chunk) * 1000, 50))
+    return stats
+
+
+def bench_async_generate(base_url: str, api_key: str, args) -> dict:
+    from gemini_ng import AsyncGeminiClient
+
+    async def main() -> dict:
+        semaphore = asyncio.Semaphore(args.concurrency)
+
+        async with AsyncGeminiClient(api_key=api_key, base_url=base_url) as client:
+            async def generate(i: int) -> float:
+                async with semaphore:
+                    start = time.perf_counter()
+                    await client.generate(MODEL, f"Benchmark prompt {i}")
+                    return time.perf_counter() - start
+
+            cpu_start, start = time.process_time(), time.perf_counter()
+            latencies = await asyncio.gather(*(generate(i) for i in range(args.requests)))
+            elapsed, cpu = time.perf_counter() - start, time.process_time() - cpu_start
+
+        return latency_stats(latencies, elapsed, cpu)
+
+    return asyncio.run(main())
+
+
+def bench_chat(client, args) -> dict:
+    from gemini_ng import ChatSession
+    from gemini_ng.schemas import ImagePart, TextPart, VideoPart
+    from gemini_ng.schemas.part import FilePartData
+
+    video = VideoPart(
+        time_spans=[TextPart(text=f"{i // 60:02d}:{i % 60:02d}") for i in range(args.chat_frames)],
+        frames=[
+            ImagePart(
+                file_data=FilePartData(
+                    file_uri=f"https://example.com/files/frame{i}", mime_type="image/jpeg"
+                )
+            )
+            for i in range(args.chat_frames)
+        ],
+    )
+
+    def run_chat() -> tuple["ChatSession", list[float]]:
+        chat = client.start_chat(MODEL)
+        chat.send_message(["Describe this video.", video])
+
+        turn_latencies = []
+        for i in range(args.chat_turns):
+            start = time.perf_counter()
+            chat.send_message(f"Follow-up question {i}")
+            turn_latencies.append(time.perf_counter() - start)
+        return chat, turn_latencies
+
+    _, turn_latencies = run_chat()
+
+    tracemalloc.start()
+    chat, _ = run_chat()
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del chat
+
+    return {
+        "turn_p50_ms": float(np.percentile(np.array(turn_latencies) * 1000, 50)),
+        "last_turns_ms": float(np.mean(turn_latencies[-10:]) * 1000),
+        "memory_mb": current / 2**20,
+        "peak_memory_mb": peak / 2**20,
+    }
+
+
+def bench_upload_video(client, video_path: str, args) -> dict:
+    start = time.perf_counter()
+    video = client.upload_video(video_path, max_workers=args.concurrency)
+    frames_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    client.upload_video(video_path, mode="file")
+    file_seconds = time.perf_counter() - start
+
+    return {
+        "frames_mode_s": frames_seconds,
+        "frames_uploaded": len(video.frames),
+        "file_mode_s": file_seconds,
+    }
+
+
+def compare(results: dict, baseline: dict, tolerance: float) -> list[str]:
+    """Return a description of every metric that regressed beyond `tolerance`."""
+    regressions = []
+    for benchmark, metrics in results.items():
+        for name, value in metrics.items():
+            base = baseline.get(benchmark, {}).get(name)
+            # Counts describe the workload, not its performance.
+            if not base or name == "frames_uploaded":
+                continue
+
+            if name.endswith("_rps"):
+                change = (base - value) / base
+            else:
+                change = (value - base) / base
+
+            if change > tolerance:
+                regressions.append(
+                    f"{benchmark}.{name}: {value:.3f} vs baseline {base:.3f} ({change:+.0%})"
+                )
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--benchmarks", default=",".join(BENCHMARKS))
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--latency", type=float, default=0.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--chat-turns", type=int, default=100)
+    parser.add_argument("--chat-frames", type=int, default=300)
+    parser.add_argument("--video-seconds", type=int, default=20)
+    parser.add_argument("--output", help="Write the results as JSON to this file.")
+    parser.add_argument("--baseline", help="Compare with the results of an earlier run.")
+    parser.add_argument("--tolerance", type=float, default=0.2)
+    args = parser.parse_args()
+
+    benchmarks = args.benchmarks.split(",")
+    unknown = set(benchmarks) - set(BENCHMARKS)
+    if unknown:
+        parser.error(f"unknown benchmarks: {', '.join(sorted(unknown))}")
+
+    workdir = tempfile.mkdtemp(prefix="gemini_ng_bench_")
+    # Keep the upload and discovery caches of the benchmark away from the user's.
+    os.environ["GEMINI_NG_CACHE_DIR"] = os.path.join(workdir, "cache")
+    os.environ.pop("GEMINI_NG_DISCOVERY_DOCUMENT", None)
+
+    from gemini_ng import GeminiClient
+
+    server, base_url = start_server(
+        MockConfig(latency=args.latency, error_rate=args.error_rate)
+    )
+    api_key = "benchmark"
+    retry_policy = {"initial_backoff": 0.01, "max_backoff": 0.1} if args.error_rate else None
+
+    try:
+        client = GeminiClient(api_key=api_key, base_url=base_url, retry_policy=retry_policy)
+
+        results = {}
+        start = time.perf_counter()
+        client.genai_service
+        results["startup"] = {"discovery_ms": (time.perf_counter() - start) * 1000}
+
+        for name in benchmarks:
+            print(f"Running {name}...", file=sys.stderr)
+            if name == "generate":
+                results[name] = bench_generate(client, args)
+            elif name == "async_generate":
+                results[name] = bench_async_generate(base_url, api_key, args)
+            elif name == "stream":
+                results[name] = bench_stream(client, args)
+            elif name == "count_tokens":
+                results[name] = bench_count_tokens(client, args)
+            elif name == "chat":
+                results[name] = bench_chat(client, args)
+            elif name == "upload_video":
+                video_path = os.path.join(workdir, "synthetic.mp4")
+                make_synthetic_video(video_path, seconds=args.video_seconds)
+                results[name] = bench_upload_video(client, video_path, args)
+    finally:
+        server.terminate()
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    print(json.dumps(results, indent=2))
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(results, json.load(f), args.tolerance)
+        for regression in regressions:
+            print(f"REGRESSION {regression}", file=sys.stderr)
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
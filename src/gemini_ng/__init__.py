@@ -1,3 +1,7 @@
+from .async_client import AsyncGeminiClient
+from .chat import AsyncChatSession, ChatSession
 from .client import GeminiClient
+from .pool import GeminiClientPool
+from .session_store import ChatSessionStore
 
 __version__ = "0.1.4"
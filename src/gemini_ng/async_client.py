@@ -0,0 +1,277 @@
+import asyncio
+import json
+import os
+import uuid
+from typing import AsyncIterator
+
+import httpx
+
+from .chat import AsyncChatSession
+from .client import GEMINI_API_BASE_URL, BaseGeminiClient
+from .schemas import (
+    ChatMessage,
+    ChatHistory,
+    GenerationConfig,
+    GenerationRequest,
+    GenerationResponse,
+    LazyGenerationResponse,
+    HistoryPolicy,
+    SafetySetting,
+    ImagePart,
+    UploadFile,
+    UploadedFile,
+    ProxyInfo,
+)
+from .session_store import ChatSessionStore
+from .utils.error import handle_async_http_exception, map_http_exception
+from .utils.sse import SSEDecoder
+
+
+class AsyncGeminiClient(BaseGeminiClient):
+    """Asyncio counterpart of `GeminiClient`.
+
+    Requests go through a pooled `httpx.AsyncClient`, so many calls can be in
+    flight on a single event loop while reusing keep-alive connections.
+    """
+
+    def __init__(
+        self,
+        api_key: str | None = None,
+        version: str = "v1beta",
+        proxy_info: ProxyInfo | dict | None = None,
+        timeout: int | None = None,
+        max_connections: int = 100,
+        max_keepalive_connections: int = 20,
+        base_url: str = GEMINI_API_BASE_URL,
+    ):
+        super().__init__(api_key)
+
+        self.version = version
+
+        proxy = None
+        if proxy_info is not None:
+            if not isinstance(proxy_info, ProxyInfo):
+                proxy_info = ProxyInfo.model_validate(proxy_info)
+
+            proxy = proxy_info.to_url()
+
+        self.http_client = httpx.AsyncClient(
+            base_url=base_url,
+            headers={"x-goog-api-key": self.api_key},
+            timeout=timeout,
+            limits=httpx.Limits(
+                max_connections=max_connections,
+                max_keepalive_connections=max_keepalive_connections,
+            ),
+            proxy=proxy,
+        )
+
+    async def aclose(self):
+        await self.http_client.aclose()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        await self.aclose()
+
+    async def get_token_count(
+        self, model: str, prompt: GenerationRequest | list, use_cache: bool = True
+    ) -> int:
+        if not use_cache:
+            request = self._prepare_token_count_request(prompt)
+            return await self._count_tokens(
+                model, request.model_dump(by_alias=True, exclude_none=True)
+            )
+
+        units = self._token_count_units(prompt)
+        # The token count cache is on disk; keep its I/O off the event loop.
+        cache_keys, counts = await asyncio.to_thread(self._lookup_token_counts, model, units)
+        missing = [i for i, count in enumerate(counts) if count is None]
+        if not missing:
+            return sum(counts)
+
+        missing_counts = await asyncio.gather(
+            *(self._count_tokens(model, {"contents": [units[i]]}) for i in missing)
+        )
+
+        def store_counts():
+            for i, count in zip(missing, missing_counts):
+                self._store_token_count(cache_keys[i], count)
+
+        await asyncio.to_thread(store_counts)
+
+        for i, count in zip(missing, missing_counts):
+            counts[i] = count
+
+        return sum(counts)
+
+    @handle_async_http_exception
+    async def _count_tokens(self, model: str, body: dict) -> int:
+        rsp = await self.http_client.post(f"/{self.version}/{model}:countTokens", json=body)
+        rsp.raise_for_status()
+
+        return rsp.json()["totalTokens"]
+
+    async def generate(
+        self,
+        model: str,
+        prompt: GenerationRequest | ChatHistory | list | str,
+        generation_config: GenerationConfig | dict | None = None,
+        safety_settings: list[SafetySetting | dict] | None = None,
+        lazy: bool = False,
+    ) -> GenerationResponse | LazyGenerationResponse:
+        body = self._prepare_generation_body(
+            prompt,
+            generation_config=generation_config,
+            safety_settings=safety_settings,
+        )
+
+        return await self._generate(model, body, lazy=lazy)
+
+    @handle_async_http_exception
+    async def _generate(
+        self, model: str, body: dict, lazy: bool = False
+    ) -> GenerationResponse | LazyGenerationResponse:
+        rsp = await self.http_client.post(
+            f"/{self.version}/{model}:generateContent",
+            json=body,
+        )
+        rsp.raise_for_status()
+
+        if lazy:
+            return LazyGenerationResponse(rsp.json())
+        return GenerationResponse.model_validate(rsp.json())
+
+    async def generate_stream(
+        self,
+        model: str,
+        prompt: GenerationRequest | ChatHistory | list | str,
+        generation_config: GenerationConfig | dict | None = None,
+        safety_settings: list[SafetySetting | dict] | None = None,
+    ) -> AsyncIterator[GenerationResponse]:
+        body = self._prepare_generation_body(
+            prompt,
+            generation_config=generation_config,
+            safety_settings=safety_settings,
+        )
+
+        async for chunk in self._generate_stream(model, body):
+            yield chunk
+
+    async def _generate_stream(self, model: str, body: dict) -> AsyncIterator[GenerationResponse]:
+        async with self.http_client.stream(
+            "POST",
+            f"/{self.version}/{model}:streamGenerateContent",
+            params={"alt": "sse"},
+            json=body,
+        ) as rsp:
+            if rsp.is_error:
+                await rsp.aread()
+                try:
+                    rsp.raise_for_status()
+                except httpx.HTTPStatusError as e:
+                    raise map_http_exception(e.response.status_code, e)
+
+            decoder = SSEDecoder()
+            async for line in rsp.aiter_lines():
+                data = decoder.decode(line)
+                if data is not None:
+                    yield GenerationResponse.model_validate_json(data)
+
+            data = decoder.flush()
+            if data is not None:
+                yield GenerationResponse.model_validate_json(data)
+
+    def start_chat(
+        self,
+        model: str,
+        history: list[ChatMessage] | ChatHistory | None = None,
+        generation_config: GenerationConfig | dict | None = None,
+        safety_settings: list[SafetySetting | dict] | None = None,
+        history_policy: HistoryPolicy | dict | None = None,
+        store: ChatSessionStore | None = None,
+        session_id: str | None = None,
+    ) -> AsyncChatSession:
+        if isinstance(history, ChatHistory):
+            history = history.messages
+
+        return AsyncChatSession(
+            self,
+            model,
+            history=history,
+            generation_config=generation_config,
+            safety_settings=safety_settings,
+            history_policy=history_policy,
+            store=store,
+            session_id=session_id,
+        )
+
+    async def upload_image(self, image_path: str) -> ImagePart:
+        if not os.path.exists(image_path):
+            raise FileNotFoundError(f"Image file not found: {image_path}")
+
+        uploaded_file = await self._upload_file(
+            UploadFile.from_path(
+                image_path,
+                body={"file": {"displayName": os.path.basename(image_path)}},
+            )
+        )
+
+        return uploaded_file.to_file_part()
+
+    @handle_async_http_exception
+    async def _upload_file(self, file: UploadFile) -> UploadedFile:
+        cache_key, uploaded_file = await asyncio.to_thread(
+            self._lookup_uploaded_file, file
+        )
+        if uploaded_file is not None:
+            return uploaded_file
+
+        data = file.data
+        if data is None:
+            data = await asyncio.to_thread(_read_file, file.file_path)
+
+        boundary = uuid.uuid4().hex
+        content = _encode_multipart_related(
+            boundary,
+            json.dumps(file.body or {}).encode("utf-8"),
+            data,
+            file.mime_type or "application/octet-stream",
+        )
+
+        rsp = await self.http_client.post(
+            f"/upload/{self.version}/files",
+            params={"uploadType": "multipart"},
+            headers={"Content-Type": f"multipart/related; boundary={boundary}"},
+            content=content,
+        )
+        rsp.raise_for_status()
+
+        uploaded_file = UploadedFile.model_validate(rsp.json()["file"])
+
+        await asyncio.to_thread(self._store_uploaded_file, cache_key, uploaded_file)
+
+        return uploaded_file
+
+    async def _upload_files(self, *files: list[UploadFile]) -> list[UploadedFile]:
+        return await asyncio.gather(*(self._upload_file(file) for file in files))
+
+
+def _read_file(file_path: str) -> bytes:
+    with open(file_path, "rb") as f:
+        return f.read()
+
+
+def _encode_multipart_related(
+    boundary: str, metadata: bytes, data: bytes, mime_type: str
+) -> bytes:
+    return b"".join([
+        f"--{boundary}\r\n".encode(),
+        b"Content-Type: application/json; charset=UTF-8\r\n\r\n",
+        metadata,
+        f"\r\n--{boundary}\r\n".encode(),
+        f"Content-Type: {mime_type}\r\n\r\n".encode(),
+        data,
+        f"\r\n--{boundary}--\r\n".encode(),
+    ])
@@ -1,12 +1,23 @@
-from typing import TYPE_CHECKING
+import asyncio
+import uuid
+from typing import TYPE_CHECKING, AsyncIterator, Iterator
 
 from .schemas import (
-    ChatMessage, ChatHistory, GenerationConfig, GenerationResponse, SafetySetting
+    ChatMessage,
+    GenerationConfig,
+    GenerationRequest,
+    GenerationResponse,
+    HistoryPolicy,
+    SafetySetting,
+    TextPart,
 )
+from .utils.metrics import timed
 
 
 if TYPE_CHECKING:
+    from .async_client import AsyncGeminiClient
     from .client import GeminiClient
+    from .session_store import ChatSessionStore
 
 
 class ChatSession:
@@ -17,12 +28,43 @@ class ChatSession:
         history: list[ChatMessage] | None = None,
         generation_config: GenerationConfig | dict | None = None,
         safety_settings: list[SafetySetting | dict] | None = None,
+        history_policy: HistoryPolicy | dict | None = None,
+        store: "ChatSessionStore | None" = None,
+        session_id: str | None = None,
     ):
+        if history_policy is not None and not isinstance(history_policy, HistoryPolicy):
+            history_policy = HistoryPolicy.model_validate(history_policy)
+
         self.client = client
         self.model = model
         self.history = history or []
         self.generation_config = generation_config
         self.safety_settings = safety_settings
+        self.history_policy = history_policy
+
+        # Token counts of history messages, keyed by `id(message)`. Messages are
+        # not modified once appended, so each one is counted only once.
+        self._token_counts: dict[int, int] = {}
+
+        # Serialized form of the leading history messages, paired with the
+        # message it was dumped from, so every message is dumped only once.
+        self._serialized: list[tuple[ChatMessage, dict]] = []
+        # Dumps of user messages built straight from their prompts, by message id.
+        self._prompt_dumps: dict[int, tuple[ChatMessage, dict]] = {}
+
+        self.store = store
+        self.session_id = session_id
+        # Whether the session is registered in the store.
+        self._session_created = False
+        if store is not None:
+            self._create_session()
+
+        # Number of leading history messages already in the store, ids of the
+        # messages whose token count is stored, and whether the history changed
+        # in a way that appending cannot express.
+        self._num_persisted = 0
+        self._persisted_counts: set[int] = set()
+        self._history_rewritten = False
 
     def send_message(
         self,
@@ -30,26 +72,437 @@ class ChatSession:
         generation_config: GenerationConfig | dict | None = None,
         safety_settings: list[SafetySetting | dict] | None = None,
     ) -> GenerationResponse:
+        chat_message = self._append_message(message)
+        rsp = None
+        try:
+            with timed("chat.history_policy"):
+                self._apply_history_policy()
+
+            rsp = self.client._generate(
+                self.model, self._request_body(generation_config, safety_settings)
+            )
+        finally:
+            self._finish_turn(chat_message, rsp)
+            self._persist()
+
+        return rsp
+
+    def send_message_stream(
+        self,
+        message: list | str,
+        generation_config: GenerationConfig | dict | None = None,
+        safety_settings: list[SafetySetting | dict] | None = None,
+    ) -> Iterator[GenerationResponse]:
+        chat_message = self._append_message(message)
+        chunks = []
+        try:
+            with timed("chat.history_policy"):
+                self._apply_history_policy()
+
+            for chunk in self.client._generate_stream(
+                self.model, self._request_body(generation_config, safety_settings)
+            ):
+                chunks.append(chunk)
+                yield chunk
+        finally:
+            # Also runs when the stream fails or the caller stops early: the
+            # reply received so far is kept.
+            self._finish_turn(chat_message, _assemble_chunks(chunks))
+            self._persist()
+
+    def clear(self):
+        if self.store is not None:
+            self.store.clear_messages(self.session_id)
+        self._reset_history()
+
+    def _reset_history(self):
+        self.history = []
+        self._token_counts = {}
+        self._serialized = []
+        self._prompt_dumps = {}
+
+        self._num_persisted = 0
+        self._persisted_counts = set()
+        self._history_rewritten = False
+
+    def _request_body(
+        self,
+        generation_config: GenerationConfig | dict | None = None,
+        safety_settings: list[SafetySetting | dict] | None = None,
+    ) -> dict:
+        with timed("chat.serialize"):
+            return self.client._build_generation_body(
+                self._serialized_history(),
+                generation_config=generation_config or self.generation_config,
+                safety_settings=safety_settings or self.safety_settings,
+            )
+
+    def _serialized_history(self) -> list[dict]:
+        # Reuse the dumps of the unchanged prefix of the history; only messages
+        # appended (or inserted by a history policy) since are dumped.
+        num_reused = 0
+        for (message, _), current in zip(self._serialized, self.history):
+            if message is not current:
+                break
+            num_reused += 1
+
+        del self._serialized[num_reused:]
+        self._serialized.extend(
+            (message, self._dump_message(message)) for message in self.history[num_reused:]
+        )
+        self._prompt_dumps = {}
+
+        return [data for _, data in self._serialized]
+
+    def _dump_message(self, message: ChatMessage) -> dict:
+        prompt_message, data = self._prompt_dumps.get(id(message), (None, None))
+        if prompt_message is message:
+            return data
+        return message.model_dump(by_alias=True, exclude_none=True)
+
+    def _append_message(self, message: list | str) -> ChatMessage:
         parts = self.client.normalize_prompt(message)
-        self.history.append(ChatMessage(role="user", parts=parts))
+        chat_message = ChatMessage(role="user", parts=parts)
+        self.history.append(chat_message)
 
-        rsp = self.client.generate(
-            self.model,
-            ChatHistory(messages=self.history),
-            generation_config=generation_config or self.generation_config,
-            safety_settings=safety_settings or self.safety_settings,
+        # Serialize the message from the prompt, which reuses the cached dumps
+        # of compact videos.
+        self._prompt_dumps[id(chat_message)] = (
+            chat_message,
+            {
+                "role": "user",
+                "parts": [
+                    part for item in self.client._serialize_prompt_items(message) for part in item
+                ],
+            },
         )
+
+        return chat_message
+
+    def _append_reply(self, rsp: GenerationResponse):
         if len(rsp.candidates) > 0 and rsp.candidates[0].content is not None:
             rsp_parts = rsp.candidates[0].content.parts
             self.history.append(ChatMessage(role="model", parts=rsp_parts))
 
-        return rsp
+    def _finish_turn(self, chat_message: ChatMessage, rsp: GenerationResponse | None):
+        """Append the reply to `chat_message`, or drop the message if no reply arrived.
 
-    def clear(self):
-        self.history = []
+        Otherwise the next turn would send two user messages in a row.
+        """
+        if rsp is not None:
+            self._append_reply(rsp)
+        elif self.history and self.history[-1] is chat_message:
+            self.history.pop()
+            self._prompt_dumps.pop(id(chat_message), None)
+            self._token_counts.pop(id(chat_message), None)
+
+    def _create_session(self):
+        self.session_id = self.store.create_session(
+            self.model,
+            session_id=self.session_id,
+            generation_config=self.generation_config,
+            safety_settings=self.safety_settings,
+            history_policy=self.history_policy,
+        )
+        self._session_created = True
+
+    def _persist(self):
+        """Write the messages and token counts not yet in the store."""
+        if self.store is None:
+            return
+
+        with timed("chat.persist"):
+            self._write_to_store()
+
+    def _write_to_store(self):
+        token_counts = {
+            seq: self._token_counts[id(message)]
+            for seq, message in enumerate(self.history)
+            if id(message) in self._token_counts
+            and (self._history_rewritten or id(message) not in self._persisted_counts)
+        }
+
+        if self._history_rewritten:
+            self.store.replace_messages(self.session_id, self.history, token_counts)
+            self._persisted_counts = set()
+            self._history_rewritten = False
+        else:
+            self.store.append_messages(
+                self.session_id,
+                self._num_persisted,
+                self.history[self._num_persisted:],
+                token_counts,
+            )
+
+        self._num_persisted = len(self.history)
+        self._persisted_counts.update(id(self.history[seq]) for seq in token_counts)
+
+    def _resume(self, store: "ChatSessionStore", session_id: str, token_counts: dict[int, int]):
+        """Attach the stored session the history was loaded from, with token counts by position."""
+        self.store = store
+        self.session_id = session_id
+        self._session_created = True
+        self._num_persisted = len(self.history)
+        self._token_counts = {
+            id(self.history[seq]): count for seq, count in token_counts.items()
+        }
+        self._persisted_counts = set(self._token_counts)
+        self._history_rewritten = False
+
+    def _apply_history_policy(self):
+        if self.history_policy is None:
+            return
+
+        if self.history_policy.max_tokens is not None:
+            for message in self._uncounted_messages():
+                self._token_counts[id(message)] = self.client.get_token_count(
+                    self.model, GenerationRequest(contents=[message])
+                )
+
+        num_dropped = self._plan_truncation()
+        if num_dropped == 0:
+            return
+
+        summary = None
+        if self.history_policy.summarize:
+            rsp = self.client.generate(
+                self.history_policy.summary_model or self.model,
+                self._summary_prompt(num_dropped),
+                generation_config=GenerationConfig(
+                    max_output_tokens=self.history_policy.summary_max_tokens
+                ),
+            )
+            summary = _response_text(rsp)
+
+        self._truncate(num_dropped, summary)
+
+    def _uncounted_messages(self) -> list[ChatMessage]:
+        message_ids = {id(message) for message in self.history}
+        for message_id in list(self._token_counts):
+            if message_id not in message_ids:
+                del self._token_counts[message_id]
+
+        return [
+            message for message in self.history if id(message) not in self._token_counts
+        ]
+
+    def _plan_truncation(self) -> int:
+        """Return how many messages after the pinned turns must be dropped to fit the policy."""
+        policy = self.history_policy
+
+        start = _turn_start(self.history, policy.pinned_turns)
+        # The message being sent is never dropped.
+        stop = len(self.history) - 1
+
+        turns = sum(1 for message in self.history[start:] if message.role == "user")
+        tokens = 0
+        if policy.max_tokens is not None:
+            tokens = sum(self._token_counts[id(message)] for message in self.history)
+
+        def over_budget(dropping: bool) -> bool:
+            # A summary, if any, takes the place of the dropped turns. Summarized
+            # history is cut below the limits, so the next turns fit without
+            # summarizing again.
+            summary = policy.summarize and dropping
+            target = policy.summary_target if summary else 1.0
+            if policy.max_turns is not None and turns + summary > policy.max_turns * target:
+                return True
+            return policy.max_tokens is not None and (
+                tokens + summary * policy.summary_max_tokens > policy.max_tokens * target
+            )
+
+        if not over_budget(dropping=False):
+            return 0
+
+        end = start
+        while end < stop and over_budget(dropping=True):
+            # Drop a whole turn: a user message and every reply up to the next one.
+            turns -= self.history[end].role == "user"
+            tokens -= self._token_counts.get(id(self.history[end]), 0)
+            end += 1
+            while end < stop and self.history[end].role != "user":
+                tokens -= self._token_counts.get(id(self.history[end]), 0)
+                end += 1
+
+        return end - start
+
+    def _summary_prompt(self, num_dropped: int) -> str:
+        start = _turn_start(self.history, self.history_policy.pinned_turns)
+
+        lines = [self.history_policy.summary_prompt, ""]
+        for message in self.history[start:start + num_dropped]:
+            text = "".join(
+                part.text if isinstance(part, TextPart) else f"[file: {part.file_data.file_uri}]"
+                for part in message.parts
+            )
+            lines.append(f"{message.role}: {text}")
+
+        return "\n".join(lines)
+
+    def _truncate(self, num_dropped: int, summary: str | None):
+        start = _turn_start(self.history, self.history_policy.pinned_turns)
+
+        replacement = []
+        if summary:
+            replacement = [
+                ChatMessage(
+                    role="user",
+                    parts=[TextPart(text=f"Summary of the earlier conversation:\n{summary}")],
+                ),
+                ChatMessage(role="model", parts=[TextPart(text="Understood.")]),
+            ]
+
+        for message in self.history[start:start + num_dropped]:
+            self._token_counts.pop(id(message), None)
+
+        self.history[start:start + num_dropped] = replacement
+        self._history_rewritten = True
 
     def __enter__(self):
         return self
 
     def __exit__(self, exc_type, exc_val, exc_tb):
-        self.clear()
+        # A stored conversation outlives the context; it can be resumed with
+        # `ChatSessionStore.load`.
+        if self.store is None:
+            self.clear()
+
+
+class AsyncChatSession(ChatSession):
+    """Asyncio counterpart of `ChatSession`.
+
+    Store writes run in a worker thread, so SQLite I/O never blocks the event
+    loop. A new session is therefore registered in the store before its first
+    turn rather than on construction; its id is known right away.
+    """
+
+    client: "AsyncGeminiClient"
+
+    async def send_message(
+        self,
+        message: list | str,
+        generation_config: GenerationConfig | dict | None = None,
+        safety_settings: list[SafetySetting | dict] | None = None,
+    ) -> GenerationResponse:
+        await self._ensure_session()
+        chat_message = self._append_message(message)
+        rsp = None
+        try:
+            with timed("chat.history_policy"):
+                await self._apply_history_policy()
+
+            rsp = await self.client._generate(
+                self.model, self._request_body(generation_config, safety_settings)
+            )
+        finally:
+            self._finish_turn(chat_message, rsp)
+            await self._apersist()
+
+        return rsp
+
+    async def send_message_stream(
+        self,
+        message: list | str,
+        generation_config: GenerationConfig | dict | None = None,
+        safety_settings: list[SafetySetting | dict] | None = None,
+    ) -> AsyncIterator[GenerationResponse]:
+        await self._ensure_session()
+        chat_message = self._append_message(message)
+        chunks = []
+        try:
+            with timed("chat.history_policy"):
+                await self._apply_history_policy()
+
+            async for chunk in self.client._generate_stream(
+                self.model, self._request_body(generation_config, safety_settings)
+            ):
+                chunks.append(chunk)
+                yield chunk
+        finally:
+            self._finish_turn(chat_message, _assemble_chunks(chunks))
+            await self._apersist()
+
+    async def clear(self):
+        if self.store is not None:
+            await asyncio.to_thread(self.store.clear_messages, self.session_id)
+        self._reset_history()
+
+    def _create_session(self):
+        # Only pick the id here; `_ensure_session` registers it off the loop.
+        self.session_id = self.session_id or uuid.uuid4().hex
+
+    async def _ensure_session(self):
+        if self.store is not None and not self._session_created:
+            await asyncio.to_thread(super()._create_session)
+
+    async def _apersist(self):
+        if self.store is not None:
+            await asyncio.to_thread(self._persist)
+
+    async def _apply_history_policy(self):
+        if self.history_policy is None:
+            return
+
+        if self.history_policy.max_tokens is not None:
+            messages = self._uncounted_messages()
+            counts = await asyncio.gather(*(
+                self.client.get_token_count(self.model, GenerationRequest(contents=[message]))
+                for message in messages
+            ))
+            for message, count in zip(messages, counts):
+                self._token_counts[id(message)] = count
+
+        num_dropped = self._plan_truncation()
+        if num_dropped == 0:
+            return
+
+        summary = None
+        if self.history_policy.summarize:
+            rsp = await self.client.generate(
+                self.history_policy.summary_model or self.model,
+                self._summary_prompt(num_dropped),
+                generation_config=GenerationConfig(
+                    max_output_tokens=self.history_policy.summary_max_tokens
+                ),
+            )
+            summary = _response_text(rsp)
+
+        self._truncate(num_dropped, summary)
+
+    def __enter__(self):
+        raise TypeError("use 'async with' with AsyncChatSession")
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        raise TypeError("use 'async with' with AsyncChatSession")
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        if self.store is None:
+            await self.clear()
+
+
+def _assemble_chunks(chunks: list[GenerationResponse]) -> GenerationResponse | None:
+    return GenerationResponse.from_stream_chunks(chunks) if chunks else None
+
+
+def _turn_start(history: list[ChatMessage], num_turns: int) -> int:
+    """Index of the first message after the first `num_turns` turns of `history`."""
+    if num_turns <= 0:
+        return 0
+
+    turns = 0
+    for i, message in enumerate(history):
+        if message.role == "user":
+            if turns == num_turns:
+                return i
+            turns += 1
+
+    return len(history)
+
+
+def _response_text(rsp: GenerationResponse) -> str | None:
+    if len(rsp.candidates) == 0 or rsp.candidates[0].content is None:
+        return None
+    return rsp.candidates[0].text
@@ -1,66 +1,97 @@
 import hashlib
+import io
+import mimetypes
 import os
-import tempfile
+import threading
+import time
+from typing import BinaryIO, Callable, Iterable, Iterator, Literal, TypeVar
 
 import httplib2
 import requests
 import googleapiclient.discovery as g_discovery
+from googleapiclient.errors import HttpError
+from googleapiclient.http import MediaFileUpload, MediaIoBaseUpload
+from pydantic import BaseModel
 from tqdm import tqdm
 
 from .chat import ChatSession
 from .schemas import (
+    BatchResult,
     ChatMessage,
     ChatHistory,
     GenerationConfig,
     GenerationRequest,
     GenerationRequestParts,
     GenerationResponse,
+    LazyGenerationResponse,
+    HistoryPolicy,
     SafetySetting,
     TextPart,
     ImagePart,
     FilePart,
     VideoPart,
+    CompactVideoPart,
     UploadFile,
     UploadedFile,
     ProxyInfo,
+    RateLimit,
+    RetryPolicy,
+    ResponseCacheConfig,
+    FrameDirectoryConfig,
+    FrameEncodingConfig,
+    VideoSamplingConfig,
 )
-from .utils.cache import get_cache_instance
-from .utils.error import handle_http_exception
-from .utils.video import extract_video_frames
+from .schemas.part import format_time_span, time_span_precision
+from .session_store import ChatSessionStore
+from .utils.cache import canonical_hash, get_cache_instance, get_response_cache_instance
+from .utils.concurrency import ObjectPool, imap_batch_results, imap_bounded
+from .utils.discovery import load_discovery_document
+from .utils.error import FileProcessingError, handle_http_exception
+from .utils.frames import scan_frame_directory
+from .utils.hashing import get_file_sha256, iter_file_sha256
+from .utils.metrics import increment, metrics_enabled, timed
+from .utils.rate_limit import RateLimiter
+from .utils.retry import retry_call
+from .utils.singleflight import SingleFlight
+from .utils.sse import SSEDecoder
+from .utils.tokens import TokenEstimate, estimate_request_tokens, estimate_tokens, token_count_key
+from .utils.video import EncodedFrame, iter_encoded_video_frames
 
+T = TypeVar("T")
+R = TypeVar("R")
+M = TypeVar("M", bound=BaseModel)
 
-class GeminiClient:
-    def __init__(
-        self,
-        api_key: str | None = None,
-        version: str = "v1beta",
-        proxy_info: ProxyInfo | dict | None = None,
-        timeout: int | None = None,
-    ):
-        api_key = api_key or os.getenv("GEMINI_NG_API_KEY")
+# Called with the number of bytes uploaded so far and the total size, if known.
+ProgressCallback = Callable[[int, int | None], None]
 
-        if api_key is None:
-            raise ValueError("Gemini API (`GEMINI_NG_API_KEY`) key must be provided")
 
-        self.api_key = api_key
+GEMINI_API_BASE_URL = "https://generativelanguage.googleapis.com"
 
-        rsp = requests.get(
-            "https://generativelanguage.googleapis.com/$discovery/rest",
-            params={"version": version, "key": api_key},
-        )
-        rsp.raise_for_status()
+# Cached uploads are only reused while they stay alive at least this long (seconds).
+UPLOAD_EXPIRATION_MARGIN = 60 * 60
 
-        if proxy_info is not None:
-            if not isinstance(proxy_info, ProxyInfo):
-                proxy_info = ProxyInfo.model_validate(proxy_info)
+# Chunk size of resumable uploads; must be a multiple of 256 KiB. Files larger
+# than one chunk are uploaded resumably.
+UPLOAD_CHUNK_SIZE = 8 * 1024 * 1024
 
-            proxy_info = proxy_info.to_httplib2_proxy_info()
+# The server keeps resumable upload sessions for about a week (seconds).
+UPLOAD_SESSION_TTL = 6 * 24 * 60 * 60
 
-        http = httplib2.Http(timeout=timeout, proxy_info=proxy_info)
+# Seconds between two polls of a file that is still being processed.
+FILE_POLL_INTERVAL = 2.0
+
+# How long token counts of message contents stay cached.
+TOKEN_COUNT_CACHE_TTL = 30 * 24 * 3600
 
-        self.genai_service = g_discovery.build_from_document(
-            rsp.content, developerKey=api_key, http=http
-        )
+
+class BaseGeminiClient:
+    def __init__(self, api_key: str | None = None):
+        api_key = api_key or os.getenv("GEMINI_NG_API_KEY")
+
+        if api_key is None:
+            raise ValueError("Gemini API (`GEMINI_NG_API_KEY`) key must be provided")
+
+        self.api_key = api_key
 
     @staticmethod
     def normalize_prompt(prompt: list | str) -> list:
@@ -74,58 +105,569 @@ class GeminiClient:
                 parts.append(TextPart(text=part if i == 0 else "\n" + part))
             elif isinstance(part, (TextPart, FilePart, ImagePart)):
                 parts.append(part)
-            elif isinstance(part, VideoPart):
+            elif isinstance(part, (VideoPart, CompactVideoPart)):
                 parts.extend(part.content_parts())
             else:
                 raise ValueError(f"Invalid prompt part type: {type(part)} ({part})")
 
         return parts
 
-    @handle_http_exception
-    def get_token_count(self, model: str, prompt: GenerationRequest | list) -> int:
+    @staticmethod
+    def _serialize_prompt_items(prompt: list | str) -> list[list[dict]]:
+        """Serialized parts of each item of `prompt`, as `normalize_prompt` would produce them.
+
+        Videos in compact form contribute their cached serialized parts, so
+        they are not dumped again for every request.
+        """
+        if isinstance(prompt, str):
+            prompt = [prompt]
+
+        items = []
+        for i, part in enumerate(prompt):
+            if isinstance(part, str):
+                items.append([{"text": part if i == 0 else "\n" + part}])
+            elif isinstance(part, CompactVideoPart):
+                items.append(part.serialized_parts())
+            elif isinstance(part, (TextPart, FilePart, ImagePart)):
+                items.append([part.model_dump(by_alias=True, exclude_none=True)])
+            elif isinstance(part, VideoPart):
+                items.append([
+                    p.model_dump(by_alias=True, exclude_none=True) for p in part.content_parts()
+                ])
+            else:
+                raise ValueError(f"Invalid prompt part type: {type(part)} ({part})")
+
+        return items
+
+    def _prepare_token_count_request(self, prompt: GenerationRequest | list) -> GenerationRequest:
+        if isinstance(prompt, GenerationRequest):
+            return prompt
+
+        parts = self.normalize_prompt(prompt)
+        return GenerationRequest(contents=[GenerationRequestParts(parts=parts)])
+
+    def estimate_token_count(self, prompt: GenerationRequest | list) -> TokenEstimate:
+        """Estimate the input tokens of `prompt` offline, e.g. for pre-flight budgeting."""
+        return estimate_tokens({"contents": self._token_count_units(prompt)})
+
+    def _token_count_units(self, prompt: GenerationRequest | list) -> list[dict]:
+        """Split `prompt` into the serialized contents whose counts are cached.
+
+        A request is split into its messages and a prompt list into its items,
+        so a video or a chat history that is sent again is not recounted.
+        """
+        if isinstance(prompt, GenerationRequest):
+            contents = prompt.model_dump(by_alias=True, exclude_none=True)["contents"]
+            return [contents] if isinstance(contents, dict) else contents
+
+        return [{"parts": parts} for parts in self._serialize_prompt_items(prompt) if parts]
+
+    def _lookup_token_counts(
+        self, model: str, units: list[dict]
+    ) -> tuple[list[str], list[int | None]]:
+        cache = get_cache_instance()
+
+        cache_keys = [f"tokens_{model}_{token_count_key(unit)}" for unit in units]
+        counts = [cache.get(cache_key) for cache_key in cache_keys]
+
+        misses = counts.count(None)
+        increment("cache.hit", len(counts) - misses, cache="token_count")
+        increment("cache.miss", misses, cache="token_count")
+
+        return cache_keys, counts
+
+    def _store_token_count(self, cache_key: str, count: int):
+        get_cache_instance().set(cache_key, count, expire=TOKEN_COUNT_CACHE_TTL)
+
+    def _prepare_generation_request(
+        self,
+        prompt: GenerationRequest | ChatHistory | list | str,
+        generation_config: GenerationConfig | dict | None = None,
+        safety_settings: list[SafetySetting | dict] | None = None,
+    ) -> GenerationRequest:
         if isinstance(prompt, GenerationRequest):
             request = prompt
+        elif isinstance(prompt, ChatHistory):
+            request = GenerationRequest(contents=prompt.messages)
         else:
             parts = self.normalize_prompt(prompt)
-            request = GenerationRequest(contents=[GenerationRequestParts(parts=parts)])
-
-        rsp = (
-            self.genai_service
-                .models()
-                .getTokenCount(
-                    model=model,
-                    body=request.model_dump(by_alias=True, exclude_none=True),
+            request = GenerationRequest(
+                contents=[GenerationRequestParts(parts=parts)]
+            )
+
+        if generation_config is not None:
+            if not isinstance(generation_config, GenerationConfig):
+                generation_config = GenerationConfig.model_validate(generation_config)
+            request.generation_config = generation_config
+
+        if safety_settings is not None:
+            safety_settings = [
+                safety_setting
+                if isinstance(safety_setting, SafetySetting)
+                else SafetySetting.model_validate(safety_setting)
+                for safety_setting in safety_settings
+            ]
+            request.safety_settings = safety_settings
+
+        return request
+
+    def _prepare_generation_body(
+        self,
+        prompt: GenerationRequest | ChatHistory | list | str,
+        generation_config: GenerationConfig | dict | None = None,
+        safety_settings: list[SafetySetting | dict] | None = None,
+    ) -> dict:
+        with timed("generate.serialize"):
+            if isinstance(prompt, (list, str)):
+                # Plain prompts are serialized part by part, reusing the cached
+                # dumps of compact videos.
+                parts = [
+                    part for item in self._serialize_prompt_items(prompt) for part in item
+                ]
+                return self._build_generation_body(
+                    [{"parts": parts}],
+                    generation_config=generation_config,
+                    safety_settings=safety_settings,
+                )
+
+            request = self._prepare_generation_request(
+                prompt,
+                generation_config=generation_config,
+                safety_settings=safety_settings,
+            )
+            return request.model_dump(by_alias=True, exclude_none=True)
+
+    @staticmethod
+    def _build_generation_body(
+        contents: list[dict],
+        generation_config: GenerationConfig | dict | None = None,
+        safety_settings: list[SafetySetting | dict] | None = None,
+    ) -> dict:
+        """Build a request body around already serialized `contents`.
+
+        Only the small configuration objects are validated and dumped; the
+        contents are used as they are.
+        """
+        body = {"contents": contents}
+
+        if generation_config is not None:
+            body["generationConfig"] = _validate(
+                GenerationConfig, generation_config
+            ).model_dump(by_alias=True, exclude_none=True)
+
+        if safety_settings is not None:
+            body["safetySettings"] = [
+                _validate(SafetySetting, safety_setting).model_dump(
+                    by_alias=True, exclude_none=True
                 )
-                .execute()
+                for safety_setting in safety_settings
+            ]
+
+        return body
+
+    def _file_cache_key(self, sha256_hash: str) -> str:
+        return f"{self.api_key}_file_{sha256_hash}"
+
+    def _lookup_uploaded_file(
+        self, file: UploadFile, sha256_hash: str | None = None
+    ) -> tuple[str, UploadedFile | None]:
+        cache = get_cache_instance()
+
+        if sha256_hash is None and file.data is not None:
+            sha256_hash = hashlib.sha256(file.data).hexdigest()
+        elif sha256_hash is None:
+            sha256_hash = get_file_sha256(file.file_path, cache)
+
+        cache_key = self._file_cache_key(sha256_hash)
+
+        cached_obj = cache.get(cache_key)
+        if cached_obj:
+            uploaded_file = UploadedFile.model_validate(cached_obj)
+            # Re-upload files that expire (or are about to) on the server.
+            if not uploaded_file.is_expired(margin=UPLOAD_EXPIRATION_MARGIN):
+                increment("cache.hit", cache="upload")
+                return cache_key, uploaded_file
+
+        increment("cache.miss", cache="upload")
+        return cache_key, None
+
+    def _store_uploaded_file(self, cache_key: str, uploaded_file: UploadedFile):
+        expire = uploaded_file.seconds_until_expiration()
+        if expire is not None:
+            expire -= UPLOAD_EXPIRATION_MARGIN
+            if expire <= 0:
+                return
+
+        get_cache_instance().set(
+            cache_key,
+            uploaded_file.model_dump(by_alias=True, exclude_none=True),
+            expire=expire,
         )
 
-        return rsp["totalTokens"]
+
+class GeminiClient(BaseGeminiClient):
+    def __init__(
+        self,
+        api_key: str | None = None,
+        version: str = "v1beta",
+        proxy_info: ProxyInfo | dict | None = None,
+        timeout: int | None = None,
+        rate_limit: RateLimit | dict | None = None,
+        model_rate_limits: dict[str, RateLimit | dict] | None = None,
+        retry_policy: RetryPolicy | dict | None = None,
+        response_cache: ResponseCacheConfig | dict | bool = False,
+        discovery_document: str | bytes | dict | None = None,
+        upload_chunk_size: int = UPLOAD_CHUNK_SIZE,
+        base_url: str = GEMINI_API_BASE_URL,
+        max_keepalive_connections: int = 20,
+    ):
+        super().__init__(api_key)
+
+        if upload_chunk_size <= 0 or upload_chunk_size % (256 * 1024) != 0:
+            raise ValueError("`upload_chunk_size` must be a positive multiple of 256 KiB")
+
+        if proxy_info is not None and not isinstance(proxy_info, ProxyInfo):
+            proxy_info = ProxyInfo.model_validate(proxy_info)
+
+        self.base_url = base_url.rstrip("/")
+        self.version = version
+        self.timeout = timeout
+        self.proxy_info = proxy_info
+
+        # Neither `httplib2.Http` nor `requests.Session` may be used by two
+        # threads at once, so each call checks a transport out of a pool. The
+        # discovery service and the caches are shared by all threads.
+        self._http_pool = ObjectPool(
+            self._new_http, max_idle=max_keepalive_connections, close=httplib2.Http.close
+        )
+        self._session_pool = ObjectPool(
+            self._new_session, max_idle=max_keepalive_connections, close=requests.Session.close
+        )
+
+        # Limits are keyed by model for `generate`, by `<model>:countTokens` for
+        # `get_token_count` and by `files` for uploads; `rate_limit` applies to
+        # every key without an entry in `model_rate_limits`.
+        self.rate_limiter = None
+        if rate_limit is not None or model_rate_limits:
+            self.rate_limiter = RateLimiter(
+                default=_validate(RateLimit, rate_limit),
+                limits={
+                    key: _validate(RateLimit, limit)
+                    for key, limit in (model_rate_limits or {}).items()
+                },
+            )
+
+        self.retry_policy = _validate(RetryPolicy, retry_policy)
+
+        self.upload_chunk_size = upload_chunk_size
+
+        if response_cache is True:
+            response_cache = ResponseCacheConfig()
+        self.response_cache = _validate(ResponseCacheConfig, response_cache or None)
+
+        # The discovery service is built on first use, so constructing a client
+        # costs no network round trip.
+        self.discovery_document = discovery_document
+        self._genai_service = None
+        self._genai_service_lock = threading.Lock()
+
+        # Identical uploads, token counts and deterministic generations that
+        # are in flight at the same time share one request.
+        self._single_flight = SingleFlight()
+
+    @property
+    def genai_service(self):
+        if self._genai_service is None:
+            with self._genai_service_lock:
+                if self._genai_service is None:
+                    self._genai_service = self._build_service()
+        return self._genai_service
+
+    def _build_service(self):
+        with timed("discovery.build"):
+            return self._build_service_from_document()
+
+    def _build_service_from_document(self):
+        document = load_discovery_document(
+            self.base_url, self.version, self.api_key, self.discovery_document
+        )
+
+        try:
+            return g_discovery.build_from_document(
+                document, developerKey=self.api_key, http=self._new_http()
+            )
+        except (ValueError, KeyError, TypeError, g_discovery.InvalidJsonError):
+            if self.discovery_document is not None:
+                raise
+
+            # The cached document is unusable; fetch a fresh copy.
+            document = load_discovery_document(
+                self.base_url, self.version, self.api_key, refresh=True
+            )
+            return g_discovery.build_from_document(
+                document, developerKey=self.api_key, http=self._new_http()
+            )
+
+    def _new_http(self) -> httplib2.Http:
+        http = httplib2.Http(
+            timeout=self.timeout,
+            proxy_info=(
+                self.proxy_info.to_httplib2_proxy_info()
+                if self.proxy_info is not None else None
+            ),
+        )
+        # Resumable uploads answer each chunk with "308 Resume Incomplete",
+        # which must not be followed as a redirect.
+        http.redirect_codes = http.redirect_codes - {308}
+        return http
+
+    def _new_session(self) -> requests.Session:
+        session = requests.Session()
+        session.headers["x-goog-api-key"] = self.api_key
+        if self.proxy_info is not None:
+            proxy_url = self.proxy_info.to_url()
+            session.proxies = {"http": proxy_url, "https": proxy_url}
+        return session
 
     @handle_http_exception
+    def _execute(self, request) -> dict:
+        if not metrics_enabled():
+            with self._http_pool.get() as http:
+                return request.execute(http=http)
+
+        increment("bytes.sent", len(request.body or ""))
+
+        postproc = request.postproc
+
+        def count_received(resp, content):
+            increment("bytes.received", len(content))
+            return postproc(resp, content)
+
+        request.postproc = count_received
+
+        with self._http_pool.get() as http, timed("api.request", method=request.methodId):
+            return request.execute(http=http)
+
+    def _call(self, rate_limit_key: str, fn: Callable[[], R], tokens: int = 0) -> R:
+        def attempt() -> R:
+            if self.rate_limiter is not None:
+                self.rate_limiter.acquire(rate_limit_key, tokens)
+            return fn()
+
+        return retry_call(attempt, self.retry_policy)
+
+    def get_token_count(
+        self, model: str, prompt: GenerationRequest | list, use_cache: bool = True
+    ) -> int:
+        """Count the input tokens of `prompt` with the API.
+
+        With `use_cache`, every message (or prompt item) is counted once and
+        cached by content, and the total is the sum of the cached counts; only
+        contents not seen before are sent to `countTokens`.
+        """
+        if not use_cache:
+            request = self._prepare_token_count_request(prompt)
+            return self._count_tokens(model, request.model_dump(by_alias=True, exclude_none=True))
+
+        units = self._token_count_units(prompt)
+        cache_keys, counts = self._lookup_token_counts(model, units)
+        missing = [i for i, count in enumerate(counts) if count is None]
+
+        def count(i: int) -> int:
+            def count_unit() -> int:
+                count = self._count_tokens(model, {"contents": [units[i]]})
+                self._store_token_count(cache_keys[i], count)
+                return count
+
+            return self._single_flight.do(cache_keys[i], count_unit)[0]
+
+        if len(missing) == 1:
+            counts[missing[0]] = count(missing[0])
+        else:
+            for index, future in imap_bounded(count, missing):
+                counts[missing[index]] = future.result()
+
+        return sum(counts)
+
+    def _count_tokens(self, model: str, body: dict) -> int:
+        rsp = self._call(
+            f"{model}:countTokens",
+            lambda: self._execute(
+                self.genai_service
+                    .models()
+                    .getTokenCount(model=model, body=body)
+            ),
+        )
+
+        return rsp["totalTokens"]
+
     def generate(
         self,
         model: str,
         prompt: GenerationRequest | ChatHistory | list | str,
         generation_config: GenerationConfig | dict | None = None,
         safety_settings: list[SafetySetting | dict] | None = None,
-    ) -> GenerationResponse:
-        generation_request = self._prepare_generation_request(
+        use_cache: bool = True,
+        lazy: bool = False,
+    ) -> GenerationResponse | LazyGenerationResponse:
+        """Generate a response to `prompt`.
+
+        With `lazy=True` the response is returned as a `LazyGenerationResponse`,
+        which skips validating the parts of the response that are never read.
+        """
+        body = self._prepare_generation_body(
             prompt,
             generation_config=generation_config,
             safety_settings=safety_settings,
         )
 
-        rsp = (
-            self.genai_service
-                .models()
-                .generateContent(
-                    model=model,
-                    body=generation_request.model_dump(by_alias=True, exclude_none=True),
-                )
-                .execute()
+        return self._generate(model, body, use_cache=use_cache, lazy=lazy)
+
+    def _generate(
+        self, model: str, body: dict, use_cache: bool = True, lazy: bool = False
+    ) -> GenerationResponse | LazyGenerationResponse:
+        response_cls = LazyGenerationResponse if lazy else GenerationResponse.model_validate
+
+        # Only requests whose answer may be reused are coalesced; sampling
+        # twice with a non-zero temperature is expected to differ.
+        coalesce = use_cache and (self.response_cache is not None or _is_deterministic(body))
+
+        cache = request_key = None
+        if coalesce:
+            request_key = f"response_{canonical_hash({'model': model, 'request': body})}"
+        if use_cache and self.response_cache is not None:
+            cache = get_response_cache_instance(self.response_cache.size_limit)
+            cached_obj = cache.get(request_key)
+            if cached_obj is not None:
+                increment("cache.hit", cache="response")
+                return response_cls(cached_obj)
+            increment("cache.miss", cache="response")
+
+        estimated_tokens = estimate_request_tokens(body)
+
+        def generate() -> dict:
+            rsp = self._call(
+                model,
+                lambda: self._execute(
+                    self.genai_service
+                        .models()
+                        .generateContent(model=model, body=body)
+                ),
+                tokens=estimated_tokens,
+            )
+
+            if cache is not None:
+                cache.set(request_key, rsp, expire=self.response_cache.ttl)
+
+            return rsp
+
+        if coalesce:
+            rsp, shared = self._single_flight.do(request_key, generate)
+        else:
+            rsp, shared = generate(), False
+
+        with timed("generate.validate", lazy=lazy):
+            rsp = response_cls(rsp)
+        # A shared response was paid for, and accounted, by another caller.
+        if not shared:
+            self._settle_tokens(model, rsp, estimated_tokens)
+            _record_usage(model, rsp)
+
+        return rsp
+
+    def _settle_tokens(
+        self,
+        model: str,
+        rsp: GenerationResponse | LazyGenerationResponse,
+        estimated_tokens: int,
+    ):
+        if self.rate_limiter is None or rsp.usage_metadata is None:
+            return
+
+        prompt_tokens = rsp.usage_metadata.prompt_token_count
+        if prompt_tokens is not None:
+            self.rate_limiter.adjust(model, prompt_tokens - estimated_tokens)
+
+    def generate_batch(
+        self,
+        model: str,
+        prompts: Iterable[GenerationRequest | ChatHistory | list | str],
+        generation_config: GenerationConfig | dict | None = None,
+        safety_settings: list[SafetySetting | dict] | None = None,
+        max_concurrency: int = 8,
+        ordered: bool = True,
+    ) -> Iterator[BatchResult]:
+        """Generate responses for `prompts` with at most `max_concurrency` requests in flight.
+
+        `prompts` is consumed lazily; a failed prompt yields a result carrying its exception.
+        """
+
+        def generate(prompt) -> GenerationResponse:
+            return self.generate(
+                model,
+                prompt,
+                generation_config=generation_config,
+                safety_settings=safety_settings,
+            )
+
+        return imap_batch_results(
+            generate, prompts, max_concurrency=max_concurrency, ordered=ordered
         )
 
-        return GenerationResponse.model_validate(rsp)
+    def generate_stream(
+        self,
+        model: str,
+        prompt: GenerationRequest | ChatHistory | list | str,
+        generation_config: GenerationConfig | dict | None = None,
+        safety_settings: list[SafetySetting | dict] | None = None,
+    ) -> Iterator[GenerationResponse]:
+        body = self._prepare_generation_body(
+            prompt,
+            generation_config=generation_config,
+            safety_settings=safety_settings,
+        )
+
+        return self._generate_stream(model, body)
+
+    def _generate_stream(self, model: str, body: dict) -> Iterator[GenerationResponse]:
+        # The session stays checked out until the stream is consumed or closed.
+        with self._session_pool.get() as session:
+            rsp = self._call(
+                model,
+                lambda: self._post_stream(
+                    session,
+                    f"{self.base_url}/{self.version}/{model}:streamGenerateContent",
+                    body,
+                ),
+                tokens=estimate_request_tokens(body),
+            )
+
+            with rsp:
+                decoder = SSEDecoder()
+                # The server sends no charset, so `requests` would fall back to
+                # ISO-8859-1; the stream is always UTF-8.
+                for line in rsp.iter_lines():
+                    increment("bytes.received", len(line))
+                    data = decoder.decode(line.decode("utf-8"))
+                    if data is not None:
+                        yield GenerationResponse.model_validate_json(data)
+
+                data = decoder.flush()
+                if data is not None:
+                    yield GenerationResponse.model_validate_json(data)
+
+    @handle_http_exception
+    def _post_stream(self, session: requests.Session, url: str, body: dict) -> requests.Response:
+        # Measures the time until the response headers arrive.
+        with timed("api.request", method="streamGenerateContent"):
+            rsp = session.post(
+                url, params={"alt": "sse"}, json=body, stream=True, timeout=self.timeout
+            )
+        if not rsp.ok:
+            with rsp:
+                rsp.raise_for_status()
+
+        return rsp
 
     def start_chat(
         self,
@@ -133,6 +675,9 @@ class GeminiClient:
         history: list[ChatMessage] | ChatHistory | None = None,
         generation_config: GenerationConfig | dict | None = None,
         safety_settings: list[SafetySetting | dict] | None = None,
+        history_policy: HistoryPolicy | dict | None = None,
+        store: ChatSessionStore | None = None,
+        session_id: str | None = None,
     ) -> ChatSession:
         if isinstance(history, ChatHistory):
             history = history.messages
@@ -143,123 +688,483 @@ class GeminiClient:
             history=history,
             generation_config=generation_config,
             safety_settings=safety_settings,
+            history_policy=history_policy,
+            store=store,
+            session_id=session_id,
         )
 
-    def _prepare_generation_request(
-        self,
-        prompt: GenerationRequest | ChatHistory | list | str,
-        generation_config: GenerationConfig | dict | None = None,
-        safety_settings: list[SafetySetting | dict] | None = None,
-    ) -> GenerationRequest:
-        if isinstance(prompt, GenerationRequest):
-            request = prompt
-        elif isinstance(prompt, ChatHistory):
-            request = GenerationRequest(contents=prompt.messages)
-        else:
-            parts = self.normalize_prompt(prompt)
-            request = GenerationRequest(
-                contents=[GenerationRequestParts(parts=parts)]
-            )
-
-        if generation_config is not None:
-            if not isinstance(generation_config, GenerationConfig):
-                generation_config = GenerationConfig.model_validate(generation_config)
-            request.generation_config = generation_config
-
-        if safety_settings is not None:
-            safety_settings = [
-                safety_setting
-                if isinstance(safety_setting, SafetySetting)
-                else SafetySetting.model_validate(safety_setting)
-                for safety_setting in safety_settings
-            ]
-            request.safety_settings = safety_settings
-
-        return request
-
-    def upload_image(self, image_path: str) -> ImagePart:
+    def upload_image(
+        self, image_path: str, progress: ProgressCallback | None = None
+    ) -> ImagePart:
         if not os.path.exists(image_path):
             raise FileNotFoundError(f"Image file not found: {image_path}")
 
+        return self._upload_image_path(image_path, progress=progress)
+
+    def _upload_image_path(
+        self,
+        image_path: str,
+        sha256_hash: str | None = None,
+        progress: ProgressCallback | None = None,
+    ) -> ImagePart:
         uploaded_file = self._upload_file(
             UploadFile.from_path(
                 image_path,
                 body={"file": {"displayName": os.path.basename(image_path)}},
-            )
+            ),
+            progress=progress,
+            sha256_hash=sha256_hash,
         )
 
         return uploaded_file.to_file_part()
 
-    def upload_video(self, video_path: str, verbose: bool = False) -> VideoPart:
+    def upload_image_data(
+        self,
+        data: bytes | BinaryIO,
+        mime_type: str = "image/jpeg",
+        display_name: str | None = None,
+        progress: ProgressCallback | None = None,
+    ) -> ImagePart:
+        if not isinstance(data, bytes):
+            data = data.read()
+
+        body = None
+        if display_name is not None:
+            body = {"file": {"displayName": display_name}}
+
+        uploaded_file = self._upload_file(
+            UploadFile.from_bytes(data, mime_type=mime_type, body=body),
+            progress=progress,
+        )
+
+        return uploaded_file.to_file_part()
+
+    def upload_video(
+        self,
+        video_path: str,
+        verbose: bool = False,
+        max_workers: int = 8,
+        max_retries: int | None = None,
+        sampling: VideoSamplingConfig | dict | None = None,
+        encoding: FrameEncodingConfig | dict | None = None,
+        decode_workers: int = 1,
+        mode: Literal["frames", "file"] = "frames",
+        chunk_size: int | None = None,
+        processing_timeout: float | None = 600.0,
+        progress: ProgressCallback | None = None,
+        compact: bool = False,
+        frame_directory: FrameDirectoryConfig | dict | None = None,
+    ) -> VideoPart | CompactVideoPart | FilePart:
+        """Upload a video file or a directory of frames.
+
+        In `frames` mode the video is sampled into images that are uploaded one
+        by one and returned as a `VideoPart`, or with `compact=True` as a
+        `CompactVideoPart`, which is much smaller for long videos. In `file`
+        mode the video itself is sent as a single resumable upload and, once
+        the server has finished processing it, returned as a `FilePart`;
+        `progress` receives byte-level updates of that upload.
+
+        A directory is read as pre-extracted frames, ordered and timed as
+        described by `frame_directory`.
+        """
         if not os.path.exists(video_path):
             raise FileNotFoundError(f"Video file not found: {video_path}")
 
-        if os.path.isdir(video_path):
-            frame_paths = os.listdir(video_path)
-            frame_paths = filter(
-                lambda x: x.lower().endswith((".jpg", ".jpeg", ".png")), frame_paths
-            )
-            frame_paths = sorted(
-                frame_paths, key=lambda x: int(os.path.splitext(x)[0])
+        if mode == "file":
+            if os.path.isdir(video_path):
+                raise ValueError("`file` mode requires a video file, not a directory of frames")
+
+            return self._upload_video_file(
+                video_path,
+                verbose=verbose,
+                chunk_size=chunk_size,
+                processing_timeout=processing_timeout,
+                progress=progress,
             )
 
-            image_parts = [
-                self.upload_image(os.path.join(video_path, frame_path))
-                for frame_path in tqdm(
-                    frame_paths, disable=not verbose, desc="Uploading video frames"
-                )
-            ]
+        if os.path.isdir(video_path):
+            uploaded_frames = self._upload_frame_directory(
+                video_path,
+                _validate(FrameDirectoryConfig, frame_directory),
+                verbose=verbose,
+                max_workers=max_workers,
+                max_retries=max_retries,
+            )
         else:
-            with tempfile.TemporaryDirectory() as temp_dir:
-                frame_paths = extract_video_frames(
-                    video_path, save_dir=temp_dir, sample_fps=1
+            def upload_frame(frame: EncodedFrame) -> tuple[float, ImagePart]:
+                image_part = self.upload_image_data(
+                    frame.data,
+                    mime_type=frame.mime_type,
+                    display_name=(
+                        f"{frame.index:06d}{mimetypes.guess_extension(frame.mime_type)}"
+                    ),
                 )
+                return frame.timestamp, image_part
 
-                image_parts = [
-                    self.upload_image(frame_path)
-                    for frame_path in tqdm(
-                        frame_paths, disable=not verbose, desc="Uploading video frames"
-                    )
-                ]
+            # Frames are encoded in memory and uploaded while the video is
+            # still being decoded.
+            uploaded_frames = self._upload_frames(
+                iter_encoded_video_frames(
+                    video_path,
+                    sampling=_validate(VideoSamplingConfig, sampling),
+                    encoding=_validate(FrameEncodingConfig, encoding),
+                    num_workers=decode_workers,
+                ),
+                upload_frame,
+                verbose=verbose,
+                max_workers=max_workers,
+                max_retries=max_retries,
+            )
+
+        if compact:
+            return CompactVideoPart(
+                timestamps=[timestamp for timestamp, _ in uploaded_frames],
+                file_uris=[part.file_data.file_uri for _, part in uploaded_frames],
+                mime_types=[part.file_data.mime_type for _, part in uploaded_frames],
+            )
 
+        precision = time_span_precision(timestamp for timestamp, _ in uploaded_frames)
         return VideoPart(
             time_spans=[
-                TextPart(text=f"{i // 60:02d}:{i % 60:02d}")
-                for i in range(len(image_parts))
+                TextPart(text=format_time_span(timestamp, precision))
+                for timestamp, _ in uploaded_frames
             ],
-            frames=image_parts,
+            frames=[image_part for _, image_part in uploaded_frames],
         )
 
-    @handle_http_exception
-    def _upload_file(self, file: UploadFile) -> UploadedFile:
-        m = hashlib.sha256()
-        with open(file.file_path, "rb") as f:
-            for chunk in iter(lambda: f.read(4096), b""):
-                m.update(chunk)
+    def _upload_frame_directory(
+        self,
+        directory: str,
+        config: FrameDirectoryConfig | None = None,
+        verbose: bool = False,
+        max_workers: int = 8,
+        max_retries: int | None = None,
+    ) -> list[tuple[float, ImagePart]]:
+        config = config or FrameDirectoryConfig()
+        frame_files = scan_frame_directory(directory, config)
 
-        sha256_hash = m.hexdigest()
-        cache_key = f"{self.api_key}_file_{sha256_hash}"
+        # Frames are hashed by a process pool and uploaded as soon as their
+        # hash is known. Identical frames are uploaded once, and frames in the
+        # upload cache are not uploaded at all.
+        hashes = []
 
-        cache = get_cache_instance()
-        cached_obj = cache.get(cache_key)
-        if cached_obj:
-            return UploadedFile.model_validate(cached_obj)
-
-        rsp = (
-            self.genai_service.media()
-            .upload(
-                media_body=file.file_path,
-                media_mime_type=file.mime_type,
-                body=file.body,
+        def unique_frames() -> Iterator[tuple[str, str]]:
+            seen = set()
+            hash_iter = iter_file_sha256(
+                [frame.path for frame in frame_files],
+                get_cache_instance(),
+                max_workers=config.hash_workers,
+            )
+            for frame, sha256_hash in zip(frame_files, hash_iter):
+                hashes.append(sha256_hash)
+                if sha256_hash not in seen:
+                    seen.add(sha256_hash)
+                    yield frame.path, sha256_hash
+
+        def upload_frame(item: tuple[str, str]) -> tuple[str, ImagePart]:
+            path, sha256_hash = item
+            return sha256_hash, self._upload_image_path(path, sha256_hash=sha256_hash)
+
+        uploaded = dict(
+            self._upload_frames(
+                unique_frames(),
+                upload_frame,
+                verbose=verbose,
+                max_workers=max_workers,
+                max_retries=max_retries,
+            )
+        )
+
+        return [
+            (frame.timestamp, uploaded[sha256_hash])
+            for frame, sha256_hash in zip(frame_files, hashes)
+        ]
+
+    def _upload_video_file(
+        self,
+        video_path: str,
+        verbose: bool = False,
+        chunk_size: int | None = None,
+        processing_timeout: float | None = 600.0,
+        progress: ProgressCallback | None = None,
+    ) -> FilePart:
+        with tqdm(
+            total=os.path.getsize(video_path),
+            disable=not verbose,
+            desc="Uploading video",
+            unit="B",
+            unit_scale=True,
+        ) as pbar:
+            def update(uploaded: int, total: int | None):
+                pbar.update(uploaded - pbar.n)
+                if progress is not None:
+                    progress(uploaded, total)
+
+            uploaded_file = self._upload_file(
+                UploadFile.from_path(
+                    video_path,
+                    body={"file": {"displayName": os.path.basename(video_path)}},
+                ),
+                resumable=True,
+                chunk_size=chunk_size,
+                progress=update,
+            )
+
+        # The hash was indexed by the upload, so this does not read the file again.
+        cache_key = self._file_cache_key(get_file_sha256(video_path, get_cache_instance()))
+
+        with timed("upload_video.processing"):
+            uploaded_file = self._wait_for_file(
+                uploaded_file, timeout=processing_timeout, cache_key=cache_key
+            )
+
+        return uploaded_file.to_file_part()
+
+    def _wait_for_file(
+        self,
+        uploaded_file: UploadedFile,
+        timeout: float | None = None,
+        cache_key: str | None = None,
+    ) -> UploadedFile:
+        """Poll `uploaded_file` until the server has finished processing it.
+
+        The final state is written back to the upload cache entry `cache_key`,
+        so later cache hits do not poll again; failed files are evicted so
+        they are uploaded again.
+        """
+        deadline = time.monotonic() + timeout if timeout is not None else None
+        polled = False
+
+        while uploaded_file.state == "PROCESSING":
+            if deadline is not None and time.monotonic() >= deadline:
+                raise TimeoutError(
+                    f"File {uploaded_file.name} is still being processed after {timeout}s"
+                )
+
+            time.sleep(FILE_POLL_INTERVAL)
+
+            rsp = self._call(
+                "files",
+                lambda: self._execute(
+                    self.genai_service.files().get(name=uploaded_file.name)
+                ),
+            )
+            uploaded_file = UploadedFile.model_validate(rsp)
+            polled = True
+
+        if cache_key is not None:
+            if uploaded_file.state == "FAILED":
+                get_cache_instance().delete(cache_key)
+            elif polled:
+                self._store_uploaded_file(cache_key, uploaded_file)
+
+        if uploaded_file.state == "FAILED":
+            reason = (uploaded_file.error or {}).get("message", "unknown error")
+            raise FileProcessingError(uploaded_file.name, reason)
+
+        return uploaded_file
+
+    def _upload_frames(
+        self,
+        frames: Iterable[T],
+        upload_frame: Callable[[T], R],
+        verbose: bool = False,
+        max_workers: int = 8,
+        max_retries: int | None = None,
+    ) -> list[R]:
+        if max_retries is not None:
+            retry_policy = RetryPolicy(max_retries=max_retries)
+        elif self.retry_policy is None:
+            retry_policy = RetryPolicy()
+        else:
+            # `_upload_file` already retries with the client's policy.
+            retry_policy = None
+
+        results = []
+        with tqdm(
+            total=len(frames) if isinstance(frames, list) else None,
+            disable=not verbose,
+            desc="Uploading video frames",
+        ) as pbar:
+            for _, future in imap_bounded(
+                lambda frame: retry_call(lambda: upload_frame(frame), retry_policy),
+                frames,
+                max_workers=max_workers,
+            ):
+                results.append(future.result())
+                pbar.update()
+                increment("upload_video.frames")
+
+        return results
+
+    def _upload_file(
+        self,
+        file: UploadFile,
+        resumable: bool | None = None,
+        chunk_size: int | None = None,
+        progress: ProgressCallback | None = None,
+        sha256_hash: str | None = None,
+    ) -> UploadedFile:
+        """Upload `file` unless an unexpired copy is already known.
+
+        Files larger than one chunk (or any file, with `resumable=True`) are
+        sent as a resumable upload in chunks of `chunk_size` bytes, defaulting
+        to the client's `upload_chunk_size`. The upload session is kept in the
+        disk cache, so a retry, or another process after a crash, continues
+        from the last chunk acknowledged by the server instead of starting
+        over. `progress` is called with the bytes uploaded so far after every
+        chunk.
+        """
+        cache_key, uploaded_file = self._lookup_uploaded_file(file, sha256_hash)
+        if uploaded_file is not None:
+            if progress is not None:
+                progress(uploaded_file.size_bytes, uploaded_file.size_bytes)
+            return uploaded_file
+
+        if file.data is not None:
+            size = len(file.data)
+        else:
+            size = os.path.getsize(file.file_path)
+
+        # Concurrent uploads of the same content wait for the first one.
+        uploaded_file, _ = self._single_flight.do(
+            cache_key,
+            lambda: self._upload_new_file(
+                file,
+                cache_key,
+                size,
+                resumable=resumable,
+                chunk_size=chunk_size,
+                progress=progress,
+            ),
+        )
+
+        if progress is not None:
+            progress(size, size)
+
+        return uploaded_file
+
+    def _upload_new_file(
+        self,
+        file: UploadFile,
+        cache_key: str,
+        size: int,
+        resumable: bool | None = None,
+        chunk_size: int | None = None,
+        progress: ProgressCallback | None = None,
+    ) -> UploadedFile:
+        chunk_size = chunk_size or self.upload_chunk_size
+        if resumable is None:
+            resumable = size > chunk_size
+
+        mime_type = file.mime_type or "application/octet-stream"
+        if file.data is not None:
+            media_body = MediaIoBaseUpload(
+                io.BytesIO(file.data),
+                mimetype=mime_type,
+                chunksize=chunk_size,
+                resumable=resumable,
             )
-            .execute()
+        elif resumable:
+            media_body = MediaFileUpload(
+                file.file_path, mimetype=mime_type, chunksize=chunk_size, resumable=True
+            )
+        else:
+            media_body = file.file_path
+
+        request = self.genai_service.media().upload(
+            media_body=media_body,
+            media_mime_type=file.mime_type,
+            body=file.body,
         )
 
+        # Resumable requests keep their upload session and offset, so a retry
+        # picks up from where the failed attempt stopped.
+        with timed("upload", resumable=resumable):
+            rsp = self._call(
+                "files",
+                lambda: self._execute_upload(
+                    request, progress=progress, session_key=f"{cache_key}_upload_session"
+                ),
+            )
+
         uploaded_file = UploadedFile.model_validate(rsp["file"])
 
-        cache.set(cache_key, uploaded_file.model_dump(by_alias=True, exclude_none=True))
+        self._store_uploaded_file(cache_key, uploaded_file)
 
         return uploaded_file
 
+    @handle_http_exception
+    def _execute_upload(
+        self,
+        request,
+        progress: ProgressCallback | None = None,
+        session_key: str | None = None,
+    ) -> dict:
+        if request.resumable is None:
+            return self._execute(request)
+
+        cache = get_cache_instance()
+        stored_uri = cache.get(session_key)
+        if request.resumable_uri is None and stored_uri is not None:
+            # In the error state the next chunk starts by asking the server how
+            # many bytes of the stored session it already has.
+            request.resumable_uri = stored_uri
+            request._in_error_state = True
+
+        with self._http_pool.get() as http:
+            sent = request.resumable_progress
+            rsp = None
+            while rsp is None:
+                try:
+                    status, rsp = request.next_chunk(http=http)
+                except HttpError as e:
+                    if stored_uri is None or e.resp.status not in (404, 410):
+                        raise
+
+                    # The stored session has expired on the server; start a new one.
+                    cache.delete(session_key)
+                    stored_uri = None
+                    request.resumable_uri = None
+                    request.resumable_progress = 0
+                    request._in_error_state = False
+                    continue
+
+                if rsp is None and request.resumable_uri != stored_uri:
+                    cache.set(session_key, request.resumable_uri, expire=UPLOAD_SESSION_TTL)
+                    stored_uri = request.resumable_uri
+
+                if status is not None:
+                    increment("bytes.sent", status.resumable_progress - sent)
+                    sent = status.resumable_progress
+                    if progress is not None:
+                        progress(status.resumable_progress, status.total_size)
+
+        cache.delete(session_key)
+        increment("bytes.sent", request.resumable.size() - sent)
+
+        return rsp
+
     def _upload_files(self, *files: list[UploadFile]) -> list[UploadedFile]:
         return [self._upload_file(file) for file in files]
+
+
+def _record_usage(model: str, rsp: GenerationResponse | LazyGenerationResponse):
+    if not metrics_enabled() or rsp.usage_metadata is None:
+        return
+
+    usage = rsp.usage_metadata
+    if usage.prompt_token_count is not None:
+        increment("tokens.prompt", usage.prompt_token_count, model=model)
+    if usage.candidates_token_count is not None:
+        increment("tokens.candidates", usage.candidates_token_count, model=model)
+
+
+def _is_deterministic(body: dict) -> bool:
+    return body.get("generationConfig", {}).get("temperature") == 0
+
+
+def _validate(model_cls: type[M], value: M | dict | None) -> M | None:
+    if value is None or isinstance(value, model_cls):
+        return value
+    return model_cls.model_validate(value)
@@ -0,0 +1,408 @@
+import itertools
+import threading
+import time
+from collections import OrderedDict
+from typing import BinaryIO, Callable, Iterable, Iterator, Literal, TypeVar
+
+from .chat import ChatSession
+from .client import BaseGeminiClient, GeminiClient
+from .schemas import (
+    BatchResult,
+    ChatMessage,
+    ChatHistory,
+    CompactVideoPart,
+    FilePart,
+    GenerationConfig,
+    GenerationRequest,
+    GenerationResponse,
+    HistoryPolicy,
+    ImagePart,
+    LazyGenerationResponse,
+    SafetySetting,
+    UploadFile,
+    VideoPart,
+)
+from .session_store import ChatSessionStore
+from .utils.concurrency import imap_batch_results
+from .utils.error import AccessDenied, RateLimitExceeded, get_retry_after
+from .utils.metrics import increment
+from .utils.tokens import TokenEstimate
+
+R = TypeVar("R")
+
+# The API deletes uploaded files 48 hours after their upload.
+FILE_TTL = 48 * 60 * 60
+
+
+class _PooledKey:
+    def __init__(self, index: int, client: GeminiClient):
+        self.index = index
+        self.client = client
+        self.in_flight = 0
+        self.ejected_until = 0.0
+        self.requests = 0
+        self.failures = 0
+
+
+class GeminiClientPool:
+    """Spreads requests over several API keys, e.g. keys of different projects.
+
+    Each key gets its own `GeminiClient` built from `client_kwargs`, so rate
+    limits, retries and the upload cache (keyed by API key) stay per key.
+    Requests go to the key with the fewest requests in flight
+    (`least_loaded`) or with the largest share of its rate limit left
+    (`quota`, which needs `rate_limit` / `model_rate_limits`). A key that
+    answers `RateLimitExceeded` is ejected for the `Retry-After` delay or
+    `ejection_time`, one that answers `AccessDenied` for
+    `access_denied_ejection_time`, and the request is retried on another key.
+
+    Uploaded files are only visible to the project that uploaded them, so
+    requests referencing files uploaded through the pool are always sent with
+    the key that uploaded them. The owners of at most `max_tracked_files`
+    files are remembered, for as long as the files exist on the server.
+    """
+
+    def __init__(
+        self,
+        api_keys: list[str],
+        policy: Literal["least_loaded", "quota"] = "least_loaded",
+        ejection_time: float = 60.0,
+        access_denied_ejection_time: float = 600.0,
+        max_tracked_files: int = 100_000,
+        **client_kwargs,
+    ):
+        if not api_keys:
+            raise ValueError("At least one API key must be provided")
+
+        self.policy = policy
+        self.ejection_time = ejection_time
+        self.access_denied_ejection_time = access_denied_ejection_time
+        self.max_tracked_files = max_tracked_files
+
+        self._keys = [
+            _PooledKey(i, GeminiClient(api_key=api_key, **client_kwargs))
+            for i, api_key in enumerate(api_keys)
+        ]
+        self._lock = threading.Lock()
+        self._round_robin = itertools.count()
+
+        # URI of each file uploaded through the pool -> index of its key and
+        # when the file expires, oldest upload first.
+        self._file_owners: OrderedDict[str, tuple[int, float]] = OrderedDict()
+
+    @property
+    def clients(self) -> list[GeminiClient]:
+        return [key.client for key in self._keys]
+
+    normalize_prompt = staticmethod(BaseGeminiClient.normalize_prompt)
+    _serialize_prompt_items = staticmethod(BaseGeminiClient._serialize_prompt_items)
+    _build_generation_body = staticmethod(BaseGeminiClient._build_generation_body)
+
+    def get_token_count(
+        self, model: str, prompt: GenerationRequest | list, use_cache: bool = True
+    ) -> int:
+        client = self._keys[0].client
+        request = client._prepare_token_count_request(prompt)
+        owner = self._owner_of(request.model_dump(by_alias=True, exclude_none=True))
+
+        return self._run(
+            f"{model}:countTokens",
+            lambda client: client.get_token_count(model, prompt, use_cache=use_cache),
+            owner=owner,
+        )
+
+    def estimate_token_count(self, prompt: GenerationRequest | list) -> TokenEstimate:
+        return self._keys[0].client.estimate_token_count(prompt)
+
+    def generate(
+        self,
+        model: str,
+        prompt: GenerationRequest | ChatHistory | list | str,
+        generation_config: GenerationConfig | dict | None = None,
+        safety_settings: list[SafetySetting | dict] | None = None,
+        use_cache: bool = True,
+        lazy: bool = False,
+    ) -> GenerationResponse | LazyGenerationResponse:
+        body = self._keys[0].client._prepare_generation_body(
+            prompt,
+            generation_config=generation_config,
+            safety_settings=safety_settings,
+        )
+
+        return self._generate(model, body, use_cache=use_cache, lazy=lazy)
+
+    def _generate(
+        self, model: str, body: dict, use_cache: bool = True, lazy: bool = False
+    ) -> GenerationResponse | LazyGenerationResponse:
+        return self._run(
+            model,
+            lambda client: client._generate(model, body, use_cache=use_cache, lazy=lazy),
+            owner=self._owner_of(body),
+        )
+
+    def generate_batch(
+        self,
+        model: str,
+        prompts: Iterable[GenerationRequest | ChatHistory | list | str],
+        generation_config: GenerationConfig | dict | None = None,
+        safety_settings: list[SafetySetting | dict] | None = None,
+        max_concurrency: int = 8,
+        ordered: bool = True,
+    ) -> Iterator[BatchResult]:
+        def generate(prompt) -> GenerationResponse:
+            return self.generate(
+                model,
+                prompt,
+                generation_config=generation_config,
+                safety_settings=safety_settings,
+            )
+
+        return imap_batch_results(
+            generate, prompts, max_concurrency=max_concurrency, ordered=ordered
+        )
+
+    def generate_stream(
+        self,
+        model: str,
+        prompt: GenerationRequest | ChatHistory | list | str,
+        generation_config: GenerationConfig | dict | None = None,
+        safety_settings: list[SafetySetting | dict] | None = None,
+    ) -> Iterator[GenerationResponse]:
+        body = self._keys[0].client._prepare_generation_body(
+            prompt,
+            generation_config=generation_config,
+            safety_settings=safety_settings,
+        )
+
+        return self._generate_stream(model, body)
+
+    def _generate_stream(self, model: str, body: dict) -> Iterator[GenerationResponse]:
+        owner = self._owner_of(body)
+        tried: set[int] = set()
+
+        while True:
+            key = self._acquire(model, owner, tried)
+            started = False
+            try:
+                for chunk in key.client._generate_stream(model, body):
+                    started = True
+                    yield chunk
+                return
+            except (RateLimitExceeded, AccessDenied) as e:
+                # A stream that has already produced output cannot be replayed.
+                self._handle_failure(key, e, owner, tried, retry=not started)
+            finally:
+                self._release(key)
+
+    def start_chat(
+        self,
+        model: str,
+        history: list[ChatMessage] | ChatHistory | None = None,
+        generation_config: GenerationConfig | dict | None = None,
+        safety_settings: list[SafetySetting | dict] | None = None,
+        history_policy: HistoryPolicy | dict | None = None,
+        store: ChatSessionStore | None = None,
+        session_id: str | None = None,
+    ) -> ChatSession:
+        if isinstance(history, ChatHistory):
+            history = history.messages
+
+        return ChatSession(
+            self,
+            model,
+            history=history,
+            generation_config=generation_config,
+            safety_settings=safety_settings,
+            history_policy=history_policy,
+            store=store,
+            session_id=session_id,
+        )
+
+    def upload_image(self, image_path: str, **kwargs) -> ImagePart:
+        return self._upload(
+            lambda client: client.upload_image(image_path, **kwargs),
+            UploadFile.from_path(image_path),
+        )
+
+    def upload_image_data(self, data: bytes | BinaryIO, **kwargs) -> ImagePart:
+        if not isinstance(data, bytes):
+            data = data.read()
+
+        return self._upload(
+            lambda client: client.upload_image_data(data, **kwargs),
+            UploadFile.from_bytes(data),
+        )
+
+    def upload_video(self, video_path: str, **kwargs) -> VideoPart | CompactVideoPart | FilePart:
+        return self._upload(lambda client: client.upload_video(video_path, **kwargs))
+
+    def key_stats(self) -> list[dict]:
+        now = time.monotonic()
+        with self._lock:
+            return [
+                {
+                    "key": f"...{key.client.api_key[-4:]}",
+                    "in_flight": key.in_flight,
+                    "requests": key.requests,
+                    "failures": key.failures,
+                    "ejected_for": max(key.ejected_until - now, 0.0),
+                }
+                for key in self._keys
+            ]
+
+    def _upload(
+        self,
+        upload: Callable[[GeminiClient], ImagePart | VideoPart | CompactVideoPart | FilePart],
+        file: UploadFile | None = None,
+    ) -> ImagePart | VideoPart | CompactVideoPart | FilePart:
+        # Prefer a key that already holds this file, so it is not uploaded twice.
+        owner = None
+        if file is not None:
+            owner = next(
+                (
+                    key.index
+                    for key in self._keys
+                    if key.client._lookup_uploaded_file(file)[1] is not None
+                ),
+                None,
+            )
+
+        def run(client: GeminiClient):
+            part = upload(client)
+            index = next(key.index for key in self._keys if key.client is client)
+            self._record_owner(_part_uris(part), index)
+            return part
+
+        return self._run("files", run, owner=owner)
+
+    def _record_owner(self, uris: list[str], index: int):
+        expires = time.monotonic() + FILE_TTL
+        with self._lock:
+            for uri in uris:
+                owner = self._file_owners.get(uri)
+                # A file that is already known keeps its place and expiry.
+                if owner is None or owner[0] != index:
+                    self._file_owners.pop(uri, None)
+                    self._file_owners[uri] = (index, expires)
+
+            self._evict_owners()
+
+    def _evict_owners(self):
+        # Entries are in upload order, so expired ones are at the front.
+        now = time.monotonic()
+        while self._file_owners:
+            _, (_, expires) = next(iter(self._file_owners.items()))
+            if expires > now and len(self._file_owners) <= self.max_tracked_files:
+                break
+            self._file_owners.popitem(last=False)
+
+    def _owner_of(self, body: dict) -> int | None:
+        with self._lock:
+            self._evict_owners()
+            owners = {
+                self._file_owners[uri][0]
+                for uri in _body_uris(body)
+                if uri in self._file_owners
+            }
+        if len(owners) > 1:
+            raise ValueError("The request references files uploaded with different API keys")
+        return owners.pop() if owners else None
+
+    def _run(
+        self, rate_limit_key: str, fn: Callable[[GeminiClient], R], owner: int | None = None
+    ) -> R:
+        tried: set[int] = set()
+
+        while True:
+            key = self._acquire(rate_limit_key, owner, tried)
+            try:
+                return fn(key.client)
+            except (RateLimitExceeded, AccessDenied) as e:
+                self._handle_failure(key, e, owner, tried)
+            finally:
+                self._release(key)
+
+    def _acquire(self, rate_limit_key: str, owner: int | None, tried: set[int]) -> _PooledKey:
+        while True:
+            with self._lock:
+                if owner is not None:
+                    candidates = [self._keys[owner]]
+                else:
+                    candidates = [key for key in self._keys if key.index not in tried]
+
+                now = time.monotonic()
+                healthy = [key for key in candidates if key.ejected_until <= now]
+                if healthy:
+                    key = self._select(healthy, rate_limit_key)
+                    key.in_flight += 1
+                    key.requests += 1
+                    return key
+
+                delay = min(key.ejected_until for key in candidates) - now
+
+            # Every usable key is ejected; wait for the first one to come back.
+            time.sleep(delay)
+
+    def _select(self, keys: list[_PooledKey], rate_limit_key: str) -> _PooledKey:
+        # Rotate the starting point so ties are spread round-robin.
+        start = next(self._round_robin) % len(keys)
+        keys = keys[start:] + keys[:start]
+
+        if self.policy == "quota":
+            return max(keys, key=lambda key: (_remaining(key, rate_limit_key), -key.in_flight))
+        return min(keys, key=lambda key: key.in_flight)
+
+    def _release(self, key: _PooledKey):
+        with self._lock:
+            key.in_flight -= 1
+
+    def _handle_failure(
+        self,
+        key: _PooledKey,
+        e: RateLimitExceeded | AccessDenied,
+        owner: int | None,
+        tried: set[int],
+        retry: bool = True,
+    ):
+        """Eject `key` after `e`, then re-raise `e` unless another key can take the request."""
+        if isinstance(e, RateLimitExceeded):
+            ejection_time = get_retry_after(e) or self.ejection_time
+        else:
+            ejection_time = self.access_denied_ejection_time
+
+        with self._lock:
+            key.failures += 1
+            key.ejected_until = max(key.ejected_until, time.monotonic() + ejection_time)
+        increment("pool.ejection", error=type(e).__name__)
+
+        tried.add(key.index)
+        if not retry or owner is not None or len(tried) == len(self._keys):
+            raise e
+
+
+def _remaining(key: _PooledKey, rate_limit_key: str) -> float:
+    rate_limiter = key.client.rate_limiter
+    if rate_limiter is None:
+        return 1.0
+    remaining = rate_limiter.remaining(rate_limit_key)
+    return 1.0 if remaining is None else remaining
+
+
+def _part_uris(part: ImagePart | VideoPart | CompactVideoPart | FilePart) -> list[str]:
+    if isinstance(part, CompactVideoPart):
+        return part.file_uris
+    if isinstance(part, VideoPart):
+        return [frame.file_data.file_uri for frame in part.frames]
+    return [part.file_data.file_uri]
+
+
+def _body_uris(body: dict) -> Iterator[str]:
+    contents = body.get("contents", [])
+    if isinstance(contents, dict):
+        contents = [contents]
+
+    for content in contents:
+        for part in content.get("parts", []):
+            file_data = part.get("file_data") or part.get("fileData")
+            if file_data is not None:
+                yield file_data.get("fileUri") or file_data.get("file_uri")
@@ -1,5 +1,5 @@
 from .harm import HarmCategory, HarmBlockThreshold, HarmProbability
-from .part import TextPart, FilePart, ImagePart, VideoPart
+from .part import TextPart, FilePart, ImagePart, VideoPart, CompactVideoPart
 from .proxy import ProxyInfo
 from .request import (
     ChatMessage,
@@ -9,5 +9,15 @@ from .request import (
     GenerationRequestParts,
     GenerationConfig,
 )
-from .response import GenerationCandidate, GenerationResponse
+from .response import (
+    GenerationCandidate,
+    GenerationResponse,
+    LazyGenerationResponse,
+    UsageMetadata,
+)
 from .upload import UploadFile, UploadedFile
+from .batch import BatchResult
+from .limits import RateLimit, RetryPolicy
+from .cache import ResponseCacheConfig
+from .history import HistoryPolicy
+from .video import FrameDirectoryConfig, FrameEncodingConfig, VideoSamplingConfig
@@ -0,0 +1,23 @@
+from pydantic import Field
+
+from .base import BaseModel
+from .response import GenerationResponse
+
+
+class BatchResult(BaseModel):
+    class Config:
+        arbitrary_types_allowed = True
+
+    index: int = Field(..., description="Position of the prompt in the input iterable.")
+
+    response: GenerationResponse | None = Field(
+        None, description="The generated response, if the request succeeded."
+    )
+
+    error: Exception | None = Field(
+        None, description="The exception raised by the request, if it failed."
+    )
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
@@ -0,0 +1,17 @@
+from pydantic import Field
+
+from .base import BaseModel
+
+
+class ResponseCacheConfig(BaseModel):
+    ttl: float | None = Field(
+        24 * 60 * 60, description="Seconds a cached response stays valid. Never expires if unset."
+    )
+
+    size_limit: int = Field(
+        1 << 30,
+        description=(
+            "Maximum size of the response cache on disk, in bytes. Clients with the same "
+            "limit share one cache."
+        ),
+    )
@@ -0,0 +1,51 @@
+from pydantic import Field
+
+from .base import BaseModel
+
+
+class HistoryPolicy(BaseModel):
+    max_tokens: int | None = Field(
+        None, description="Maximum number of tokens of the history sent with each message."
+    )
+
+    max_turns: int | None = Field(
+        None, description="Maximum number of turns (user message and model reply) kept."
+    )
+
+    pinned_turns: int = Field(
+        0,
+        description=(
+            "Number of leading turns that are never dropped, e.g. system-style instructions."
+        ),
+    )
+
+    summarize: bool = Field(
+        False, description="Replace dropped turns by a model-written summary of them."
+    )
+
+    summary_target: float = Field(
+        0.75,
+        gt=0.0,
+        le=1.0,
+        description=(
+            "When summarizing, turns are dropped until the history fits in this fraction of "
+            "`max_tokens` / `max_turns`, so that a summary is only needed every few turns "
+            "rather than on every turn once the limit is reached."
+        ),
+    )
+
+    summary_model: str | None = Field(
+        None, description="Model used for summaries. Defaults to the model of the session."
+    )
+
+    summary_max_tokens: int = Field(
+        512, description="Maximum length of a summary, reserved in the `max_tokens` budget."
+    )
+
+    summary_prompt: str = Field(
+        (
+            "Summarize the following conversation between a user and an assistant. "
+            "Keep every fact, decision and open question that later turns may rely on."
+        ),
+        description="Instruction used to summarize dropped turns.",
+    )
@@ -0,0 +1,36 @@
+from pydantic import Field
+
+from .base import BaseModel
+
+
+class RateLimit(BaseModel):
+    requests_per_minute: float | None = Field(
+        None, description="Maximum number of requests per minute. Unlimited if unset."
+    )
+
+    tokens_per_minute: float | None = Field(
+        None, description="Maximum number of input tokens per minute. Unlimited if unset."
+    )
+
+
+class RetryPolicy(BaseModel):
+    max_retries: int = Field(3, description="Maximum number of retries after the first attempt.")
+
+    initial_backoff: float = Field(1.0, description="Backoff before the first retry, in seconds.")
+
+    max_backoff: float = Field(60.0, description="Upper bound of a single backoff, in seconds.")
+
+    multiplier: float = Field(2.0, description="Growth factor of the backoff between retries.")
+
+    jitter: bool = Field(
+        True,
+        description=(
+            "Randomize each backoff between zero and its nominal value (\"full jitter\"), "
+            "so concurrent clients do not retry in lockstep."
+        ),
+    )
+
+    honor_retry_after: bool = Field(
+        True,
+        description="Wait at least as long as the server's `Retry-After` header asks for.",
+    )
@@ -1,3 +1,9 @@
+import itertools
+import math
+import sys
+from array import array
+from typing import Iterable
+
 from pydantic import Field
 
 from .base import BaseModel
@@ -33,3 +39,124 @@ class VideoPart(BaseModel):
             parts.append(frame)
 
         return parts
+
+
+# Finest resolution of time span labels: milliseconds.
+MAX_TIME_SPAN_PRECISION = 3
+
+
+def format_time_span(timestamp: float, precision: int = 0) -> str:
+    """Format `timestamp` as `MM:SS`, with `precision` decimals of seconds, rounded down."""
+    scale = 10**precision
+    # The epsilon keeps e.g. 0.3 (0.29999...) from being rounded down to 0.2.
+    seconds, fraction = divmod(math.floor(timestamp * scale + 1e-6), scale)
+    time_span = f"{seconds // 60:02d}:{seconds % 60:02d}"
+    if precision > 0:
+        time_span += f".{fraction:0{precision}d}"
+    return time_span
+
+
+def time_span_precision(timestamps: Iterable[float]) -> int:
+    """Decimals `format_time_span` needs to tell apart frames less than a second apart."""
+    timestamps = list(timestamps)
+    gap = min((b - a for a, b in zip(timestamps, timestamps[1:]) if b > a), default=1.0)
+    if gap >= 1.0:
+        return 0
+    return min(math.ceil(-math.log10(gap) - 1e-9), MAX_TIME_SPAN_PRECISION)
+
+
+def parse_time_span(time_span: str) -> float:
+    minutes, seconds = time_span.split(":")
+    return int(minutes) * 60 + float(seconds)
+
+
+class CompactVideoPart:
+    """Memory-efficient counterpart of `VideoPart` for long videos.
+
+    Timestamps are kept in an array and file URIs / MIME types as interned
+    strings instead of thousands of pydantic objects. The interleaved content
+    parts and their serialized form are built on first use and then reused by
+    every prompt, chat message and request body the video is part of.
+    """
+
+    __slots__ = ("timestamps", "file_uris", "mime_types", "_content_parts", "_serialized_parts")
+
+    def __init__(
+        self,
+        timestamps: Iterable[float],
+        file_uris: Iterable[str],
+        mime_types: Iterable[str] | str = "image/jpeg",
+    ):
+        self.timestamps = array("d", timestamps)
+        self.file_uris = [sys.intern(uri) for uri in file_uris]
+        if isinstance(mime_types, str):
+            mime_types = itertools.repeat(mime_types, len(self.file_uris))
+        self.mime_types = [sys.intern(mime_type) for mime_type in mime_types]
+
+        if not len(self.timestamps) == len(self.file_uris) == len(self.mime_types):
+            raise ValueError("`timestamps`, `file_uris` and `mime_types` must have the same length")
+
+        self._content_parts = None
+        self._serialized_parts = None
+
+    @classmethod
+    def from_video_part(cls, video: VideoPart) -> "CompactVideoPart":
+        return cls(
+            timestamps=[parse_time_span(span.text) for span in video.time_spans],
+            file_uris=[frame.file_data.file_uri for frame in video.frames],
+            mime_types=[frame.file_data.mime_type for frame in video.frames],
+        )
+
+    def to_video_part(self) -> VideoPart:
+        return VideoPart(time_spans=self.time_spans, frames=self.frames)
+
+    def __len__(self) -> int:
+        return len(self.file_uris)
+
+    def __getstate__(self):
+        # The materialized parts are rebuilt on demand rather than pickled.
+        return self.timestamps, self.file_uris, self.mime_types
+
+    def __setstate__(self, state):
+        timestamps, file_uris, mime_types = state
+        self.timestamps = timestamps
+        self.file_uris = [sys.intern(uri) for uri in file_uris]
+        self.mime_types = [sys.intern(mime_type) for mime_type in mime_types]
+        self._content_parts = None
+        self._serialized_parts = None
+
+    @property
+    def time_spans(self) -> list[TextPart]:
+        return self.content_parts()[0::2]
+
+    @property
+    def frames(self) -> list[ImagePart]:
+        return self.content_parts()[1::2]
+
+    def content_parts(self) -> list[TextPart | ImagePart]:
+        if self._content_parts is None:
+            # The fields are already known to be valid, so skip validation.
+            precision = time_span_precision(self.timestamps)
+            parts = []
+            for timestamp, uri, mime_type in zip(self.timestamps, self.file_uris, self.mime_types):
+                parts.append(
+                    TextPart.model_construct(text=format_time_span(timestamp, precision))
+                )
+                parts.append(
+                    ImagePart.model_construct(
+                        file_data=FilePartData.model_construct(file_uri=uri, mime_type=mime_type)
+                    )
+                )
+            self._content_parts = parts
+        return self._content_parts
+
+    def serialized_parts(self) -> list[dict]:
+        """Content parts as they appear in a request body; treat as read-only."""
+        if self._serialized_parts is None:
+            precision = time_span_precision(self.timestamps)
+            parts = []
+            for timestamp, uri, mime_type in zip(self.timestamps, self.file_uris, self.mime_types):
+                parts.append({"text": format_time_span(timestamp, precision)})
+                parts.append({"file_data": {"fileUri": uri, "mimeType": mime_type}})
+            self._serialized_parts = parts
+        return self._serialized_parts
@@ -1,3 +1,5 @@
+from urllib.parse import quote
+
 from pydantic import Field
 
 from httplib2 import ProxyInfo as HttpLib2ProxyInfo
@@ -37,3 +39,18 @@ class ProxyInfo(BaseModel):
             proxy_user=self.username,
             proxy_pass=self.password,
         )
+
+    def to_url(self) -> str:
+        if self.type not in ("http", "https", "socks4", "socks5"):
+            raise ValueError(f"Invalid proxy type: {self.type}")
+
+        scheme = "http" if self.type == "https" else self.type
+
+        auth = ""
+        if self.username is not None:
+            auth = quote(self.username, safe="")
+            if self.password is not None:
+                auth += ":" + quote(self.password, safe="")
+            auth += "@"
+
+        return f"{scheme}://{auth}{self.host}:{self.port}"
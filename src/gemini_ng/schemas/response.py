@@ -41,7 +41,103 @@ class GenerationCandidate(BaseModel):
         return "".join(part.text for part in self.content.parts)
 
 
+class UsageMetadata(BaseModel):
+    prompt_token_count: int | None = Field(
+        None, alias="promptTokenCount", description="Number of tokens in the prompt."
+    )
+
+    candidates_token_count: int | None = Field(
+        None, alias="candidatesTokenCount", description="Number of tokens in the generated responses."
+    )
+
+    total_token_count: int | None = Field(
+        None, alias="totalTokenCount", description="Total number of tokens of the request."
+    )
+
+
 class GenerationResponse(BaseModel):
     candidates: list[GenerationCandidate] = Field(
         [], description="The generated responses."
     )
+
+    usage_metadata: UsageMetadata | None = Field(
+        None, alias="usageMetadata", description="Token usage of the request."
+    )
+
+    @classmethod
+    def from_stream_chunks(cls, chunks: list["GenerationResponse"]) -> "GenerationResponse":
+        """Assemble the partial responses of a streamed generation into one response."""
+        texts: dict[int, list[str]] = {}
+        candidates: dict[int, GenerationCandidate] = {}
+
+        for chunk in chunks:
+            for candidate in chunk.candidates:
+                if candidate.content is not None:
+                    texts.setdefault(candidate.index, []).extend(
+                        part.text for part in candidate.content.parts
+                    )
+                candidates[candidate.index] = candidate
+
+        return cls(
+            usage_metadata=next(
+                (
+                    chunk.usage_metadata
+                    for chunk in reversed(chunks)
+                    if chunk.usage_metadata is not None
+                ),
+                None,
+            ),
+            candidates=[
+                GenerationCandidate(
+                    index=index,
+                    content=Content(
+                        role="model", parts=[TextPart(text="".join(texts[index]))]
+                    ) if index in texts else None,
+                    finish_reason=candidate.finish_reason,
+                    safety_ratings=candidate.safety_ratings,
+                )
+                for index, candidate in sorted(candidates.items())
+            ]
+        )
+
+
+class LazyGenerationResponse:
+    """A generation response that keeps the raw JSON and validates fields on first access.
+
+    Reading `text` never builds pydantic models, and `candidates` /
+    `usage_metadata` are validated only when used. `to_response` returns the
+    fully validated `GenerationResponse`.
+    """
+
+    __slots__ = ("raw", "_candidates", "_usage_metadata")
+
+    def __init__(self, raw: dict):
+        self.raw = raw
+        self._candidates = None
+        self._usage_metadata = None
+
+    @property
+    def candidates(self) -> list[GenerationCandidate]:
+        if self._candidates is None:
+            self._candidates = [
+                GenerationCandidate.model_validate(candidate)
+                for candidate in self.raw.get("candidates", [])
+            ]
+        return self._candidates
+
+    @property
+    def usage_metadata(self) -> UsageMetadata | None:
+        if self._usage_metadata is None and self.raw.get("usageMetadata") is not None:
+            self._usage_metadata = UsageMetadata.model_validate(self.raw["usageMetadata"])
+        return self._usage_metadata
+
+    @property
+    def text(self) -> str:
+        """Text of the first candidate, read straight from the raw response."""
+        candidates = self.raw.get("candidates") or []
+        if len(candidates) == 0 or candidates[0].get("content") is None:
+            raise ValueError("No content to get text from. " + str(self.raw))
+        return "".join(part.get("text", "") for part in candidates[0]["content"]["parts"])
+
+    def to_response(self) -> GenerationResponse:
+        return GenerationResponse.model_validate(self.raw)
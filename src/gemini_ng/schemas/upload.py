@@ -1,4 +1,5 @@
 import mimetypes
+from datetime import datetime, timezone
 
 from pydantic import Field, HttpUrl
 
@@ -7,7 +8,11 @@ from .part import FilePart, FilePartData
 
 
 class UploadFile(BaseModel):
-    file_path: str = Field(..., description="Path to the file.")
+    file_path: str | None = Field(None, description="Path to the file.")
+
+    data: bytes | None = Field(
+        None, description="In-memory content of the file, used instead of `file_path`."
+    )
 
     mime_type: str | None = Field(None, description="MIME type of the file.")
 
@@ -18,6 +23,12 @@ class UploadFile(BaseModel):
         mine_type, _ = mimetypes.guess_type(file_path)
         return cls(file_path=file_path, mime_type=mine_type, body=body)
 
+    @classmethod
+    def from_bytes(
+        cls, data: bytes, mime_type: str | None = None, body: dict | None = None
+    ) -> "UploadFile":
+        return cls(data=data, mime_type=mime_type, body=body)
+
 
 class UploadedFile(BaseModel):
     name: str = Field(..., description="Unique identifier for the file.")
@@ -42,5 +53,25 @@ class UploadedFile(BaseModel):
 
     uri: HttpUrl = Field(..., description="URI of the file.")
 
+    state: str | None = Field(
+        None, description="Processing state of the file: `PROCESSING`, `ACTIVE` or `FAILED`."
+    )
+
+    error: dict | None = Field(None, description="Error status if processing failed.")
+
+    def seconds_until_expiration(self) -> float | None:
+        if self.expiration_time is None:
+            return None
+
+        expiration_time = datetime.fromisoformat(self.expiration_time)
+        if expiration_time.tzinfo is None:
+            expiration_time = expiration_time.replace(tzinfo=timezone.utc)
+
+        return (expiration_time - datetime.now(timezone.utc)).total_seconds()
+
+    def is_expired(self, margin: float = 0.0) -> bool:
+        seconds = self.seconds_until_expiration()
+        return seconds is not None and seconds <= margin
+
     def to_file_part(self):
         return FilePart(file_data=FilePartData(file_uri=str(self.uri), mime_type=self.mime_type))
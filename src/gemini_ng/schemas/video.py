@@ -0,0 +1,95 @@
+import typing
+
+from pydantic import Field
+
+from .base import BaseModel
+
+
+class VideoSamplingConfig(BaseModel):
+    sample_fps: float = Field(
+        1.0,
+        description=(
+            "Frames sampled per second. In adaptive mode these are the candidate frames "
+            "that scene detection chooses from."
+        ),
+    )
+
+    adaptive: bool = Field(
+        False, description="Only keep candidate frames that differ enough from the last kept one."
+    )
+
+    scene_threshold: float = Field(
+        0.05,
+        description=(
+            "Mean absolute difference (0 to 1) between downscaled grayscale frames above "
+            "which a candidate frame counts as a scene change."
+        ),
+    )
+
+    max_interval: float | None = Field(
+        None,
+        description="In adaptive mode, keep a frame at least this often (seconds), even without changes.",
+    )
+
+    max_frames: int | None = Field(
+        None, description="Maximum number of frames sampled from the whole video."
+    )
+
+
+class FrameEncodingConfig(BaseModel):
+    max_size: int | None = Field(
+        None,
+        description=(
+            "Maximum length of the longer side of a frame, in pixels. Larger frames are "
+            "downscaled by the decoder's scaler, keeping their aspect ratio."
+        ),
+    )
+
+    image_format: typing.Literal["JPEG", "WEBP", "PNG"] = Field(
+        "JPEG", description="Image format frames are encoded to."
+    )
+
+    quality: int | None = Field(
+        None, description="JPEG/WebP quality (1-100). The encoder default if unset."
+    )
+
+    resample: typing.Literal[
+        "FAST_BILINEAR", "BILINEAR", "BICUBIC", "AREA", "LANCZOS"
+    ] = Field("AREA", description="Interpolation used when downscaling.")
+
+    @property
+    def mime_type(self) -> str:
+        return f"image/{self.image_format.lower()}"
+
+
+class FrameDirectoryConfig(BaseModel):
+    pattern: str | None = Field(
+        None,
+        description=(
+            "Regular expression searched in each file name for the frame number: its `index` "
+            "group, or its first group. Files that do not match are skipped. By default the "
+            "last number in the file name is used, e.g. `0001.jpg` or `frame_001.png`."
+        ),
+    )
+
+    timestamps: str | None = Field(
+        None,
+        description=(
+            "Sidecar file with the timestamp (seconds) of every frame: a JSON object mapping "
+            "file names to timestamps or a JSON list in frame order, or a CSV/text file with "
+            "`name,seconds` or `seconds` lines. Defaults to `timestamps.json`, `.csv` or "
+            "`.txt` in the directory, if present."
+        ),
+    )
+
+    fps: float = Field(
+        1.0, description="Frame rate assumed for the frames when there is no sidecar file."
+    )
+
+    hash_workers: int | None = Field(
+        None,
+        description=(
+            "Processes hashing frames that are not in the file hash index yet. Defaults to "
+            "the number of CPUs."
+        ),
+    )
@@ -0,0 +1,261 @@
+import json
+import sqlite3
+import threading
+import time
+import uuid
+from pathlib import Path
+from typing import TYPE_CHECKING
+
+from pydantic import BaseModel
+
+from .schemas import ChatMessage, FilePart, TextPart
+from .schemas.part import FilePartData
+from .utils.cache import get_cache_dir
+
+if TYPE_CHECKING:
+    from .async_client import AsyncGeminiClient
+    from .chat import ChatSession
+    from .client import GeminiClient
+
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS sessions (
+    id TEXT PRIMARY KEY,
+    model TEXT NOT NULL,
+    config TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS messages (
+    session_id TEXT NOT NULL REFERENCES sessions (id) ON DELETE CASCADE,
+    seq INTEGER NOT NULL,
+    role TEXT NOT NULL,
+    parts TEXT NOT NULL,
+    token_count INTEGER,
+    PRIMARY KEY (session_id, seq)
+) WITHOUT ROWID;
+"""
+
+
+class ChatSessionStore:
+    """Persists chat sessions by id in a SQLite database.
+
+    Each turn only appends its new messages; the stored history is rewritten
+    only when a history policy drops or summarizes earlier turns. Sessions are
+    restored without re-validating their messages, so long conversations can
+    be evicted from memory and resumed cheaply.
+
+    Connections are per thread, so a store can be shared by sessions used from
+    different threads and by `AsyncChatSession`, which writes from a worker
+    thread.
+    """
+
+    def __init__(self, path: str | Path | None = None):
+        if path is None:
+            path = get_cache_dir() / "chat_sessions.sqlite3"
+
+        self.path = str(path)
+        self._thread_local = threading.local()
+
+        self._connect().executescript(_SCHEMA)
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = getattr(self._thread_local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30.0)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("PRAGMA foreign_keys=ON")
+            self._thread_local.conn = conn
+        return conn
+
+    def create_session(
+        self,
+        model: str,
+        session_id: str | None = None,
+        generation_config: BaseModel | dict | None = None,
+        safety_settings: list[BaseModel | dict] | None = None,
+        history_policy: BaseModel | dict | None = None,
+    ) -> str:
+        """Register a new session; stored sessions are resumed with `load` instead."""
+        session_id = session_id or uuid.uuid4().hex
+        config = {
+            "generation_config": _dump(generation_config),
+            "safety_settings": (
+                [_dump(setting) for setting in safety_settings]
+                if safety_settings is not None else None
+            ),
+            "history_policy": _dump(history_policy),
+        }
+
+        now = time.time()
+        try:
+            with self._connect() as conn:
+                conn.execute(
+                    "INSERT INTO sessions VALUES (?, ?, ?, ?, ?)",
+                    (session_id, model, _encode(config), now, now),
+                )
+        except sqlite3.IntegrityError:
+            raise ValueError(
+                f"Chat session already exists: {session_id}. "
+                "Use `ChatSessionStore.load` to resume it."
+            ) from None
+
+        return session_id
+
+    def append_messages(
+        self,
+        session_id: str,
+        start: int,
+        messages: list[ChatMessage],
+        token_counts: dict[int, int] | None = None,
+    ):
+        """Store `messages` at positions `start`, `start + 1`, ... of the history.
+
+        `token_counts` maps history positions, including already stored ones,
+        to their token count.
+        """
+        with self._connect() as conn:
+            self._insert_messages(conn, session_id, start, messages, token_counts)
+
+    def replace_messages(
+        self,
+        session_id: str,
+        messages: list[ChatMessage],
+        token_counts: dict[int, int] | None = None,
+    ):
+        """Rewrite the whole stored history of a session."""
+        # One transaction, so a failure cannot leave the session without history.
+        with self._connect() as conn:
+            conn.execute("DELETE FROM messages WHERE session_id = ?", (session_id,))
+            self._insert_messages(conn, session_id, 0, messages, token_counts)
+
+    def _insert_messages(
+        self,
+        conn: sqlite3.Connection,
+        session_id: str,
+        start: int,
+        messages: list[ChatMessage],
+        token_counts: dict[int, int] | None = None,
+    ):
+        token_counts = token_counts or {}
+
+        conn.executemany(
+            "INSERT INTO messages VALUES (?, ?, ?, ?, ?)",
+            [
+                (
+                    session_id,
+                    seq,
+                    message.role,
+                    _encode(_dump_parts(message)),
+                    token_counts.get(seq),
+                )
+                for seq, message in enumerate(messages, start)
+            ],
+        )
+        conn.executemany(
+            "UPDATE messages SET token_count = ? WHERE session_id = ? AND seq = ?",
+            [
+                (count, session_id, seq)
+                for seq, count in token_counts.items()
+                if seq < start
+            ],
+        )
+        self._touch(conn, session_id)
+
+    def load_messages(self, session_id: str) -> tuple[list[ChatMessage], dict[int, int]]:
+        """Return the stored history of a session and the known token counts by position."""
+        rows = self._connect().execute(
+            "SELECT seq, role, parts, token_count FROM messages"
+            " WHERE session_id = ? ORDER BY seq",
+            (session_id,),
+        )
+
+        messages = []
+        token_counts = {}
+        for seq, role, parts, token_count in rows:
+            # Stored messages were validated when they were first appended.
+            messages.append(
+                ChatMessage.model_construct(
+                    role=role, parts=[_construct_part(part) for part in json.loads(parts)]
+                )
+            )
+            if token_count is not None:
+                token_counts[seq] = token_count
+
+        return messages, token_counts
+
+    def load(
+        self, client: "GeminiClient | AsyncGeminiClient", session_id: str
+    ) -> "ChatSession":
+        """Resume a stored session with `client`."""
+        row = self._connect().execute(
+            "SELECT model, config FROM sessions WHERE id = ?", (session_id,)
+        ).fetchone()
+        if row is None:
+            raise KeyError(f"Chat session not found: {session_id}")
+
+        model, config = row[0], json.loads(row[1])
+        messages, token_counts = self.load_messages(session_id)
+
+        session = client.start_chat(
+            model,
+            history=messages,
+            generation_config=config["generation_config"],
+            safety_settings=config["safety_settings"],
+            history_policy=config["history_policy"],
+        )
+        session._resume(self, session_id, token_counts)
+
+        return session
+
+    def list_sessions(self) -> list[str]:
+        rows = self._connect().execute("SELECT id FROM sessions ORDER BY updated_at DESC")
+        return [session_id for session_id, in rows]
+
+    def delete(self, session_id: str):
+        with self._connect() as conn:
+            conn.execute("DELETE FROM sessions WHERE id = ?", (session_id,))
+
+    def clear_messages(self, session_id: str):
+        with self._connect() as conn:
+            conn.execute("DELETE FROM messages WHERE session_id = ?", (session_id,))
+            self._touch(conn, session_id)
+
+    def close(self):
+        conn = getattr(self._thread_local, "conn", None)
+        if conn is not None:
+            conn.close()
+            self._thread_local.conn = None
+
+    @staticmethod
+    def _touch(conn: sqlite3.Connection, session_id: str):
+        conn.execute(
+            "UPDATE sessions SET updated_at = ? WHERE id = ?", (time.time(), session_id)
+        )
+
+
+def _dump(value: BaseModel | dict | None) -> dict | None:
+    if isinstance(value, BaseModel):
+        return value.model_dump(by_alias=True, exclude_none=True)
+    return value
+
+
+def _dump_parts(message: ChatMessage) -> list[dict]:
+    return [part.model_dump(by_alias=True, exclude_none=True) for part in message.parts]
+
+
+def _encode(value) -> str:
+    return json.dumps(value, separators=(",", ":"), ensure_ascii=False)
+
+
+def _construct_part(data: dict) -> TextPart | FilePart:
+    if "text" in data:
+        return TextPart.model_construct(text=data["text"])
+
+    file_data = data["file_data"]
+    return FilePart.model_construct(
+        file_data=FilePartData.model_construct(
+            file_uri=file_data["fileUri"], mime_type=file_data["mimeType"]
+        )
+    )
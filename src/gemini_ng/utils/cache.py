@@ -1,9 +1,14 @@
+import hashlib
+import json
 import os
+import threading
 from pathlib import Path
 
 from diskcache import Cache
 
 _CACHE = None
+_RESPONSE_CACHES: dict[int, Cache] = {}
+_CACHE_LOCK = threading.Lock()
 
 
 def get_cache_dir() -> Path:
@@ -22,6 +27,36 @@ def get_cache_instance() -> Cache:
     global _CACHE
 
     if _CACHE is None:
-        _CACHE = Cache(get_cache_dir())
+        with _CACHE_LOCK:
+            if _CACHE is None:
+                _CACHE = Cache(get_cache_dir())
 
     return _CACHE
+
+
+def get_response_cache_instance(size_limit: int) -> Cache:
+    """Response cache bounded to `size_limit` bytes.
+
+    Each size limit has its own cache directory, so clients with different
+    limits do not evict each other's entries; clients with the same limit
+    share one cache.
+    """
+    cache = _RESPONSE_CACHES.get(size_limit)
+
+    if cache is None:
+        with _CACHE_LOCK:
+            cache = _RESPONSE_CACHES.get(size_limit)
+            if cache is None:
+                cache = _RESPONSE_CACHES[size_limit] = Cache(
+                    get_cache_dir() / f"responses-{size_limit}",
+                    size_limit=size_limit,
+                    eviction_policy="least-recently-used",
+                )
+
+    return cache
+
+
+def canonical_hash(obj) -> str:
+    """SHA-256 of the canonical JSON encoding of `obj` (sorted keys, no whitespace)."""
+    data = json.dumps(obj, sort_keys=True, separators=(",", ":"), ensure_ascii=False)
+    return hashlib.sha256(data.encode("utf-8")).hexdigest()
@@ -0,0 +1,128 @@
+import threading
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from contextlib import contextmanager
+from typing import Callable, Generic, Iterable, Iterator, TypeVar
+
+from ..schemas import BatchResult, GenerationResponse
+
+T = TypeVar("T")
+R = TypeVar("R")
+
+
+def imap_bounded(
+    fn: Callable[[T], R],
+    iterable: Iterable[T],
+    max_workers: int = 8,
+    max_pending: int | None = None,
+    ordered: bool = True,
+) -> Iterator[tuple[int, "Future[R]"]]:
+    """Lazily apply `fn` to `iterable` on a thread pool.
+
+    At most `max_pending` items are pulled from `iterable` ahead of the consumer,
+    so arbitrarily long (or still-being-produced) inputs never get materialized.
+    Yields `(index, future)` pairs, either in input order or as they complete;
+    the futures are already done, so `future.result()` does not block.
+    """
+    if max_workers < 1:
+        raise ValueError(f"max_workers must be at least 1, got {max_workers}")
+
+    if max_pending is None:
+        max_pending = max_workers * 2
+    max_pending = max(max_pending, max_workers)
+
+    items = enumerate(iterable)
+    exhausted = False
+    pending: dict[Future, int] = {}
+    order: deque[Future] = deque()
+
+    executor = ThreadPoolExecutor(max_workers=max_workers)
+    try:
+        while True:
+            while not exhausted and len(pending) < max_pending:
+                try:
+                    index, item = next(items)
+                except StopIteration:
+                    exhausted = True
+                    break
+
+                future = executor.submit(fn, item)
+                pending[future] = index
+                if ordered:
+                    order.append(future)
+
+            if not pending:
+                break
+
+            if ordered:
+                future = order.popleft()
+                wait([future])
+            else:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                future = next(iter(done))
+
+            yield pending.pop(future), future
+    finally:
+        for future in pending:
+            future.cancel()
+        executor.shutdown(wait=True)
+
+
+def imap_batch_results(
+    generate: Callable[[T], GenerationResponse],
+    prompts: Iterable[T],
+    max_concurrency: int = 8,
+    ordered: bool = True,
+) -> Iterator[BatchResult]:
+    """Run `generate` over `prompts` like `imap_bounded`, wrapping outcomes in `BatchResult`s.
+
+    A failed prompt yields a result carrying its exception instead of raising.
+    """
+    for index, future in imap_bounded(
+        generate, prompts, max_workers=max_concurrency, ordered=ordered
+    ):
+        error = future.exception()
+        if error is not None:
+            yield BatchResult(index=index, error=error)
+        else:
+            yield BatchResult(index=index, response=future.result())
+
+
+class ObjectPool(Generic[T]):
+    """Thread-safe pool of objects that must not be used by two threads at once.
+
+    Objects, e.g. HTTP transports, are checked out for the duration of a call
+    and returned afterwards, so their keep-alive connections outlive the
+    (often short-lived) worker threads that used them. At most `max_idle`
+    objects are kept; the surplus is passed to `close`.
+    """
+
+    def __init__(
+        self,
+        factory: Callable[[], T],
+        max_idle: int = 20,
+        close: Callable[[T], None] | None = None,
+    ):
+        self.factory = factory
+        self.max_idle = max_idle
+        self.close = close
+        self._idle: list[T] = []
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def get(self) -> Iterator[T]:
+        with self._lock:
+            obj = self._idle.pop() if self._idle else None
+        if obj is None:
+            obj = self.factory()
+
+        try:
+            yield obj
+        finally:
+            with self._lock:
+                # Most recently used first, as its connections are most likely alive.
+                keep = len(self._idle) < self.max_idle
+                if keep:
+                    self._idle.append(obj)
+            if not keep and self.close is not None:
+                self.close(obj)
@@ -0,0 +1,52 @@
+import json
+import os
+
+import requests
+
+from .cache import get_cache_instance
+
+# Bump to invalidate discovery documents cached by older releases.
+DISCOVERY_CACHE_VERSION = 1
+
+
+def load_discovery_document(
+    base_url: str,
+    version: str,
+    api_key: str,
+    document: str | bytes | dict | None = None,
+    ttl: float | None = 7 * 24 * 60 * 60,
+    refresh: bool = False,
+) -> str | bytes | dict:
+    """Return the discovery document of the Gemini API, fetching it only when needed.
+
+    Resolution order: the explicit `document` (a path, JSON text or parsed dict),
+    the `GEMINI_NG_DISCOVERY_DOCUMENT` file, the on-disk cache, and finally the network.
+    """
+    if document is None:
+        document = os.getenv("GEMINI_NG_DISCOVERY_DOCUMENT")
+
+    if document is not None:
+        if isinstance(document, str) and not document.lstrip().startswith("{"):
+            with open(document, "rb") as f:
+                return f.read()
+        return document
+
+    cache = get_cache_instance()
+    cache_key = f"discovery_v{DISCOVERY_CACHE_VERSION}_{base_url}_{version}"
+
+    if not refresh:
+        cached_obj = cache.get(cache_key)
+        if cached_obj is not None:
+            return cached_obj
+
+    rsp = requests.get(
+        f"{base_url}/$discovery/rest",
+        params={"version": version, "key": api_key},
+    )
+    rsp.raise_for_status()
+
+    # Make sure a truncated or non-JSON body never gets cached.
+    json.loads(rsp.content)
+    cache.set(cache_key, rsp.content, expire=ttl)
+
+    return rsp.content
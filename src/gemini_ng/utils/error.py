@@ -1,51 +1,116 @@
+import time
+from email.utils import parsedate_to_datetime
 from functools import wraps
 
+import httpx
+import requests
 from googleapiclient.errors import HttpError
 
+HTTPErrorType = HttpError | requests.HTTPError | httpx.HTTPStatusError
+
 
 class ResourceNotFound(Exception):
-    def __init__(self, inner_exception: HttpError):
+    def __init__(self, inner_exception: HTTPErrorType):
         super().__init__(f"Resource not found: {inner_exception}")
 
         self.inner_exception = inner_exception
 
 
 class AccessDenied(Exception):
-    def __init__(self, inner_exception: HttpError):
+    def __init__(self, inner_exception: HTTPErrorType):
         super().__init__(f"Access denied: {inner_exception}")
 
         self.inner_exception = inner_exception
 
 
 class RateLimitExceeded(Exception):
-    def __init__(self, inner_exception: HttpError):
+    def __init__(self, inner_exception: HTTPErrorType):
         super().__init__(f"Rate limit exceeded: {inner_exception}")
 
         self.inner_exception = inner_exception
 
 
 class InternalServerError(Exception):
-    def __init__(self, inner_exception: HttpError):
+    def __init__(self, inner_exception: HTTPErrorType):
         super().__init__(f"Internal server error: {inner_exception}")
 
         self.inner_exception = inner_exception
 
 
+class ServiceUnavailable(Exception):
+    def __init__(self, inner_exception: HTTPErrorType):
+        super().__init__(f"Service unavailable: {inner_exception}")
+
+        self.inner_exception = inner_exception
+
+
+class FileProcessingError(Exception):
+    def __init__(self, name: str, reason: str):
+        super().__init__(f"Processing of file {name} failed: {reason}")
+
+        self.name = name
+        self.reason = reason
+
+
+def map_http_exception(status: int, e: Exception) -> Exception:
+    if status == 404:
+        return ResourceNotFound(e)
+    elif status == 403:
+        return AccessDenied(e)
+    elif status == 429:
+        return RateLimitExceeded(e)
+    elif status == 500:
+        return InternalServerError(e)
+    elif status == 503:
+        return ServiceUnavailable(e)
+    else:
+        return e
+
+
 def handle_http_exception(f):
     @wraps(f)
     def wrapper(*args, **kwargs):
         try:
             return f(*args, **kwargs)
         except HttpError as e:
-            if e.resp.status == 404:
-                raise ResourceNotFound(e)
-            elif e.resp.status == 403:
-                raise AccessDenied(e)
-            elif e.resp.status == 429:
-                raise RateLimitExceeded(e)
-            elif e.resp.status == 500:
-                raise InternalServerError(e)
-            else:
-                raise e
+            raise map_http_exception(e.resp.status, e)
+        except requests.HTTPError as e:
+            raise map_http_exception(e.response.status_code, e)
+
+    return wrapper
+
+
+def handle_async_http_exception(f):
+    @wraps(f)
+    async def wrapper(*args, **kwargs):
+        try:
+            return await f(*args, **kwargs)
+        except httpx.HTTPStatusError as e:
+            raise map_http_exception(e.response.status_code, e)
 
     return wrapper
+
+
+def get_retry_after(e: Exception) -> float | None:
+    """Return the delay in seconds requested by the `Retry-After` header of `e`, if any."""
+    inner_exception = getattr(e, "inner_exception", e)
+
+    if isinstance(inner_exception, HttpError):
+        value = inner_exception.resp.get("retry-after")
+    elif isinstance(inner_exception, (requests.HTTPError, httpx.HTTPStatusError)):
+        value = inner_exception.response.headers.get("retry-after")
+    else:
+        return None
+
+    if value is None:
+        return None
+
+    try:
+        return max(float(value), 0.0)
+    except ValueError:
+        pass
+
+    try:
+        return max(parsedate_to_datetime(value).timestamp() - time.time(), 0.0)
+    except (TypeError, ValueError):
+        return None
@@ -0,0 +1,134 @@
+import csv
+import json
+import os
+import re
+from typing import NamedTuple
+
+from ..schemas import FrameDirectoryConfig
+
+FRAME_EXTENSIONS = (".jpg", ".jpeg", ".png", ".webp")
+
+# Sidecar files looked up in the frame directory when none is given.
+TIMESTAMP_SIDECARS = ("timestamps.json", "timestamps.csv", "timestamps.txt")
+
+_DIGITS = re.compile(r"(\d+)")
+_LAST_NUMBER = re.compile(r"(\d+)\D*$")
+
+
+class FrameFile(NamedTuple):
+    path: str
+    name: str
+    number: int | None
+    timestamp: float
+
+
+def natural_sort_key(name: str) -> list:
+    """Sort key ordering the numbers embedded in `name` by value, e.g. `f2` before `f10`."""
+    return [int(token) if token.isdigit() else token.lower() for token in _DIGITS.split(name)]
+
+
+def scan_frame_directory(
+    directory: str, config: FrameDirectoryConfig | None = None
+) -> list[FrameFile]:
+    """List the frame images in `directory` in playback order, with their timestamps."""
+    config = config or FrameDirectoryConfig()
+    pattern = re.compile(config.pattern) if config.pattern is not None else None
+
+    frames = []
+    with os.scandir(directory) as entries:
+        for entry in entries:
+            if not entry.name.lower().endswith(FRAME_EXTENSIONS) or not entry.is_file():
+                continue
+
+            if pattern is not None:
+                match = pattern.search(entry.name)
+                if match is None:
+                    continue
+                number = int(match["index"] if "index" in pattern.groupindex else match[1])
+            else:
+                match = _LAST_NUMBER.search(os.path.splitext(entry.name)[0])
+                number = int(match[1]) if match is not None else None
+
+            frames.append((number, entry.path, entry.name))
+
+    if not frames:
+        raise ValueError(f"No frame images found in {directory}")
+
+    # Frames without a number go last, in natural order.
+    frames.sort(key=lambda f: (f[0] is None, f[0] or 0, natural_sort_key(f[2])))
+
+    for (number, _, name), (next_number, _, next_name) in zip(frames, frames[1:]):
+        if number is not None and number == next_number:
+            raise ValueError(f"Frames {name} and {next_name} have the same frame number {number}")
+
+    sidecar = config.timestamps or _find_sidecar(directory)
+    if sidecar is not None:
+        timestamps = _match_timestamps(load_timestamps(sidecar), [name for _, _, name in frames])
+    else:
+        timestamps = [i / config.fps for i in range(len(frames))]
+
+    return [
+        FrameFile(path=path, name=name, number=number, timestamp=timestamp)
+        for (number, path, name), timestamp in zip(frames, timestamps)
+    ]
+
+
+def load_timestamps(path: str) -> dict[str, float] | list[float]:
+    """Read a timestamp sidecar file: either timestamps by file name or a list in frame order."""
+    with open(path, newline="") as f:
+        if path.lower().endswith(".json"):
+            data = json.load(f)
+            if isinstance(data, dict):
+                return {name: float(timestamp) for name, timestamp in data.items()}
+            return [float(timestamp) for timestamp in data]
+
+        by_name = {}
+        in_order = []
+        for i, row in enumerate(csv.reader(f, skipinitialspace=True)):
+            if not row or row[0].startswith("#"):
+                continue
+            try:
+                if len(row) >= 2:
+                    by_name[row[0]] = float(row[1])
+                else:
+                    in_order.append(float(row[0]))
+            except ValueError:
+                # Tolerate a header line.
+                if i == 0:
+                    continue
+                raise ValueError(f"Invalid timestamp on line {i + 1} of {path}: {row}")
+
+    if by_name and in_order:
+        raise ValueError(f"{path} mixes `name,seconds` and `seconds` lines")
+    return by_name or in_order
+
+
+def _find_sidecar(directory: str) -> str | None:
+    for name in TIMESTAMP_SIDECARS:
+        path = os.path.join(directory, name)
+        if os.path.isfile(path):
+            return path
+    return None
+
+
+def _match_timestamps(timestamps: dict[str, float] | list[float], names: list[str]) -> list[float]:
+    if isinstance(timestamps, dict):
+        missing = [name for name in names if name not in timestamps]
+        if missing:
+            raise ValueError(
+                f"No timestamp for {len(missing)} frame(s) in the sidecar file, e.g. {missing[0]}"
+            )
+        timestamps = [timestamps[name] for name in names]
+    elif len(timestamps) != len(names):
+        raise ValueError(
+            f"The sidecar file has {len(timestamps)} timestamps for {len(names)} frames"
+        )
+
+    for i in range(1, len(timestamps)):
+        if timestamps[i] < timestamps[i - 1]:
+            raise ValueError(
+                f"Timestamps must not decrease in frame order: {names[i]} is at "
+                f"{timestamps[i]}s, after {names[i - 1]} at {timestamps[i - 1]}s"
+            )
+
+    return timestamps
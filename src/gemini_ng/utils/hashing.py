@@ -0,0 +1,97 @@
+import hashlib
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import Iterator
+
+from diskcache import Cache
+
+from .metrics import increment, timed
+
+HASH_CHUNK_SIZE = 1 << 20
+
+# Metadata index entries of files that are never seen again eventually expire.
+FILE_META_TTL = 30 * 24 * 60 * 60
+
+# Below this many files to hash, starting a process pool costs more than it saves.
+PROCESS_POOL_MIN_FILES = 32
+
+
+def sha256_file(file_path: str, chunk_size: int = HASH_CHUNK_SIZE) -> str:
+    m = hashlib.sha256()
+    buffer = bytearray(chunk_size)
+    view = memoryview(buffer)
+
+    with open(file_path, "rb", buffering=0) as f:
+        while n := f.readinto(buffer):
+            m.update(view[:n])
+
+    return m.hexdigest()
+
+
+def get_file_sha256(file_path: str, cache: Cache) -> str:
+    """SHA-256 of `file_path`, reusing the hash of a previous call if the file is unchanged.
+
+    Files are identified by path, size, mtime and inode, so unchanged files are
+    never read again.
+    """
+    stat = os.stat(file_path)
+    meta_key = _file_meta_key(file_path, stat)
+
+    sha256_hash = cache.get(meta_key)
+    if sha256_hash is None:
+        increment("cache.miss", cache="file_hash")
+        with timed("file.hash"):
+            sha256_hash = sha256_file(file_path)
+        increment("bytes.hashed", stat.st_size)
+        cache.set(meta_key, sha256_hash, expire=FILE_META_TTL)
+    else:
+        increment("cache.hit", cache="file_hash")
+
+    return sha256_hash
+
+
+def iter_file_sha256(
+    file_paths: list[str], cache: Cache, max_workers: int | None = None
+) -> Iterator[str]:
+    """SHA-256 of each of `file_paths`, in order, like `get_file_sha256`.
+
+    Files missing from the metadata index are hashed by a pool of
+    `max_workers` processes (by default one per CPU). Hashes are yielded as
+    soon as they are ready, so callers can start using the first ones while
+    later files are still being hashed.
+    """
+    stats = [os.stat(file_path) for file_path in file_paths]
+    meta_keys = [_file_meta_key(path, stat) for path, stat in zip(file_paths, stats)]
+    hashes = [cache.get(meta_key) for meta_key in meta_keys]
+
+    missing = [path for path, sha256_hash in zip(file_paths, hashes) if sha256_hash is None]
+    increment("cache.hit", len(hashes) - len(missing), cache="file_hash")
+    increment("cache.miss", len(missing), cache="file_hash")
+
+    num_workers = max_workers or os.cpu_count() or 1
+    executor = None
+    if num_workers > 1 and len(missing) >= PROCESS_POOL_MIN_FILES:
+        executor = ProcessPoolExecutor(max_workers=num_workers)
+        computed = executor.map(
+            sha256_file, missing, chunksize=max(1, min(64, len(missing) // (num_workers * 4)))
+        )
+    else:
+        computed = map(sha256_file, missing)
+
+    try:
+        for stat, meta_key, sha256_hash in zip(stats, meta_keys, hashes):
+            if sha256_hash is None:
+                sha256_hash = next(computed)
+                increment("bytes.hashed", stat.st_size)
+                cache.set(meta_key, sha256_hash, expire=FILE_META_TTL)
+            yield sha256_hash
+    finally:
+        if executor is not None:
+            executor.shutdown(cancel_futures=True)
+
+
+def _file_meta_key(file_path: str, stat: os.stat_result) -> str:
+    return (
+        f"file_meta_{os.path.abspath(file_path)}"
+        f"_{stat.st_size}_{stat.st_mtime_ns}_{stat.st_ino}"
+    )
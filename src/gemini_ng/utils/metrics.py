@@ -0,0 +1,188 @@
+import math
+import threading
+import time
+from contextlib import nullcontext
+from typing import Callable, Literal, NamedTuple
+
+
+class MetricEvent(NamedTuple):
+    kind: Literal["timing", "counter"]
+    name: str
+    value: float
+    tags: dict | None
+
+
+MetricsHook = Callable[[MetricEvent], None]
+
+# Hooks are replaced, never mutated, so emitting needs no lock.
+_HOOKS: tuple[MetricsHook, ...] = ()
+_HOOKS_LOCK = threading.Lock()
+
+_NULL_TIMER = nullcontext()
+
+
+def add_metrics_hook(hook: MetricsHook):
+    global _HOOKS
+
+    with _HOOKS_LOCK:
+        _HOOKS = _HOOKS + (hook,)
+
+
+def remove_metrics_hook(hook: MetricsHook):
+    global _HOOKS
+
+    with _HOOKS_LOCK:
+        _HOOKS = tuple(h for h in _HOOKS if h is not hook)
+
+
+def metrics_enabled() -> bool:
+    return bool(_HOOKS)
+
+
+def emit(event: MetricEvent):
+    for hook in _HOOKS:
+        hook(event)
+
+
+def record(name: str, value: float, **tags):
+    """Record a timing sample, in seconds."""
+    if _HOOKS:
+        emit(MetricEvent("timing", name, value, tags or None))
+
+
+def increment(name: str, value: float = 1, **tags):
+    """Add `value` to a counter, e.g. bytes sent or cache hits."""
+    if _HOOKS:
+        emit(MetricEvent("counter", name, value, tags or None))
+
+
+class _Timer:
+    __slots__ = ("name", "tags", "start")
+
+    def __init__(self, name: str, tags: dict | None):
+        self.name = name
+        self.tags = tags
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        emit(MetricEvent("timing", self.name, time.perf_counter() - self.start, self.tags))
+
+
+def timed(name: str, **tags):
+    """Context manager recording how long its body takes.
+
+    Without any hook installed this returns a shared no-op context, so timing
+    a phase costs a single check.
+    """
+    if not _HOOKS:
+        return _NULL_TIMER
+    return _Timer(name, tags or None)
+
+
+class Histogram:
+    """Log-bucketed histogram with a bounded relative error on percentiles."""
+
+    def __init__(self, precision: float = 0.01):
+        self._log_base = math.log1p(precision)
+        self.buckets: dict[int, int] = {}
+        self.count = 0
+        self.total = 0.0
+        self.min = math.inf
+        self.max = -math.inf
+
+    def add(self, value: float):
+        index = math.floor(math.log(value) / self._log_base) if value > 0 else -(1 << 31)
+        self.buckets[index] = self.buckets.get(index, 0) + 1
+        self.count += 1
+        self.total += value
+        self.min = min(self.min, value)
+        self.max = max(self.max, value)
+
+    def percentile(self, q: float) -> float:
+        if self.count == 0:
+            return math.nan
+
+        rank = q / 100 * self.count
+        seen = 0
+        for index in sorted(self.buckets):
+            seen += self.buckets[index]
+            if seen >= rank:
+                if index == -(1 << 31):
+                    return 0.0
+                # Upper bound of the bucket, clamped to the observed range.
+                return min(max(math.exp((index + 1) * self._log_base), self.min), self.max)
+
+        return self.max
+
+    def summary(self) -> dict:
+        return {
+            "count": self.count,
+            "total": self.total,
+            "mean": self.total / self.count if self.count else math.nan,
+            "min": self.min,
+            "p50": self.percentile(50),
+            "p90": self.percentile(90),
+            "p99": self.percentile(99),
+            "max": self.max,
+        }
+
+
+class MetricsAggregator:
+    """In-memory metrics hook: timing histograms and counter totals.
+
+    Metrics are keyed by name and tags, e.g. `generate.request{model=models/x}`.
+    """
+
+    def __init__(self, precision: float = 0.01):
+        self.precision = precision
+        self.timings: dict[str, Histogram] = {}
+        self.counters: dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    def __call__(self, event: MetricEvent):
+        key = _metric_key(event.name, event.tags)
+
+        with self._lock:
+            if event.kind == "timing":
+                histogram = self.timings.get(key)
+                if histogram is None:
+                    histogram = self.timings[key] = Histogram(self.precision)
+                histogram.add(event.value)
+            else:
+                self.counters[key] = self.counters.get(key, 0) + event.value
+
+    def summary(self) -> dict:
+        with self._lock:
+            return {
+                "timings": {key: h.summary() for key, h in sorted(self.timings.items())},
+                "counters": dict(sorted(self.counters.items())),
+            }
+
+    def hit_rate(self, cache: str) -> float | None:
+        """Share of lookups of `cache` (`response`, `upload`, `file_hash`) that hit."""
+        hits = self.counters.get(_metric_key("cache.hit", {"cache": cache}), 0)
+        misses = self.counters.get(_metric_key("cache.miss", {"cache": cache}), 0)
+        if hits + misses == 0:
+            return None
+        return hits / (hits + misses)
+
+    def reset(self):
+        with self._lock:
+            self.timings = {}
+            self.counters = {}
+
+    def __enter__(self):
+        add_metrics_hook(self)
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        remove_metrics_hook(self)
+
+
+def _metric_key(name: str, tags: dict | None) -> str:
+    if not tags:
+        return name
+    return name + "{" + ",".join(f"{k}={v}" for k, v in sorted(tags.items())) + "}"
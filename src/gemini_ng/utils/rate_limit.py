@@ -0,0 +1,107 @@
+import threading
+import time
+
+from ..schemas import RateLimit
+from .metrics import record
+
+
+class TokenBucket:
+    """Thread-safe token bucket that hands out reservations instead of blocking.
+
+    The balance may go negative; callers sleep for the returned delay, which
+    keeps waiters in FIFO order without holding the lock while sleeping.
+    """
+
+    def __init__(self, per_minute: float):
+        self.capacity = per_minute
+        self.refill_rate = per_minute / 60.0
+        self.tokens = per_minute
+        self.updated_at = time.monotonic()
+        self.lock = threading.Lock()
+
+    def reserve(self, amount: float) -> float:
+        amount = min(amount, self.capacity)
+
+        with self.lock:
+            now = time.monotonic()
+            self.tokens = min(
+                self.capacity, self.tokens + (now - self.updated_at) * self.refill_rate
+            )
+            self.updated_at = now
+            self.tokens -= amount
+
+            if self.tokens >= 0:
+                return 0.0
+            return -self.tokens / self.refill_rate
+
+    def adjust(self, amount: float):
+        with self.lock:
+            self.tokens = min(self.capacity, self.tokens - amount)
+
+    def available(self) -> float:
+        """Current balance as a fraction of the capacity; negative while in debt."""
+        with self.lock:
+            tokens = min(
+                self.capacity,
+                self.tokens + (time.monotonic() - self.updated_at) * self.refill_rate,
+            )
+        return tokens / self.capacity
+
+
+class RateLimiter:
+    """Per-key (usually per-model) request and token rate limits, shared across threads."""
+
+    def __init__(
+        self,
+        default: RateLimit | None = None,
+        limits: dict[str, RateLimit] | None = None,
+    ):
+        self.default = default
+        self.limits = limits or {}
+        self._buckets: dict[str, tuple[TokenBucket | None, TokenBucket | None]] = {}
+        self._lock = threading.Lock()
+
+    def _get_buckets(self, key: str) -> tuple[TokenBucket | None, TokenBucket | None]:
+        buckets = self._buckets.get(key)
+        if buckets is None:
+            with self._lock:
+                buckets = self._buckets.get(key)
+                if buckets is None:
+                    limit = self.limits.get(key, self.default)
+                    if limit is None:
+                        buckets = (None, None)
+                    else:
+                        buckets = (
+                            TokenBucket(limit.requests_per_minute)
+                            if limit.requests_per_minute else None,
+                            TokenBucket(limit.tokens_per_minute)
+                            if limit.tokens_per_minute else None,
+                        )
+                    self._buckets[key] = buckets
+        return buckets
+
+    def acquire(self, key: str, tokens: int = 0):
+        request_bucket, token_bucket = self._get_buckets(key)
+
+        delay = 0.0
+        if request_bucket is not None:
+            delay = request_bucket.reserve(1)
+        if token_bucket is not None and tokens > 0:
+            delay = max(delay, token_bucket.reserve(tokens))
+
+        if delay > 0:
+            record("rate_limit.wait", delay, key=key)
+            time.sleep(delay)
+
+    def adjust(self, key: str, tokens: int):
+        """Charge (or refund, if negative) the difference between estimated and actual tokens."""
+        _, token_bucket = self._get_buckets(key)
+        if token_bucket is not None and tokens != 0:
+            token_bucket.adjust(tokens)
+
+    def remaining(self, key: str) -> float | None:
+        """Fraction of the quota of `key` still available, or `None` if it is unlimited."""
+        buckets = [bucket for bucket in self._get_buckets(key) if bucket is not None]
+        if not buckets:
+            return None
+        return min(bucket.available() for bucket in buckets)
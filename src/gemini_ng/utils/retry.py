@@ -0,0 +1,61 @@
+import random
+import time
+from typing import Callable, TypeVar
+
+import httplib2
+import httpx
+import requests
+
+from ..schemas import RetryPolicy
+from .error import InternalServerError, RateLimitExceeded, ServiceUnavailable, get_retry_after
+from .metrics import increment
+
+R = TypeVar("R")
+
+RETRYABLE_EXCEPTIONS = (
+    RateLimitExceeded,
+    InternalServerError,
+    ServiceUnavailable,
+    ConnectionError,
+    TimeoutError,
+    # Transport errors of the HTTP libraries, which do not derive from the
+    # built-in ones above.
+    httplib2.ServerNotFoundError,
+    requests.ConnectionError,
+    requests.Timeout,
+    httpx.TimeoutException,
+    httpx.NetworkError,
+    httpx.RemoteProtocolError,
+)
+
+
+def retry_call(
+    fn: Callable[[], R],
+    policy: RetryPolicy | None = None,
+    retry_on: tuple[type[Exception], ...] = RETRYABLE_EXCEPTIONS,
+) -> R:
+    if policy is None:
+        return fn()
+
+    for attempt in range(policy.max_retries + 1):
+        try:
+            return fn()
+        except retry_on as e:
+            if attempt == policy.max_retries:
+                raise
+
+            increment("retry", error=type(e).__name__)
+            time.sleep(get_backoff(policy, attempt, e))
+
+
+def get_backoff(policy: RetryPolicy, attempt: int, e: Exception | None = None) -> float:
+    backoff = min(policy.initial_backoff * policy.multiplier ** attempt, policy.max_backoff)
+    if policy.jitter:
+        backoff = random.uniform(0, backoff)
+
+    if policy.honor_retry_after and e is not None:
+        retry_after = get_retry_after(e)
+        if retry_after is not None:
+            backoff = max(backoff, retry_after)
+
+    return backoff
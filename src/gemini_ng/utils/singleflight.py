@@ -0,0 +1,49 @@
+import threading
+from concurrent.futures import Future
+from typing import Callable, Hashable, TypeVar
+
+from .metrics import increment
+
+R = TypeVar("R")
+
+
+class SingleFlight:
+    """Coalesces concurrent calls with the same key into a single execution.
+
+    The first caller of a key runs the function; callers arriving while it is
+    in flight wait for it and receive the same result, or the same exception.
+    Nothing is remembered once the call completes, so results that should
+    outlive it must be cached by the function itself.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls: dict[Hashable, Future] = {}
+
+    def do(self, key: Hashable, fn: Callable[[], R]) -> tuple[R, bool]:
+        """Run `fn` once for all concurrent callers of `key`.
+
+        Returns the result and whether it was shared from another caller's
+        execution.
+        """
+        with self._lock:
+            future = self._calls.get(key)
+            leader = future is None
+            if leader:
+                future = self._calls[key] = Future()
+
+        if not leader:
+            increment("singleflight.shared")
+            return future.result(), True
+
+        try:
+            result = fn()
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        else:
+            future.set_result(result)
+            return result, False
+        finally:
+            with self._lock:
+                del self._calls[key]
@@ -0,0 +1,30 @@
+class SSEDecoder:
+    """Incremental decoder for `text/event-stream` bodies, fed one line at a time."""
+
+    def __init__(self):
+        self._data: list[str] = []
+
+    def decode(self, line: str) -> str | None:
+        """Consume a line and return the data of the event it completes, if any."""
+        if not line:
+            return self.flush()
+
+        if line.startswith(":"):
+            return None
+
+        field, _, value = line.partition(":")
+        if value.startswith(" "):
+            value = value[1:]
+
+        if field == "data":
+            self._data.append(value)
+
+        return None
+
+    def flush(self) -> str | None:
+        if not self._data:
+            return None
+
+        data = "\n".join(self._data)
+        self._data = []
+        return data
@@ -0,0 +1,88 @@
+import hashlib
+import math
+from typing import Iterator, NamedTuple
+
+# Rough per-item token costs of the Gemini tokenizer, used for budgeting only.
+CHARS_PER_TOKEN = 4
+NON_ASCII_CHARS_PER_TOKEN = 1.5
+TOKENS_PER_FILE = 258
+
+# Relative error bounds assumed for the text estimate; the upper bound is also
+# capped by the UTF-8 length, as a text never takes more tokens than bytes.
+TEXT_ESTIMATE_LOW = 0.6
+TEXT_ESTIMATE_HIGH = 1.6
+
+
+class TokenEstimate(NamedTuple):
+    """Offline token estimate and the range the exact count falls in.
+
+    `high` is `None` when the request references files whose token cost
+    depends on their length (video, audio, documents).
+    """
+
+    tokens: int
+    low: int
+    high: int | None
+
+
+def estimate_tokens(body: dict) -> TokenEstimate:
+    """Estimate the input tokens of a serialized `GenerationRequest` body without the API."""
+    tokens = low = high = 0
+    unbounded = False
+
+    for part in _iter_parts(body):
+        if "text" in part:
+            text = part["text"]
+            ascii_chars = len(text) if text.isascii() else len(text.encode("ascii", "ignore"))
+            estimate = math.ceil(
+                ascii_chars / CHARS_PER_TOKEN
+                + (len(text) - ascii_chars) / NON_ASCII_CHARS_PER_TOKEN
+            )
+            tokens += estimate
+            low += math.floor(estimate * TEXT_ESTIMATE_LOW)
+            high += min(len(text.encode("utf-8")), math.ceil(estimate * TEXT_ESTIMATE_HIGH))
+        else:
+            # Images have a fixed cost; other files are charged by duration or page.
+            tokens += TOKENS_PER_FILE
+            if _mime_type(part).startswith("image/"):
+                low += TOKENS_PER_FILE
+                high += TOKENS_PER_FILE
+            else:
+                unbounded = True
+
+    return TokenEstimate(tokens, low, None if unbounded else high)
+
+
+def estimate_request_tokens(body: dict) -> int:
+    """Cheaply estimate the input tokens of a serialized `GenerationRequest` body."""
+    return estimate_tokens(body).tokens
+
+
+def token_count_key(content: dict) -> str:
+    """Cache key of the token count of one serialized content (message).
+
+    Texts are keyed by their hash and files by their URI, so the key does not
+    depend on the role or on how the content was built.
+    """
+    digest = hashlib.sha256()
+    for part in content.get("parts", []):
+        if "text" in part:
+            digest.update(b"t" + hashlib.sha256(part["text"].encode("utf-8")).digest())
+        else:
+            file_data = part.get("file_data") or part.get("fileData")
+            digest.update(b"f" + file_data["fileUri"].encode("utf-8") + b"\0")
+    return digest.hexdigest()
+
+
+def _iter_parts(body: dict) -> Iterator[dict]:
+    contents = body.get("contents", [])
+    if isinstance(contents, dict):
+        contents = [contents]
+
+    for content in contents:
+        yield from content.get("parts", [])
+
+
+def _mime_type(part: dict) -> str:
+    file_data = part.get("file_data") or part.get("fileData") or {}
+    return file_data.get("mimeType", "")
@@ -1,70 +1,443 @@
+import collections
+import io
 import math
+import mimetypes
+import multiprocessing
+import queue
+from concurrent.futures import ProcessPoolExecutor
+from typing import Iterator, NamedTuple
 
 import av
+import numpy as np
 from PIL import Image
 
+from ..schemas import FrameEncodingConfig, VideoSamplingConfig
+from .metrics import increment, timed
 
-def extract_video_frames(video_path: str, save_dir: str, sample_fps: int = 1) -> list[str]:
-    container = av.open(video_path)
-    video_stream = container.streams.video[0]
 
-    fps = video_stream.guessed_rate.numerator / video_stream.guessed_rate.denominator
+class EncodedFrame(NamedTuple):
+    index: int
+    timestamp: float
+    data: bytes
+    mime_type: str
 
-    frame_interval = fps / sample_fps
 
-    step_time = _frame_to_stamp(frame_interval, video_stream)
+def extract_video_frames(
+    video_path: str,
+    save_dir: str,
+    sample_fps: int = 1,
+    sampling: VideoSamplingConfig | None = None,
+    encoding: FrameEncodingConfig | None = None,
+) -> list[str]:
+    return list(
+        iter_video_frames(
+            video_path, save_dir, sample_fps=sample_fps, sampling=sampling, encoding=encoding
+        )
+    )
+
+
+def iter_video_frames(
+    video_path: str,
+    save_dir: str,
+    sample_fps: int = 1,
+    sampling: VideoSamplingConfig | None = None,
+    encoding: FrameEncodingConfig | None = None,
+) -> Iterator[str]:
+    """Yield the path of each sampled frame as soon as it has been written to `save_dir`."""
+    if sampling is None:
+        sampling = VideoSamplingConfig(sample_fps=sample_fps)
+    if encoding is None:
+        encoding = FrameEncodingConfig()
+
+    extension = mimetypes.guess_extension(encoding.mime_type)
+
+    for index, (_, image) in enumerate(
+        _iter_sampled_images(video_path, sampling, encoding)
+    ):
+        frame_path = f"{save_dir}/{index:06d}{extension}"
+        with open(frame_path, "wb") as f:
+            f.write(_encode_image(image, encoding))
+        yield frame_path
+
+
+def iter_encoded_video_frames(
+    video_path: str,
+    sampling: VideoSamplingConfig | None = None,
+    encoding: FrameEncodingConfig | None = None,
+    num_workers: int = 1,
+) -> Iterator[EncodedFrame]:
+    """Yield each sampled frame encoded in memory, without touching the disk.
+
+    With `num_workers > 1` the video is split into time ranges that are decoded
+    and encoded in a process pool; frames are still yielded in order, as soon
+    as they and all earlier frames are ready. Adaptive sampling always decodes
+    in a single process.
+    """
+    if sampling is None:
+        sampling = VideoSamplingConfig()
+    if encoding is None:
+        encoding = FrameEncodingConfig()
+
+    mime_type = encoding.mime_type
+
+    if num_workers > 1:
+        frames = _iter_encoded_frames_parallel(video_path, sampling, encoding, num_workers)
+    else:
+        frames = (
+            (timestamp, _encode_image(image, encoding))
+            for timestamp, image in _iter_sampled_images(video_path, sampling, encoding)
+        )
+
+    for index, (timestamp, data) in enumerate(frames):
+        if sampling.max_frames is not None and index >= sampling.max_frames:
+            break
+        yield EncodedFrame(index, timestamp, data, mime_type)
+
+
+def _encode_image(image: Image.Image, encoding: FrameEncodingConfig) -> bytes:
+    options = {}
+    if encoding.quality is not None:
+        options["quality"] = encoding.quality
+
+    buffer = io.BytesIO()
+    with timed("video.encode", format=encoding.image_format):
+        image.save(buffer, format=encoding.image_format, **options)
+    increment("bytes.encoded", buffer.tell())
+    return buffer.getvalue()
+
+
+def _iter_encoded_frames_parallel(
+    video_path: str,
+    sampling: VideoSamplingConfig,
+    encoding: FrameEncodingConfig,
+    num_workers: int,
+) -> Iterator[tuple[float, bytes]]:
+    with av.open(video_path) as container:
+        duration = _get_duration(container, container.streams.video[0])
+
+    # Scene detection compares every candidate with the last kept frame, so it
+    # has to see the whole video in order and cannot be split into ranges.
+    if not duration or sampling.adaptive:
+        for timestamp, image in _iter_sampled_images(video_path, sampling, encoding):
+            yield timestamp, _encode_image(image, encoding)
+        return
 
-    frame_paths = _extract_video_frames(
-        container, video_stream, save_dir, step_time, seekable=True
+    # A few more ranges than workers keeps the pool busy when ranges differ in cost.
+    num_ranges = num_workers * 2
+    bounds = [duration * i / num_ranges for i in range(num_ranges + 1)]
+    bounds[-1] = None
+
+    # Workers send each frame as soon as it is encoded; frames of later ranges
+    # are held back until the earlier ranges are complete.
+    frame_queue = multiprocessing.Queue()
+    pending: dict[int, collections.deque] = collections.defaultdict(collections.deque)
+    finished: set[int] = set()
+
+    executor = ProcessPoolExecutor(
+        max_workers=num_workers, initializer=_init_frame_worker, initargs=(frame_queue,)
     )
+    try:
+        futures = [
+            executor.submit(
+                _encode_time_range,
+                index,
+                video_path,
+                sampling.model_dump(),
+                encoding.model_dump(),
+                bounds[index],
+                bounds[index + 1],
+            )
+            for index in range(num_ranges)
+        ]
+
+        current = 0
+        last_timestamp = None
+        while current < num_ranges:
+            while pending[current]:
+                timestamp, data = pending[current].popleft()
+                # A frame past the end of a range may also be the first frame
+                # of the next one.
+                if last_timestamp is None or timestamp > last_timestamp:
+                    last_timestamp = timestamp
+                    yield timestamp, data
+
+            if current in finished:
+                # Re-raises the error of a range that failed.
+                futures[current].result()
+                current += 1
+                continue
+
+            try:
+                index, frame = frame_queue.get(timeout=1.0)
+            except queue.Empty:
+                future = futures[current]
+                if future.done() and future.exception() is not None:
+                    raise future.exception()
+                continue
+
+            if frame is None:
+                finished.add(index)
+            else:
+                pending[index].append(frame)
+    finally:
+        executor.shutdown(cancel_futures=True)
+        frame_queue.close()
+
+
+_frame_queue: "multiprocessing.Queue | None" = None
+
+
+def _init_frame_worker(frame_queue: "multiprocessing.Queue"):
+    global _frame_queue
+    _frame_queue = frame_queue
+    # Frames still buffered when the consumer stopped early are not needed.
+    frame_queue.cancel_join_thread()
+
+
+def _encode_time_range(
+    index: int,
+    video_path: str,
+    sampling: dict,
+    encoding: dict,
+    start: float,
+    end: float | None,
+):
+    """Send the frames of `[start, end)` to the frame queue, followed by `None`."""
+    try:
+        encoding = FrameEncodingConfig.model_validate(encoding)
+        for timestamp, image in _iter_sampled_images(
+            video_path, VideoSamplingConfig.model_validate(sampling), encoding, start, end
+        ):
+            _frame_queue.put((index, (timestamp, _encode_image(image, encoding))))
+    finally:
+        _frame_queue.put((index, None))
+
+
+class SceneChangeSelector:
+    """Picks frames that differ visibly from the previously kept frame.
+
+    Frames are compared as small grayscale thumbnails produced by the decoder's
+    scaler, so the cost per candidate is a single vectorized NumPy reduction.
+    """
+
+    thumbnail_size = 64
+
+    def __init__(
+        self,
+        threshold: float,
+        min_interval: float = 0.0,
+        max_interval: float | None = None,
+    ):
+        self.threshold = threshold
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.last_thumbnail: np.ndarray | None = None
+        self.last_time: float | None = None
+
+    def difference(self, thumbnail: np.ndarray) -> float:
+        if self.last_thumbnail is None:
+            return 1.0
+        diff = np.abs(thumbnail.astype(np.int16) - self.last_thumbnail)
+        return float(diff.mean()) / 255.0
+
+    def keep(self, frame: "av.VideoFrame") -> bool:
+        timestamp = float(frame.time or 0.0)
+
+        if self.last_time is not None:
+            elapsed = timestamp - self.last_time
+            if elapsed < self.min_interval:
+                return False
+            force = self.max_interval is not None and elapsed >= self.max_interval
+        else:
+            force = True
 
-    if frame_paths is None:
-        frame_paths = _extract_video_frames(
-            container, video_stream, save_dir, step_time, seekable=False
+        thumbnail = frame.to_ndarray(
+            width=self.thumbnail_size, height=self.thumbnail_size, format="gray"
         )
+        if not force and self.difference(thumbnail) < self.threshold:
+            return False
 
-    return frame_paths
+        self.last_thumbnail = thumbnail
+        self.last_time = timestamp
+        return True
 
 
-def _extract_video_frames(
+def _iter_sampled_images(
+    video_path: str,
+    sampling: VideoSamplingConfig,
+    encoding: FrameEncodingConfig,
+    start: float = 0.0,
+    end: float | None = None,
+) -> Iterator[tuple[float, Image.Image]]:
+    with av.open(video_path) as container:
+        video_stream = container.streams.video[0]
+        # Let FFmpeg decode with frame and slice threads.
+        video_stream.thread_type = "AUTO"
+
+        sample_fps = sampling.sample_fps
+        duration = _get_duration(container, video_stream)
+
+        selector = None
+        if sampling.adaptive:
+            min_interval = 0.0
+            if sampling.max_frames and duration:
+                # Spread the frame budget over the whole video.
+                min_interval = duration / sampling.max_frames
+            selector = SceneChangeSelector(
+                sampling.scene_threshold,
+                min_interval=min_interval,
+                max_interval=sampling.max_interval,
+            )
+        elif sampling.max_frames and duration:
+            sample_fps = min(sample_fps, sampling.max_frames / duration)
+
+        size = _get_target_size(
+            video_stream.codec_context.width,
+            video_stream.codec_context.height,
+            encoding.max_size,
+        )
+
+        frames = _iter_sampled_frames(
+            container, video_stream, 1.0 / sample_fps, start=start, end=end
+        )
+
+        if selector is not None:
+            frames = (frame for frame in frames if selector.keep(frame))
+
+        num_frames = 0
+        while True:
+            # Demuxing, decoding, selection and scaling of the next kept frame.
+            with timed("video.decode"):
+                frame = next(frames, None)
+                if frame is None:
+                    break
+
+                # Scaling happens in swscale together with the RGB conversion, so
+                # full-resolution RGB frames are never materialized.
+                image = frame.to_image(
+                    width=size[0], height=size[1], interpolation=encoding.resample
+                )
+
+            yield float(frame.time or 0.0), image
+
+            num_frames += 1
+            if sampling.max_frames is not None and num_frames >= sampling.max_frames:
+                break
+
+
+def _get_target_size(width: int, height: int, max_size: int | None) -> tuple[int, int]:
+    if max_size is None or max(width, height) <= max_size:
+        return width, height
+
+    scale = max_size / max(width, height)
+    return max(round(width * scale), 1), max(round(height * scale), 1)
+
+
+def _get_duration(container: "av.InputContainer", video_stream) -> float | None:
+    """Duration of the video in seconds, if the container knows it."""
+    if video_stream.duration is not None and video_stream.time_base is not None:
+        return float(video_stream.duration * video_stream.time_base)
+    if container.duration is not None:
+        return container.duration / av.time_base
+    return None
+
+
+def _iter_sampled_frames(
     container: "av.InputContainer",
     video_stream,
-    save_dir: str,
-    step_time: int,
-    seekable: bool,
-) -> list[str] | None:
-    cur = 0
-    seek_target = 0
-    frame_paths = []
-
-    for packet in container.demux(video=0):
-        if packet.dts is None:
-            continue
-
-        for frame in packet.decode():
-            if packet.pts and packet.pts >= seek_target:
-                frame = frame.to_ndarray(format="rgb24")
-                frame = Image.fromarray(frame)
-                frame_path = f"{save_dir}/{cur:06d}.jpg"
-                frame.save(frame_path)
-                frame_paths.append(frame_path)
-                cur += 1
-
-                seek_target += step_time
-                if seekable:
-                    try:
-                        container.seek(seek_target, stream=video_stream)
-                    except av.error.FFmpegError:
-                        return None
-
-    return frame_paths
-
-
-def _frame_to_stamp(nframe: int, stream) -> int:
-    """Convert frame number to timestamp based on fps of video stream."""
-    fps = stream.guessed_rate.numerator / stream.guessed_rate.denominator
-    seek_target = nframe / fps
-    stamp = math.floor(
-        seek_target * (stream.time_base.denominator / stream.time_base.numerator)
-    )
-    return stamp
+    step: float,
+    start: float = 0.0,
+    end: float | None = None,
+) -> Iterator["av.VideoFrame"]:
+    """Yield the first frame at or after every multiple of `step` seconds in `[start, end)`.
+
+    The frame of the last target may lie at or after `end`; it is the same
+    frame a decoder running over the whole video would yield for that target.
+    Short gaps are decoded forward. When the next target lies further ahead than
+    the observed keyframe interval, the demuxer seeks to the keyframe before it
+    instead. A failed seek only disables seeking from that point on; decoding
+    continues linearly rather than starting over.
+    """
+    time_base = video_stream.time_base
+    start_pts = video_stream.start_time or 0
+
+    def to_pts(seconds: float) -> int:
+        return start_pts + math.ceil(seconds / time_base)
+
+    step_pts = step / time_base
+
+    def target_to_pts(index: int) -> int:
+        return start_pts + math.ceil(index * step_pts)
+
+    # Derive the first target in the same integer pts arithmetic as the end
+    # check so adjacent ranges split the targets without gaps or overlaps.
+    start_bound = to_pts(start)
+    target_index = math.ceil(start / step)
+    while target_index > 0 and target_to_pts(target_index - 1) >= start_bound:
+        target_index -= 1
+    while target_to_pts(target_index) < start_bound:
+        target_index += 1
+    target_pts = target_to_pts(target_index)
+    end_pts = to_pts(end) if end is not None else None
+
+    seekable = True
+    keyframe_interval = None
+    last_keyframe_pts = None
+
+    if end_pts is not None and target_pts >= end_pts:
+        return
+
+    if target_pts > start_pts:
+        seekable = _seek(container, video_stream, target_pts)
+
+    while True:
+        seeked = False
+
+        for packet in container.demux(video_stream):
+            for frame in packet.decode():
+                if frame.pts is None:
+                    continue
+
+                if frame.key_frame:
+                    if last_keyframe_pts is not None and frame.pts > last_keyframe_pts:
+                        keyframe_interval = frame.pts - last_keyframe_pts
+                    last_keyframe_pts = frame.pts
+
+                if frame.pts < target_pts:
+                    continue
+
+                yield frame
+
+                while target_pts <= frame.pts:
+                    target_index += 1
+                    target_pts = target_to_pts(target_index)
+
+                # The remaining targets belong to the next range.
+                if end_pts is not None and target_pts >= end_pts:
+                    return
+
+                if (
+                    seekable
+                    and keyframe_interval is not None
+                    and target_pts - frame.pts > keyframe_interval
+                ):
+                    seekable = _seek(container, video_stream, target_pts)
+                    seeked = seekable
+                    break
+
+            if seeked:
+                break
+
+        if not seeked:
+            return
+
+        # Keyframe spacing may change after the jump.
+        last_keyframe_pts = None
+
+
+def _seek(container: "av.InputContainer", video_stream, pts: int) -> bool:
+    try:
+        container.seek(pts, stream=video_stream, backward=True, any_frame=False)
+    except av.error.FFmpegError:
+        return False
+    return True
@@ -0,0 +1,43 @@
+import os
+import sys
+
+import pytest
+
+# The mock API server lives with the benchmarks.
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "benchmarks"))
+
+from mock_server import MockConfig, MockGeminiServer  # noqa: E402
+
+from gemini_ng import GeminiClient  # noqa: E402
+from gemini_ng.utils import cache  # noqa: E402
+
+
+@pytest.fixture(autouse=True)
+def cache_dir(tmp_path, monkeypatch):
+    """Give every test its own, empty on-disk caches."""
+    monkeypatch.setenv("GEMINI_NG_CACHE_DIR", str(tmp_path / "cache"))
+    monkeypatch.delenv("GEMINI_NG_DISCOVERY_DOCUMENT", raising=False)
+    monkeypatch.setattr(cache, "_CACHE", None)
+    monkeypatch.setattr(cache, "_RESPONSE_CACHES", {})
+    return tmp_path / "cache"
+
+
+@pytest.fixture
+def mock_config(request) -> MockConfig:
+    """Mock server settings; override with `indirect` parametrization."""
+    return MockConfig(**getattr(request, "param", {}))
+
+
+@pytest.fixture
+def mock_server(mock_config):
+    server = MockGeminiServer(config=mock_config).start()
+    try:
+        yield server
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+@pytest.fixture
+def client(mock_server) -> GeminiClient:
+    return GeminiClient(api_key="test", base_url=mock_server.url)
@@ -0,0 +1,29 @@
+import asyncio
+
+import pytest
+
+from gemini_ng import AsyncGeminiClient
+
+MODEL = "models/gemini-1.5-flash"
+
+
+def test_async_chat_rejects_sync_with(mock_server):
+    async def main():
+        async with AsyncGeminiClient(api_key="test", base_url=mock_server.url) as client:
+            chat = client.start_chat(MODEL)
+            with pytest.raises(TypeError, match="async with"):
+                with chat:
+                    pass
+
+    asyncio.run(main())
+
+
+def test_async_chat_context_clears_history(mock_server):
+    async def main():
+        async with AsyncGeminiClient(api_key="test", base_url=mock_server.url) as client:
+            async with client.start_chat(MODEL) as chat:
+                await chat.send_message("Hello")
+                assert len(chat.history) == 2
+            return chat
+
+    assert asyncio.run(main()).history == []
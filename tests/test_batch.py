@@ -0,0 +1,33 @@
+import pytest
+
+from gemini_ng import GeminiClientPool
+
+MODEL = "models/gemini-1.5-flash"
+
+
+@pytest.fixture(params=["client", "pool"])
+def generator(request, client, mock_server):
+    if request.param == "client":
+        return client
+    return GeminiClientPool(["key-aaaa", "key-bbbb"], base_url=mock_server.url)
+
+
+def test_generate_batch_ordered(generator, mock_server):
+    results = list(generator.generate_batch(MODEL, (f"prompt {i}" for i in range(10))))
+
+    assert [result.index for result in results] == list(range(10))
+    assert all(result.ok and result.response.candidates for result in results)
+    assert mock_server.requests["generateContent"] == 10
+
+
+def test_generate_batch_unordered(generator):
+    results = list(generator.generate_batch(MODEL, ["a", "b", "c"], ordered=False))
+
+    assert sorted(result.index for result in results) == [0, 1, 2]
+
+
+def test_generate_batch_captures_errors(generator):
+    results = list(generator.generate_batch(MODEL, ["ok", 42, "ok"]))
+
+    assert [result.ok for result in results] == [True, False, True]
+    assert isinstance(results[1].error, TypeError)
@@ -0,0 +1,87 @@
+import asyncio
+
+import pytest
+
+from gemini_ng import AsyncGeminiClient, ChatSessionStore
+from gemini_ng.utils.error import InternalServerError
+
+MODEL = "models/gemini-1.5-flash"
+
+
+@pytest.fixture
+def store(tmp_path):
+    return ChatSessionStore(tmp_path / "sessions.sqlite3")
+
+
+def roles(messages):
+    return [message.role for message in messages]
+
+
+def test_stream_completes(client, store):
+    chat = client.start_chat(MODEL, store=store)
+    chunks = list(chat.send_message_stream("Hello"))
+
+    assert len(chunks) > 1
+    assert roles(chat.history) == ["user", "model"]
+    assert chat.history[1].parts[0].text == "".join(c.candidates[0].text for c in chunks)
+    assert roles(store.load_messages(chat.session_id)[0]) == ["user", "model"]
+
+
+def test_stream_stopped_early_keeps_partial_reply(client, store):
+    chat = client.start_chat(MODEL, store=store)
+    stream = chat.send_message_stream("Hello")
+    first = next(stream)
+    stream.close()
+
+    assert roles(chat.history) == ["user", "model"]
+    assert chat.history[1].parts[0].text == first.candidates[0].text
+    assert roles(store.load_messages(chat.session_id)[0]) == ["user", "model"]
+
+    chat.send_message("Next")
+    assert roles(chat.history) == ["user", "model", "user", "model"]
+
+
+def test_stream_failing_mid_stream_keeps_partial_reply(client, store, monkeypatch):
+    stream = client._generate_stream
+
+    def failing_stream(model, body):
+        yield next(stream(model, body))
+        raise ConnectionError("dropped")
+
+    monkeypatch.setattr(client, "_generate_stream", failing_stream)
+    chat = client.start_chat(MODEL, store=store)
+
+    with pytest.raises(ConnectionError):
+        list(chat.send_message_stream("Hello"))
+
+    assert roles(chat.history) == ["user", "model"]
+    assert roles(store.load_messages(chat.session_id)[0]) == ["user", "model"]
+
+
+@pytest.mark.parametrize("mock_config", [{"error_rate": 1.0}], indirect=True)
+def test_failed_turn_drops_user_message(client, store):
+    chat = client.start_chat(MODEL, store=store)
+
+    with pytest.raises(InternalServerError):
+        list(chat.send_message_stream("Hello"))
+    with pytest.raises(InternalServerError):
+        chat.send_message("Hello")
+
+    assert chat.history == []
+    assert store.load_messages(chat.session_id)[0] == []
+
+
+def test_async_stream_stopped_early_keeps_partial_reply(mock_server, store):
+    async def main():
+        async with AsyncGeminiClient(api_key="test", base_url=mock_server.url) as client:
+            chat = client.start_chat(MODEL, store=store)
+            stream = chat.send_message_stream("Hello")
+            await anext(stream)
+            await stream.aclose()
+            await chat.send_message("Next")
+            return chat
+
+    chat = asyncio.run(main())
+
+    assert roles(chat.history) == ["user", "model", "user", "model"]
+    assert roles(store.load_messages(chat.session_id)[0]) == ["user", "model", "user", "model"]
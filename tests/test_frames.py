@@ -0,0 +1,125 @@
+import json
+
+import pytest
+
+from gemini_ng.schemas import FrameDirectoryConfig
+from gemini_ng.utils.frames import load_timestamps, natural_sort_key, scan_frame_directory
+
+
+def _make_frames(directory, names):
+    for name in names:
+        (directory / name).write_bytes(b"frame")
+
+
+def _names(frames):
+    return [frame.name for frame in frames]
+
+
+def test_natural_sort_key():
+    names = ["f10.jpg", "F2.jpg", "f1.jpg", "g0.jpg"]
+
+    assert sorted(names, key=natural_sort_key) == ["f1.jpg", "F2.jpg", "f10.jpg", "g0.jpg"]
+
+
+def test_frames_are_sorted_by_number(tmp_path):
+    _make_frames(tmp_path, ["frame_10.jpg", "frame_2.jpg", "frame_1.jpg", "cover.png"])
+    (tmp_path / "notes.md").write_text("not a frame")
+
+    frames = scan_frame_directory(str(tmp_path), FrameDirectoryConfig(fps=2.0))
+
+    assert _names(frames) == ["frame_1.jpg", "frame_2.jpg", "frame_10.jpg", "cover.png"]
+    assert [frame.number for frame in frames] == [1, 2, 10, None]
+    assert [frame.timestamp for frame in frames] == [0.0, 0.5, 1.0, 1.5]
+
+
+def test_pattern_selects_frames(tmp_path):
+    _make_frames(tmp_path, ["cam1_003.jpg", "cam1_001.jpg", "cam2_002.jpg"])
+
+    frames = scan_frame_directory(
+        str(tmp_path), FrameDirectoryConfig(pattern=r"^cam1_(?P<index>\d+)")
+    )
+
+    assert _names(frames) == ["cam1_001.jpg", "cam1_003.jpg"]
+
+
+def test_duplicate_frame_numbers(tmp_path):
+    _make_frames(tmp_path, ["a_1.jpg", "b_1.jpg"])
+
+    with pytest.raises(ValueError, match="same frame number 1"):
+        scan_frame_directory(str(tmp_path))
+
+
+def test_empty_directory(tmp_path):
+    with pytest.raises(ValueError, match="No frame images"):
+        scan_frame_directory(str(tmp_path))
+
+
+def test_json_sidecar_by_name(tmp_path):
+    _make_frames(tmp_path, ["1.jpg", "2.jpg"])
+    (tmp_path / "timestamps.json").write_text(json.dumps({"2.jpg": 0.75, "1.jpg": 0.25}))
+
+    frames = scan_frame_directory(str(tmp_path))
+
+    assert [frame.timestamp for frame in frames] == [0.25, 0.75]
+
+
+def test_json_sidecar_in_order(tmp_path):
+    _make_frames(tmp_path, ["1.jpg", "2.jpg"])
+    (tmp_path / "timestamps.json").write_text("[0, 1.5]")
+
+    assert [frame.timestamp for frame in scan_frame_directory(str(tmp_path))] == [0.0, 1.5]
+
+
+def test_csv_sidecar_with_header(tmp_path):
+    _make_frames(tmp_path, ["1.jpg", "2.jpg"])
+    (tmp_path / "timestamps.csv").write_text("name,seconds\n1.jpg, 0.5\n# comment\n2.jpg,1.25\n")
+
+    assert [frame.timestamp for frame in scan_frame_directory(str(tmp_path))] == [0.5, 1.25]
+
+
+def test_explicit_txt_sidecar(tmp_path):
+    frame_dir = tmp_path / "frames"
+    frame_dir.mkdir()
+    _make_frames(frame_dir, ["1.jpg", "2.jpg", "3.jpg"])
+    sidecar = tmp_path / "times.txt"
+    sidecar.write_text("0\n0.5\n\n2\n")
+
+    frames = scan_frame_directory(str(frame_dir), FrameDirectoryConfig(timestamps=str(sidecar)))
+
+    assert [frame.timestamp for frame in frames] == [0.0, 0.5, 2.0]
+
+
+def test_sidecar_with_wrong_number_of_timestamps(tmp_path):
+    _make_frames(tmp_path, ["1.jpg", "2.jpg", "3.jpg"])
+    (tmp_path / "timestamps.txt").write_text("0\n1\n")
+
+    with pytest.raises(ValueError, match="2 timestamps for 3 frames"):
+        scan_frame_directory(str(tmp_path))
+
+
+def test_sidecar_missing_a_frame(tmp_path):
+    _make_frames(tmp_path, ["1.jpg", "2.jpg"])
+    (tmp_path / "timestamps.json").write_text(json.dumps({"1.jpg": 0.0}))
+
+    with pytest.raises(ValueError, match="e.g. 2.jpg"):
+        scan_frame_directory(str(tmp_path))
+
+
+def test_decreasing_timestamps(tmp_path):
+    _make_frames(tmp_path, ["1.jpg", "2.jpg"])
+    (tmp_path / "timestamps.txt").write_text("1\n0.5\n")
+
+    with pytest.raises(ValueError, match="must not decrease"):
+        scan_frame_directory(str(tmp_path))
+
+
+def test_invalid_sidecar_lines(tmp_path):
+    mixed = tmp_path / "mixed.csv"
+    mixed.write_text("1.jpg,0\n0.5\n")
+    invalid = tmp_path / "invalid.txt"
+    invalid.write_text("0\nsoon\n")
+
+    with pytest.raises(ValueError, match="mixes"):
+        load_timestamps(str(mixed))
+    with pytest.raises(ValueError, match="line 2"):
+        load_timestamps(str(invalid))
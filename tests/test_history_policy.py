@@ -0,0 +1,54 @@
+from gemini_ng.schemas import TextPart
+
+MODEL = "models/gemini-1.5-flash"
+
+
+def user_texts(chat):
+    return [
+        message.parts[0].text for message in chat.history if message.role == "user"
+    ]
+
+
+def test_max_turns_drops_oldest_turns(client):
+    chat = client.start_chat(MODEL, history_policy={"max_turns": 3})
+    for i in range(6):
+        chat.send_message(f"message {i}")
+
+    assert user_texts(chat) == ["message 3", "message 4", "message 5"]
+
+
+def test_pinned_turns_are_kept(client):
+    chat = client.start_chat(MODEL, history_policy={"max_turns": 3, "pinned_turns": 1})
+    for i in range(6):
+        chat.send_message(f"message {i}")
+
+    # Pinned turns do not count towards `max_turns`.
+    assert user_texts(chat) == ["message 0", "message 3", "message 4", "message 5"]
+
+
+def test_max_tokens_budget(client):
+    chat = client.start_chat(MODEL, history_policy={"max_tokens": 200})
+    for i in range(10):
+        chat.send_message(f"message {i}")
+
+        # The budget is checked before the reply is appended.
+        assert sum(chat._token_counts[id(message)] for message in chat.history[:-1]) <= 200
+
+    assert user_texts(chat)[-1] == "message 9"
+    assert len(chat.history) < 20
+
+
+def test_summaries_cut_below_the_limit(client, mock_server):
+    chat = client.start_chat(
+        MODEL, history_policy={"max_turns": 6, "summarize": True, "summary_target": 0.5}
+    )
+    for i in range(20):
+        chat.send_message(f"message {i}")
+
+    summaries = mock_server.requests["generateContent"] - 20
+    # Without the target, every turn past the limit would need a summary.
+    assert 0 < summaries <= 6
+    assert chat.history[0].parts[0].text.startswith("Summary of the earlier conversation")
+    assert isinstance(chat.history[0].parts[0], TextPart)
+    assert user_texts(chat)[-1] == "message 19"
+    assert sum(message.role == "user" for message in chat.history) <= 6
@@ -0,0 +1,126 @@
+import io
+
+import httpx
+import pytest
+
+from gemini_ng import GeminiClientPool
+from gemini_ng.schemas import GenerationRequest
+from gemini_ng.utils.error import RateLimitExceeded
+
+MODEL = "models/gemini-1.5-flash"
+
+
+@pytest.fixture
+def pool(mock_server):
+    return GeminiClientPool(["key-aaaa", "key-bbbb"], base_url=mock_server.url)
+
+
+def test_dict_contents(pool):
+    part = pool.upload_image_data(b"image")
+    request = GenerationRequest(
+        contents={"role": "user", "parts": [{"text": "Describe"}, part]}
+    )
+
+    assert pool.generate(MODEL, request).candidates[0].text
+    assert pool.get_token_count(MODEL, request) > 0
+
+
+def test_upload_image_data_accepts_buffers(pool):
+    part = pool.upload_image_data(io.BytesIO(b"image"))
+
+    assert part.file_data.file_uri in pool._file_owners
+
+
+def _rate_limited(*args, **kwargs):
+    request = httpx.Request("POST", "http://test")
+    response = httpx.Response(429, headers={"Retry-After": "30"}, request=request)
+    raise RateLimitExceeded(httpx.HTTPStatusError("error", request=request, response=response))
+
+
+def _owner(pool, part) -> int:
+    return pool._file_owners[part.file_data.file_uri][0]
+
+
+def test_fails_over_to_another_key(pool, monkeypatch):
+    monkeypatch.setattr(pool.clients[0], "_generate", _rate_limited)
+
+    for _ in range(4):
+        assert pool.generate(MODEL, "Hello").candidates[0].text
+
+    stats = pool.key_stats()
+    assert stats[0]["failures"] == 1
+    assert 0 < stats[0]["ejected_for"] <= 30
+    assert stats[1]["failures"] == 0
+    assert [key["in_flight"] for key in stats] == [0, 0]
+
+
+def test_raises_when_every_key_is_rate_limited(pool, monkeypatch):
+    for client in pool.clients:
+        monkeypatch.setattr(client, "_generate", _rate_limited)
+
+    with pytest.raises(RateLimitExceeded):
+        pool.generate(MODEL, "Hello")
+    assert [key["failures"] for key in pool.key_stats()] == [1, 1]
+
+
+def test_stream_fails_over_before_the_first_chunk(pool, monkeypatch):
+    monkeypatch.setattr(pool.clients[0], "_generate_stream", _rate_limited)
+
+    for _ in range(2):
+        assert list(pool.generate_stream(MODEL, "Hello"))
+
+
+def test_requests_with_files_use_the_uploading_key(pool, monkeypatch):
+    part = pool.upload_image_data(b"image")
+    owner = _owner(pool, part)
+
+    def wrong_key(*args, **kwargs):
+        raise AssertionError("request sent with a key that cannot read the file")
+
+    monkeypatch.setattr(pool.clients[1 - owner], "_generate", wrong_key)
+
+    for _ in range(4):
+        assert pool.generate(MODEL, ["Describe", part]).candidates[0].text
+    assert pool.key_stats()[1 - owner]["requests"] == 0
+
+
+def test_owner_rate_limit_is_not_failed_over(pool, monkeypatch):
+    part = pool.upload_image_data(b"image")
+    monkeypatch.setattr(pool.clients[_owner(pool, part)], "_generate", _rate_limited)
+
+    with pytest.raises(RateLimitExceeded):
+        pool.generate(MODEL, ["Describe", part])
+
+
+def test_files_of_different_keys_cannot_be_mixed(pool):
+    first = pool.upload_image_data(b"first")
+    second = pool.upload_image_data(b"second")
+    pool._record_owner([second.file_data.file_uri], 1 - _owner(pool, first))
+
+    with pytest.raises(ValueError, match="different API keys"):
+        pool.generate(MODEL, [first, second])
+
+
+def test_upload_reuses_the_key_holding_the_file(pool, mock_server):
+    first = pool.upload_image_data(b"image")
+    second = pool.upload_image_data(b"image")
+
+    assert second.file_data.file_uri == first.file_data.file_uri
+    assert mock_server.requests["upload"] == 1
+
+
+def test_tracked_files_are_bounded(mock_server):
+    pool = GeminiClientPool(
+        ["key-aaaa", "key-bbbb"], base_url=mock_server.url, max_tracked_files=2
+    )
+    parts = [pool.upload_image_data(f"image {index}".encode()) for index in range(3)]
+
+    assert list(pool._file_owners) == [part.file_data.file_uri for part in parts[1:]]
+
+
+def test_key_stats_mask_api_keys(pool):
+    pool.generate(MODEL, "Hello")
+
+    stats = pool.key_stats()
+    assert [key["key"] for key in stats] == ["...aaaa", "...bbbb"]
+    assert sum(key["requests"] for key in stats) == 1
@@ -0,0 +1,95 @@
+import time
+
+import pytest
+
+from gemini_ng import GeminiClient
+from gemini_ng.schemas import RateLimit
+from gemini_ng.utils.rate_limit import RateLimiter, TokenBucket
+
+MODEL = "models/gemini-1.5-flash"
+
+
+def test_token_bucket_grants_up_to_capacity():
+    bucket = TokenBucket(per_minute=60)
+
+    assert bucket.reserve(30) == 0.0
+    assert bucket.reserve(30) == 0.0
+    assert bucket.available() == pytest.approx(0.0, abs=0.01)
+
+
+def test_token_bucket_reserves_into_debt():
+    bucket = TokenBucket(per_minute=60)
+    bucket.reserve(60)
+
+    # One token per second is refilled; the next two callers queue up.
+    assert bucket.reserve(1) == pytest.approx(1.0, abs=0.01)
+    assert bucket.reserve(1) == pytest.approx(2.0, abs=0.01)
+    assert bucket.available() < 0
+
+
+def test_token_bucket_caps_reservations_at_capacity():
+    bucket = TokenBucket(per_minute=60)
+
+    assert bucket.reserve(1000) == 0.0
+    assert bucket.available() == pytest.approx(0.0, abs=0.01)
+
+
+def test_token_bucket_adjust_refunds():
+    bucket = TokenBucket(per_minute=60)
+    bucket.reserve(40)
+    bucket.adjust(-40)
+
+    assert bucket.available() == pytest.approx(1.0)
+
+
+def test_rate_limiter_per_key_limits():
+    limiter = RateLimiter(
+        default=RateLimit(requests_per_minute=60),
+        limits={"fast": RateLimit(requests_per_minute=6000)},
+    )
+
+    limiter.acquire("slow")
+    limiter.acquire("fast")
+
+    assert limiter.remaining("slow") == pytest.approx(59 / 60, abs=0.01)
+    assert limiter.remaining("fast") == pytest.approx(5999 / 6000, abs=0.01)
+
+
+def test_rate_limiter_unlimited_key():
+    limiter = RateLimiter(limits={"limited": RateLimit(requests_per_minute=60)})
+
+    limiter.acquire("other", tokens=1000)
+
+    assert limiter.remaining("other") is None
+
+
+def test_rate_limiter_tracks_tokens():
+    limiter = RateLimiter(default=RateLimit(tokens_per_minute=1000))
+
+    limiter.acquire(MODEL, tokens=250)
+    assert limiter.remaining(MODEL) == pytest.approx(0.75, abs=0.01)
+
+    limiter.adjust(MODEL, -150)
+    assert limiter.remaining(MODEL) == pytest.approx(0.9, abs=0.01)
+
+
+def test_rate_limiter_waits_when_exhausted():
+    # 600 requests per minute refill one request every 0.1 seconds.
+    limiter = RateLimiter(default=RateLimit(requests_per_minute=600))
+    for _ in range(600):
+        limiter.acquire(MODEL)
+
+    started_at = time.monotonic()
+    limiter.acquire(MODEL)
+
+    assert time.monotonic() - started_at >= 0.05
+
+
+def test_client_charges_rate_limit(mock_server):
+    client = GeminiClient(
+        api_key="test", base_url=mock_server.url, rate_limit={"requests_per_minute": 100}
+    )
+
+    client.generate(MODEL, "Hello", use_cache=False)
+
+    assert client.rate_limiter.remaining(MODEL) == pytest.approx(0.99, abs=0.01)
@@ -0,0 +1,69 @@
+from gemini_ng import GeminiClient
+from gemini_ng.utils.cache import get_response_cache_instance
+
+MODEL = "models/gemini-1.5-flash"
+
+
+def test_disabled_by_default(client, mock_server):
+    config = {"temperature": 1.0}
+    client.generate(MODEL, "Hello", generation_config=config)
+    client.generate(MODEL, "Hello", generation_config=config)
+
+    assert mock_server.requests["generateContent"] == 2
+
+
+def test_repeated_request_is_served_from_cache(mock_server):
+    client = GeminiClient(api_key="test", base_url=mock_server.url, response_cache=True)
+
+    first = client.generate(MODEL, "Hello")
+    second = client.generate(MODEL, "Hello")
+
+    assert second.candidates[0].text == first.candidates[0].text
+    assert mock_server.requests["generateContent"] == 1
+
+
+def test_different_requests_are_cached_separately(mock_server):
+    client = GeminiClient(api_key="test", base_url=mock_server.url, response_cache=True)
+
+    client.generate(MODEL, "Hello")
+    client.generate(MODEL, "Goodbye")
+    client.generate(MODEL, "Hello", generation_config={"temperature": 0.5})
+
+    assert mock_server.requests["generateContent"] == 3
+
+
+def test_use_cache_false_bypasses_cache(mock_server):
+    client = GeminiClient(api_key="test", base_url=mock_server.url, response_cache=True)
+
+    client.generate(MODEL, "Hello")
+    client.generate(MODEL, "Hello", use_cache=False)
+
+    assert mock_server.requests["generateContent"] == 2
+
+
+def test_clients_share_cache_with_same_size_limit(mock_server):
+    config = {"size_limit": 1 << 20}
+    GeminiClient(api_key="test", base_url=mock_server.url, response_cache=config).generate(
+        MODEL, "Hello"
+    )
+    GeminiClient(api_key="test", base_url=mock_server.url, response_cache=config).generate(
+        MODEL, "Hello"
+    )
+
+    assert mock_server.requests["generateContent"] == 1
+
+
+def test_size_limits_get_separate_caches(mock_server):
+    small = GeminiClient(
+        api_key="test", base_url=mock_server.url, response_cache={"size_limit": 1 << 20}
+    )
+    large = GeminiClient(
+        api_key="test", base_url=mock_server.url, response_cache={"size_limit": 1 << 21}
+    )
+
+    small.generate(MODEL, "Hello")
+    large.generate(MODEL, "Hello")
+
+    assert mock_server.requests["generateContent"] == 2
+    assert get_response_cache_instance(1 << 20) is not get_response_cache_instance(1 << 21)
+    assert get_response_cache_instance(1 << 20).size_limit == 1 << 20
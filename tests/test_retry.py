@@ -0,0 +1,109 @@
+import httpx
+import pytest
+
+from gemini_ng import GeminiClient
+from gemini_ng.schemas import RetryPolicy
+from gemini_ng.utils.error import (
+    InternalServerError,
+    RateLimitExceeded,
+    ServiceUnavailable,
+    map_http_exception,
+)
+from gemini_ng.utils.retry import get_backoff, retry_call
+
+MODEL = "models/gemini-1.5-flash"
+
+FAST_RETRIES = RetryPolicy(max_retries=2, initial_backoff=0.001, max_backoff=0.01)
+
+
+def _status_error(status: int, headers: dict | None = None) -> httpx.HTTPStatusError:
+    request = httpx.Request("POST", "http://test")
+    response = httpx.Response(status, headers=headers, request=request)
+    return httpx.HTTPStatusError("error", request=request, response=response)
+
+
+@pytest.mark.parametrize(
+    "status, exception_type",
+    [(429, RateLimitExceeded), (500, InternalServerError), (503, ServiceUnavailable)],
+)
+def test_map_http_exception(status, exception_type):
+    assert isinstance(map_http_exception(status, _status_error(status)), exception_type)
+
+
+def test_retry_call_recovers():
+    attempts = []
+
+    def flaky():
+        attempts.append(None)
+        if len(attempts) < 3:
+            raise ServiceUnavailable(_status_error(503))
+        return "ok"
+
+    assert retry_call(flaky, FAST_RETRIES) == "ok"
+    assert len(attempts) == 3
+
+
+def test_retry_call_gives_up():
+    attempts = []
+
+    def failing():
+        attempts.append(None)
+        raise InternalServerError(_status_error(500))
+
+    with pytest.raises(InternalServerError):
+        retry_call(failing, FAST_RETRIES)
+    assert len(attempts) == FAST_RETRIES.max_retries + 1
+
+
+def test_retry_call_does_not_retry_other_errors():
+    attempts = []
+
+    def failing():
+        attempts.append(None)
+        raise ValueError("bad request")
+
+    with pytest.raises(ValueError):
+        retry_call(failing, FAST_RETRIES)
+    assert len(attempts) == 1
+
+
+def test_backoff_grows_and_is_capped():
+    policy = RetryPolicy(initial_backoff=1.0, multiplier=2.0, max_backoff=5.0, jitter=False)
+
+    assert [get_backoff(policy, attempt) for attempt in range(4)] == [1.0, 2.0, 4.0, 5.0]
+
+
+def test_backoff_jitter_stays_below_nominal():
+    policy = RetryPolicy(initial_backoff=1.0, multiplier=2.0, jitter=True)
+
+    for _ in range(100):
+        assert 0.0 <= get_backoff(policy, 2) <= 4.0
+
+
+def test_backoff_honors_retry_after():
+    policy = RetryPolicy(initial_backoff=1.0, jitter=False)
+    e = RateLimitExceeded(_status_error(429, headers={"Retry-After": "7"}))
+
+    assert get_backoff(policy, 0, e) == 7.0
+    assert get_backoff(policy.model_copy(update={"honor_retry_after": False}), 0, e) == 1.0
+
+
+@pytest.mark.parametrize(
+    "mock_config",
+    [{"error_rate": 1.0, "error_status": 500}, {"error_rate": 1.0, "error_status": 503}],
+    indirect=True,
+)
+def test_client_retries_server_errors(mock_server):
+    client = GeminiClient(api_key="test", base_url=mock_server.url, retry_policy=FAST_RETRIES)
+
+    with pytest.raises((InternalServerError, ServiceUnavailable)):
+        client.generate(MODEL, "Hello")
+    assert mock_server.requests["generateContent"] == FAST_RETRIES.max_retries + 1
+
+
+def test_client_without_retry_policy_fails_fast(mock_server):
+    mock_server.config.error_rate = 1.0
+
+    with pytest.raises(InternalServerError):
+        GeminiClient(api_key="test", base_url=mock_server.url).generate(MODEL, "Hello")
+    assert mock_server.requests["generateContent"] == 1
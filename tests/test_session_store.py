@@ -0,0 +1,97 @@
+import pytest
+
+from gemini_ng import ChatSessionStore
+from gemini_ng.schemas import ChatMessage
+
+MODEL = "models/gemini-1.5-flash"
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = ChatSessionStore(tmp_path / "sessions.sqlite3")
+    yield store
+    store.close()
+
+
+def _message(role: str, text: str) -> ChatMessage:
+    return ChatMessage.model_validate({"role": role, "parts": [{"text": text}]})
+
+
+def _texts(messages: list[ChatMessage]) -> list[str]:
+    return [part.text for message in messages for part in message.parts]
+
+
+def test_append_and_load_messages(store):
+    session_id = store.create_session(MODEL)
+    store.append_messages(session_id, 0, [_message("user", "a"), _message("model", "b")])
+    store.append_messages(session_id, 2, [_message("user", "c")], token_counts={0: 5, 2: 7})
+
+    messages, token_counts = store.load_messages(session_id)
+
+    assert [message.role for message in messages] == ["user", "model", "user"]
+    assert _texts(messages) == ["a", "b", "c"]
+    assert token_counts == {0: 5, 2: 7}
+
+
+def test_create_existing_session_fails(store):
+    session_id = store.create_session(MODEL, session_id="session")
+
+    with pytest.raises(ValueError, match="already exists"):
+        store.create_session(MODEL, session_id=session_id)
+
+
+def test_load_unknown_session_fails(store, client):
+    with pytest.raises(KeyError):
+        store.load(client, "missing")
+
+
+def test_replace_messages_is_atomic(store):
+    session_id = store.create_session(MODEL)
+    store.append_messages(session_id, 0, [_message("user", "a"), _message("model", "b")])
+
+    with pytest.raises(AttributeError):
+        store.replace_messages(session_id, [_message("user", "c"), object()])
+    assert _texts(store.load_messages(session_id)[0]) == ["a", "b"]
+
+    store.replace_messages(session_id, [_message("user", "c")])
+    assert _texts(store.load_messages(session_id)[0]) == ["c"]
+
+
+def test_chat_session_is_persisted_and_resumed(store, client, mock_server):
+    chat = client.start_chat(MODEL, store=store, generation_config={"temperature": 0.5})
+    chat.send_message("Hello")
+    chat.send_message("How are you?")
+
+    resumed = store.load(client, chat.session_id)
+
+    assert resumed.session_id == chat.session_id
+    assert resumed.generation_config == {"temperature": 0.5}
+    assert _texts(resumed.history) == _texts(chat.history)
+
+    resumed.send_message("Goodbye")
+
+    messages, _ = store.load_messages(chat.session_id)
+    assert len(messages) == 6
+    assert _texts(messages)[4] == "Goodbye"
+
+
+def test_truncated_history_is_rewritten(store, client):
+    chat = client.start_chat(MODEL, store=store, history_policy={"max_turns": 2})
+    for index in range(4):
+        chat.send_message(f"message {index}")
+
+    messages, _ = store.load_messages(chat.session_id)
+
+    assert _texts(messages) == _texts(chat.history)
+    assert len(messages) < 8
+
+
+def test_clear_and_delete(store, client):
+    chat = client.start_chat(MODEL, store=store)
+    chat.send_message("Hello")
+
+    chat.clear()
+    assert store.load_messages(chat.session_id)[0] == []
+
+    store.delete(chat.session_id)
+    assert chat.session_id not in store.list_sessions()
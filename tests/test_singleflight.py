@@ -0,0 +1,105 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from gemini_ng import GeminiClient
+from gemini_ng.utils.singleflight import SingleFlight
+
+MODEL = "models/gemini-1.5-flash"
+
+
+def test_concurrent_callers_share_one_execution():
+    single_flight = SingleFlight()
+    release = threading.Event()
+    calls = []
+
+    def fn():
+        calls.append(None)
+        release.wait(5)
+        return "result"
+
+    def call():
+        return single_flight.do("key", fn)
+
+    with ThreadPoolExecutor(4) as executor:
+        futures = [executor.submit(call) for _ in range(4)]
+        # Let every caller arrive while the first one is still running.
+        while single_flight._calls.get("key") is None:
+            pass
+        threading.Timer(0.2, release.set).start()
+
+    results = [future.result() for future in futures]
+
+    assert len(calls) == 1
+    assert [result for result, _ in results] == ["result"] * 4
+    assert sorted(shared for _, shared in results) == [False, True, True, True]
+    assert single_flight._calls == {}
+
+
+def test_exceptions_reach_every_caller():
+    single_flight = SingleFlight()
+    release = threading.Event()
+
+    def fn():
+        release.wait(5)
+        raise RuntimeError("failed")
+
+    with ThreadPoolExecutor(3) as executor:
+        futures = [executor.submit(single_flight.do, "key", fn) for _ in range(3)]
+        threading.Timer(0.2, release.set).start()
+
+    for future in futures:
+        with pytest.raises(RuntimeError, match="failed"):
+            future.result()
+    assert single_flight._calls == {}
+
+
+def test_sequential_calls_are_not_shared():
+    single_flight = SingleFlight()
+    calls = []
+
+    def fn():
+        calls.append(None)
+        return len(calls)
+
+    assert single_flight.do("key", fn) == (1, False)
+    assert single_flight.do("key", fn) == (2, False)
+
+
+def test_different_keys_run_separately():
+    single_flight = SingleFlight()
+
+    assert single_flight.do("a", lambda: 1) == (1, False)
+    assert single_flight.do("b", lambda: 2) == (2, False)
+
+
+@pytest.mark.parametrize("mock_config", [{"latency": 0.3}], indirect=True)
+def test_identical_deterministic_generations_are_coalesced(mock_server):
+    client = GeminiClient(api_key="test", base_url=mock_server.url)
+    config = {"temperature": 0.0}
+
+    with ThreadPoolExecutor(4) as executor:
+        rsps = list(
+            executor.map(
+                lambda _: client.generate(MODEL, "Hello", generation_config=config), range(4)
+            )
+        )
+
+    assert len({rsp.candidates[0].text for rsp in rsps}) == 1
+    assert mock_server.requests["generateContent"] == 1
+
+
+@pytest.mark.parametrize("mock_config", [{"latency": 0.3}], indirect=True)
+def test_sampled_generations_are_not_coalesced(mock_server):
+    client = GeminiClient(api_key="test", base_url=mock_server.url)
+    config = {"temperature": 1.0}
+
+    with ThreadPoolExecutor(4) as executor:
+        list(
+            executor.map(
+                lambda _: client.generate(MODEL, "Hello", generation_config=config), range(4)
+            )
+        )
+
+    assert mock_server.requests["generateContent"] == 4
@@ -0,0 +1,48 @@
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from gemini_ng import GeminiClient
+
+TEXT = "héllo 你好"
+
+
+class _SSEHandler(BaseHTTPRequestHandler):
+    def do_POST(self):
+        self.rfile.read(int(self.headers["Content-Length"]))
+
+        chunk = {"candidates": [{"index": 0, "content": {"role": "model", "parts": [{"text": TEXT}]}}]}
+        # Raw UTF-8, not ASCII-escaped JSON, and no charset in the content type.
+        body = f"data: {json.dumps(chunk, ensure_ascii=False)}\r\n\r\n".encode("utf-8")
+
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture
+def base_url():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _SSEHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        yield f"http://127.0.0.1:{server.server_port}"
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+def test_generate_stream_decodes_utf8(base_url):
+    client = GeminiClient(api_key="test", base_url=base_url)
+
+    chunks = list(client.generate_stream("models/gemini-1.5-flash", "Hi"))
+
+    assert len(chunks) == 1
+    assert chunks[0].candidates[0].text == TEXT
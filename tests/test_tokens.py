@@ -0,0 +1,68 @@
+from gemini_ng.utils.tokens import TOKENS_PER_FILE, estimate_tokens, token_count_key
+
+MODEL = "models/gemini-1.5-flash"
+
+
+def _text(text: str, role: str = "user") -> dict:
+    return {"role": role, "parts": [{"text": text}]}
+
+
+def _file(uri: str, mime_type: str) -> dict:
+    return {"fileData": {"fileUri": uri, "mimeType": mime_type}}
+
+
+def test_counts_are_cached_by_content(client, mock_server):
+    first = client.get_token_count(MODEL, ["Hello", "world"])
+    assert mock_server.requests["countTokens"] == 2
+
+    # Only the new item is counted; the others come from the cache.
+    second = client.get_token_count(MODEL, ["Hello", "world", "again"])
+    assert mock_server.requests["countTokens"] == 3
+
+    assert client.get_token_count(MODEL, ["Hello", "world"]) == first
+    assert client.get_token_count(MODEL, ["Hello"]) < first
+    assert mock_server.requests["countTokens"] == 3
+    assert second > first
+
+
+def test_use_cache_false_counts_the_whole_prompt(client, mock_server):
+    client.get_token_count(MODEL, ["Hello", "world"], use_cache=False)
+    client.get_token_count(MODEL, ["Hello", "world"], use_cache=False)
+
+    assert mock_server.requests["countTokens"] == 2
+
+
+def test_key_ignores_role():
+    assert token_count_key(_text("Hello", "user")) == token_count_key(_text("Hello", "model"))
+    assert token_count_key(_text("Hello")) != token_count_key(_text("Hello!"))
+
+
+def test_key_uses_file_uri():
+    image = {"role": "user", "parts": [_file("files/a", "image/png")]}
+    other = {"role": "user", "parts": [_file("files/b", "image/png")]}
+
+    assert token_count_key(image) != token_count_key(other)
+
+
+def test_estimate_text():
+    estimate = estimate_tokens({"contents": [_text("a" * 400)]})
+
+    assert estimate.tokens == 100
+    assert estimate.low <= estimate.tokens <= estimate.high
+    assert estimate.high <= 400
+
+
+def test_estimate_is_unbounded_for_videos():
+    image = estimate_tokens({"contents": {"parts": [_file("files/a", "image/png")]}})
+    video = estimate_tokens({"contents": {"parts": [_file("files/b", "video/mp4")]}})
+
+    assert image == (TOKENS_PER_FILE, TOKENS_PER_FILE, TOKENS_PER_FILE)
+    assert video.tokens == TOKENS_PER_FILE
+    assert video.high is None
+
+
+def test_client_estimate_sums_prompt_items(client):
+    estimate = client.estimate_token_count(["a" * 40, "b" * 40])
+
+    # Items after the first are separated by a newline.
+    assert estimate.tokens == 10 + 11
@@ -0,0 +1,48 @@
+import av
+import numpy as np
+import pytest
+
+from gemini_ng.schemas import FrameEncodingConfig, VideoSamplingConfig
+from gemini_ng.utils.video import iter_encoded_video_frames
+
+
+@pytest.fixture
+def video_path(tmp_path):
+    # 2 fps with a keyframe every 2 seconds: the range boundaries of a parallel
+    # decode fall between keyframes and between frames.
+    path = tmp_path / "clip.mp4"
+    with av.open(str(path), "w") as container:
+        stream = container.add_stream("libx264", rate=2)
+        stream.width = 64
+        stream.height = 48
+        stream.pix_fmt = "yuv420p"
+        stream.codec_context.gop_size = 4
+        for index in range(20):
+            image = np.full((48, 64, 3), index * 10, dtype=np.uint8)
+            frame = av.VideoFrame.from_ndarray(image, format="rgb24")
+            for packet in stream.encode(frame):
+                container.mux(packet)
+        for packet in stream.encode():
+            container.mux(packet)
+    return str(path)
+
+
+@pytest.mark.parametrize("sample_fps", [0.7, 1.3, 3.0])
+@pytest.mark.parametrize("num_workers", [2, 3])
+def test_parallel_matches_serial(video_path, sample_fps, num_workers):
+    sampling = VideoSamplingConfig(sample_fps=sample_fps)
+    encoding = FrameEncodingConfig(image_format="PNG")
+
+    serial = [
+        frame.timestamp
+        for frame in iter_encoded_video_frames(video_path, sampling, encoding, num_workers=1)
+    ]
+    parallel = [
+        frame.timestamp
+        for frame in iter_encoded_video_frames(
+            video_path, sampling, encoding, num_workers=num_workers
+        )
+    ]
+
+    assert len(parallel) == len(serial)
+    assert parallel == serial